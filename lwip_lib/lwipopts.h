@@ -6,6 +6,13 @@
 #ifndef LWIP_LWIPOPTS_H
 #define LWIP_LWIPOPTS_H
 
+/*
+ * Options of the build profile (see profiles folder). The profile header
+ * is included first, the options it defines take precedence over the
+ * default values below.
+ */
+#include "lwipopts_profile.h"
+
 /**
  * SYS_LIGHTWEIGHT_PROT==1: if you want inter-task protection for certain
  * critical regions during buffer allocation, deallocation and memory
@@ -30,13 +37,17 @@
  *    4 byte alignment -> #define MEM_ALIGNMENT 4
  *    2 byte alignment -> #define MEM_ALIGNMENT 2
  */
+#ifndef MEM_ALIGNMENT
 #define MEM_ALIGNMENT                   1U
+#endif
 
 /**
  * MEM_SIZE: the size of the heap memory. If the application will send
  * a lot of data that needs to be copied, this should be set high.
  */
+#ifndef MEM_SIZE
 #define MEM_SIZE                        1600
+#endif
 
 /*
    ------------------------------------------------
@@ -48,44 +59,58 @@
  * If the application sends a lot of data out of ROM (or other static memory),
  * this should be set high.
  */
+#ifndef MEMP_NUM_PBUF
 #define MEMP_NUM_PBUF                   16
+#endif
 
 /**
  * MEMP_NUM_RAW_PCB: Number of raw connection PCBs
  * (requires the LWIP_RAW option)
  */
+#ifndef MEMP_NUM_RAW_PCB
 #define MEMP_NUM_RAW_PCB                4
+#endif
 
 /**
  * MEMP_NUM_UDP_PCB: the number of UDP protocol control blocks. One
  * per active UDP "connection".
  * (requires the LWIP_UDP option)
  */
+#ifndef MEMP_NUM_UDP_PCB
 #define MEMP_NUM_UDP_PCB                4
+#endif
 
 /**
  * MEMP_NUM_TCP_PCB: the number of simulatenously active TCP connections.
  * (requires the LWIP_TCP option)
  */
+#ifndef MEMP_NUM_TCP_PCB
 #define MEMP_NUM_TCP_PCB                4
+#endif
 
 /**
  * MEMP_NUM_TCP_PCB_LISTEN: the number of listening TCP connections.
  * (requires the LWIP_TCP option)
  */
+#ifndef MEMP_NUM_TCP_PCB_LISTEN
 #define MEMP_NUM_TCP_PCB_LISTEN         4
+#endif
 
 /**
  * MEMP_NUM_TCP_SEG: the number of simultaneously queued TCP segments.
  * (requires the LWIP_TCP option)
  */
+#ifndef MEMP_NUM_TCP_SEG
 #define MEMP_NUM_TCP_SEG                16
+#endif
 
 /**
  * MEMP_NUM_REASSDATA: the number of simultaneously IP packets queued for
  * reassembly (whole packets, not fragments!)
  */
+#ifndef MEMP_NUM_REASSDATA
 #define MEMP_NUM_REASSDATA              1
+#endif
 
 /**
  * MEMP_NUM_ARP_QUEUE: the number of simulateously queued outgoing
@@ -93,13 +118,17 @@
  * their destination address) to finish.
  * (requires the ARP_QUEUEING option)
  */
+#ifndef MEMP_NUM_ARP_QUEUE
 #define MEMP_NUM_ARP_QUEUE              2
+#endif
 
 /**
  * MEMP_NUM_SYS_TIMEOUT: the number of simulateously active timeouts.
  * (requires NO_SYS==0)
  */
+#ifndef MEMP_NUM_SYS_TIMEOUT
 #define MEMP_NUM_SYS_TIMEOUT            8
+#endif
 
 /**
  * MEMP_NUM_NETBUF: the number of struct netbufs.
@@ -130,7 +159,9 @@
 /**
  * PBUF_POOL_SIZE: the number of buffers in the pbuf pool.
  */
+#ifndef PBUF_POOL_SIZE
 #define PBUF_POOL_SIZE                  8
+#endif
 
 /*
    ---------------------------------
@@ -142,6 +173,22 @@
  */
 #define LWIP_ARP                        1
 
+/**
+ * ARP_TABLE_SIZE: Number of active MAC-IP address pairs cached. The static
+ * entries (EthernetNetwork static_arp) occupy the table as well.
+ */
+#ifndef ARP_TABLE_SIZE
+#define ARP_TABLE_SIZE                  10
+#endif
+
+/**
+ * ETHARP_SUPPORT_STATIC_ENTRIES==1: enable code to support static ARP table
+ * entries (using etharp_add_static_entry/etharp_remove_static_entry).
+ */
+#ifndef ETHARP_SUPPORT_STATIC_ENTRIES
+#define ETHARP_SUPPORT_STATIC_ENTRIES   1
+#endif
+
 /*
    --------------------------------
    ---------- IP options ----------
@@ -152,7 +199,9 @@
  * interfaces. If you are going to run lwIP on a device with only one network
  * interface, define this to 0.
  */
+#ifndef IP_FORWARD
 #define IP_FORWARD                      0
+#endif
 
 /**
  * IP_OPTIONS: Defines the behavior for IP options.
@@ -231,7 +280,9 @@
 /**
  * LWIP_DHCP==1: Enable DHCP module.
  */
+#ifndef LWIP_DHCP
 #define LWIP_DHCP                       0
+#endif
 
 
 /*
@@ -263,7 +314,9 @@
 /**
  * LWIP_IGMP==1: Turn on IGMP module.
  */
+#ifndef LWIP_IGMP
 #define LWIP_IGMP                       0
+#endif
 
 /*
    ----------------------------------
@@ -296,7 +349,13 @@
  */
 #define LWIP_TCP                        1
 
-#define LWIP_LISTEN_BACKLOG             0
+/**
+ * TCP_LISTEN_BACKLOG==1: limit the number of the connections accepted by
+ * the stack but not taken over by the application (tcp_backlog_delayed).
+ */
+#ifndef TCP_LISTEN_BACKLOG
+#define TCP_LISTEN_BACKLOG              0
+#endif
 
 /*
    ----------------------------------
@@ -362,7 +421,9 @@
 /**
  * LWIP_STATS==1: Enable statistics collection in lwip_stats.
  */
+#ifndef LWIP_STATS
 #define LWIP_STATS                      0
+#endif
 /*
    ---------------------------------
    ---------- PPP options ----------
@@ -414,7 +475,9 @@ void ping_result(unsigned char result);
 
 //------------------------ DEBUG ------------------
 
+#ifndef PING_DEBUG
 #define PING_DEBUG                      LWIP_DBG_ON
+#endif
 
 //#define LWIP_DEBUG
 
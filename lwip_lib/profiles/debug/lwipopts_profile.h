@@ -0,0 +1,9 @@
+/**
+ * @file
+ * Debug profile (liblwip.so): embedded-size pools and debug output,
+ * the defaults of lwipopts.h are used as is.
+ */
+#ifndef LWIP_LWIPOPTS_PROFILE_H
+#define LWIP_LWIPOPTS_PROFILE_H
+
+#endif /* LWIP_LWIPOPTS_PROFILE_H */
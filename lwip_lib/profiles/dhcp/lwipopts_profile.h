@@ -0,0 +1,19 @@
+/**
+ * @file
+ * DHCP profile (liblwip_dhcp.so): optimized build with the DHCP client
+ * enabled (NetIf.start_dhcp), embedded-size pools of a device booting
+ * among many others. The DHCP server host (DhcpServer) needs the
+ * profile as well: only the stacks built with DHCP accept the requests
+ * sent from 0.0.0.0.
+ */
+#ifndef LWIP_LWIPOPTS_PROFILE_H
+#define LWIP_LWIPOPTS_PROFILE_H
+
+#define LWIP_DHCP                       1
+#define MEM_SIZE                        (16 * 1024)
+/* stack timeouts (the DHCP timers included) and spare ones */
+#define MEMP_NUM_SYS_TIMEOUT            (LWIP_NUM_SYS_TIMEOUT_INTERNAL + 4)
+
+#define PING_DEBUG                      LWIP_DBG_OFF
+
+#endif /* LWIP_LWIPOPTS_PROFILE_H */
@@ -0,0 +1,20 @@
+/**
+ * @file
+ * Forwarding profile (liblwip_forwarding.so): the host forwards IP
+ * packets between its interfaces (router), pools are sized for the
+ * transit traffic.
+ */
+#ifndef LWIP_LWIPOPTS_PROFILE_H
+#define LWIP_LWIPOPTS_PROFILE_H
+
+#define IP_FORWARD                      1
+
+#define MEM_SIZE                        (64 * 1024)
+#define MEMP_NUM_PBUF                   64
+#define MEMP_NUM_REASSDATA              8
+#define MEMP_NUM_ARP_QUEUE              32
+#define PBUF_POOL_SIZE                  128
+
+#define PING_DEBUG                      LWIP_DBG_OFF
+
+#endif /* LWIP_LWIPOPTS_PROFILE_H */
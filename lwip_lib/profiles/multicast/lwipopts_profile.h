@@ -0,0 +1,13 @@
+/**
+ * @file
+ * Multicast profile (liblwip_multicast.so): debug profile with IGMP
+ * enabled, the UDP sockets can join multicast groups
+ * (UdpSocket.join_group).
+ */
+#ifndef LWIP_LWIPOPTS_PROFILE_H
+#define LWIP_LWIPOPTS_PROFILE_H
+
+#define LWIP_IGMP                       1
+#define MEMP_NUM_IGMP_GROUP             16
+
+#endif /* LWIP_LWIPOPTS_PROFILE_H */
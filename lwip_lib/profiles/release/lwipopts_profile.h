@@ -0,0 +1,32 @@
+/**
+ * @file
+ * Release profile (liblwip_release.so): throughput oriented build with
+ * large pools and TCP windows, debug output is disabled. The checksums
+ * can be skipped per interface (NetIf.set_checksum_offload).
+ */
+#ifndef LWIP_LWIPOPTS_PROFILE_H
+#define LWIP_LWIPOPTS_PROFILE_H
+
+#define MEM_ALIGNMENT                   8U
+#define MEM_SIZE                        (1024 * 1024)
+
+#define MEMP_NUM_PBUF                   256
+#define MEMP_NUM_RAW_PCB                16
+#define MEMP_NUM_UDP_PCB                64
+#define MEMP_NUM_TCP_PCB                64
+#define MEMP_NUM_TCP_PCB_LISTEN         16
+#define MEMP_NUM_TCP_SEG                512
+#define MEMP_NUM_REASSDATA              16
+#define MEMP_NUM_ARP_QUEUE              32
+#define PBUF_POOL_SIZE                  512
+
+#define TCP_MSS                         1460
+#define TCP_WND                         (32 * TCP_MSS)
+#define TCP_SND_BUF                     (32 * TCP_MSS)
+#define TCP_SND_QUEUELEN                (4 * TCP_SND_BUF / TCP_MSS)
+
+#define LWIP_CHECKSUM_CTRL_PER_NETIF    1
+
+#define PING_DEBUG                      LWIP_DBG_OFF
+
+#endif /* LWIP_LWIPOPTS_PROFILE_H */
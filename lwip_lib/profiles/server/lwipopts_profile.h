@@ -0,0 +1,40 @@
+/**
+ * @file
+ * Server profile (liblwip_server.so): optimized build for thousands of
+ * concurrent TCP connections. The pools are sized for the connection
+ * count rather than for the per-connection throughput, the listeners
+ * limit the accepted connections not taken over by the application
+ * (TcpSocket.listen backlog). The ARP table is as large as lwIP allows:
+ * the entries are indexed by s8_t, so init.c refuses ARP_TABLE_SIZE
+ * above 0x7f. The static entries of the larger subnets are limited by
+ * the hosts (EthernetNetwork static_arp).
+ */
+#ifndef LWIP_LWIPOPTS_PROFILE_H
+#define LWIP_LWIPOPTS_PROFILE_H
+
+#define MEM_ALIGNMENT                   8U
+#define MEM_SIZE                        (16 * 1024 * 1024)
+
+#define MEMP_NUM_PBUF                   4096
+#define MEMP_NUM_UDP_PCB                64
+#define MEMP_NUM_TCP_PCB                8192
+#define MEMP_NUM_TCP_PCB_LISTEN         64
+#define MEMP_NUM_TCP_SEG                16384
+#define MEMP_NUM_REASSDATA              16
+#define MEMP_NUM_ARP_QUEUE              256
+#define ARP_TABLE_SIZE                  127
+#define PBUF_POOL_SIZE                  4096
+
+#define TCP_MSS                         1460
+#define TCP_WND                         (4 * TCP_MSS)
+#define TCP_SND_BUF                     (4 * TCP_MSS)
+#define TCP_SND_QUEUELEN                (4 * TCP_SND_BUF / TCP_MSS)
+
+#define TCP_LISTEN_BACKLOG              1
+#define TCP_DEFAULT_LISTEN_BACKLOG      0xff
+
+#define LWIP_CHECKSUM_CTRL_PER_NETIF    1
+
+#define PING_DEBUG                      LWIP_DBG_OFF
+
+#endif /* LWIP_LWIPOPTS_PROFILE_H */
@@ -0,0 +1,12 @@
+/**
+ * @file
+ * Statistics profile (liblwip_stats.so): debug profile with statistics
+ * collection enabled (see Stack.get_stats).
+ */
+#ifndef LWIP_LWIPOPTS_PROFILE_H
+#define LWIP_LWIPOPTS_PROFILE_H
+
+#define LWIP_STATS                      1
+#define LWIP_STATS_LARGE                1
+
+#endif /* LWIP_LWIPOPTS_PROFILE_H */
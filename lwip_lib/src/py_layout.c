@@ -0,0 +1,113 @@
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*
+ * Compile-time layout information required by python bindings.
+ *
+ * Layout of some lwIP structures depends on the configuration. The
+ * functions below report the options affecting the layout, so the
+ * ctypes mirrors can be built to match the loaded library.
+ */
+
+#include "lwip/opt.h"
+
+#include "lwip/mem.h"
+#include "lwip/memp.h"
+#include "lwip/netif.h"
+#include "lwip/stats.h"
+
+#include <stddef.h>
+
+/*
+ * The netif structure is allocated by the python code, the fields
+ * preceding mtu (client data, hostname, checksum control) depend on
+ * the configuration.
+ */
+struct lwip_py_netif_layout {
+    u16_t size;
+    u16_t mtu_offset;
+};
+
+void lwip_py_get_netif_layout(struct lwip_py_netif_layout *layout)
+{
+    layout->size = (u16_t)sizeof(struct netif);
+    layout->mtu_offset = (u16_t)offsetof(struct netif, mtu);
+}
+
+#if LWIP_STATS
+
+#define LWIP_PY_STATS_LINK      0x0001
+#define LWIP_PY_STATS_ETHARP    0x0002
+#define LWIP_PY_STATS_IPFRAG    0x0004
+#define LWIP_PY_STATS_IP        0x0008
+#define LWIP_PY_STATS_ICMP      0x0010
+#define LWIP_PY_STATS_IGMP      0x0020
+#define LWIP_PY_STATS_UDP       0x0040
+#define LWIP_PY_STATS_TCP       0x0080
+#define LWIP_PY_STATS_MEM       0x0100
+#define LWIP_PY_STATS_MEMP      0x0200
+#define LWIP_PY_STATS_SYS       0x0400
+#define LWIP_PY_STATS_MEM_NAME  0x1000
+
+struct lwip_py_stats_layout {
+    u32_t sections;
+    u32_t stats_size;
+    u16_t memp_count;
+    u8_t counter_size;
+    u8_t mem_size_size;
+};
+
+void lwip_py_get_stats_layout(struct lwip_py_stats_layout *layout)
+{
+    u32_t sections = 0;
+
+#if LINK_STATS
+    sections |= LWIP_PY_STATS_LINK;
+#endif
+#if ETHARP_STATS
+    sections |= LWIP_PY_STATS_ETHARP;
+#endif
+#if IPFRAG_STATS
+    sections |= LWIP_PY_STATS_IPFRAG;
+#endif
+#if IP_STATS
+    sections |= LWIP_PY_STATS_IP;
+#endif
+#if ICMP_STATS
+    sections |= LWIP_PY_STATS_ICMP;
+#endif
+#if IGMP_STATS
+    sections |= LWIP_PY_STATS_IGMP;
+#endif
+#if UDP_STATS
+    sections |= LWIP_PY_STATS_UDP;
+#endif
+#if TCP_STATS
+    sections |= LWIP_PY_STATS_TCP;
+#endif
+#if MEM_STATS
+    sections |= LWIP_PY_STATS_MEM;
+#endif
+#if MEMP_STATS
+    sections |= LWIP_PY_STATS_MEMP;
+#endif
+#if SYS_STATS
+    sections |= LWIP_PY_STATS_SYS;
+#endif
+#if defined(LWIP_DEBUG) || LWIP_STATS_DISPLAY
+    sections |= LWIP_PY_STATS_MEM_NAME;
+#endif
+
+    layout->sections = sections;
+    layout->stats_size = (u32_t)sizeof(struct stats_);
+    layout->memp_count = (u16_t)MEMP_MAX;
+    layout->counter_size = (u8_t)sizeof(STAT_COUNTER);
+    layout->mem_size_size = (u8_t)sizeof(mem_size_t);
+}
+
+#endif /* LWIP_STATS */
+
+#ifdef __cplusplus
+}
+#endif
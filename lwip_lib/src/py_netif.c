@@ -0,0 +1,48 @@
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*
+ * Network interface helpers required by python bindings.
+ *
+ * The netif fields enabled by the configuration (IGMP MAC filter,
+ * checksum control) are set via the functions, so the python code
+ * does not depend on their position in the structure. The ARP table
+ * size limits the static entries added by the python code.
+ */
+
+#include "lwip/opt.h"
+
+#include "lwip/netif.h"
+
+#if LWIP_ARP
+
+u16_t lwip_py_get_arp_table_size(void)
+{
+    return (u16_t)ARP_TABLE_SIZE;
+}
+
+#endif /* LWIP_ARP */
+
+#if LWIP_IPV4 && LWIP_IGMP
+
+void lwip_py_netif_set_igmp_mac_filter(
+    struct netif *netif, netif_igmp_mac_filter_fn filter)
+{
+    netif_set_igmp_mac_filter(netif, filter);
+}
+
+#endif /* LWIP_IPV4 && LWIP_IGMP */
+
+#if LWIP_CHECKSUM_CTRL_PER_NETIF
+
+void lwip_py_netif_set_checksum_ctrl(struct netif *netif, u16_t flags)
+{
+    NETIF_SET_CHECKSUM_CTRL(netif, flags);
+}
+
+#endif /* LWIP_CHECKSUM_CTRL_PER_NETIF */
+
+#ifdef __cplusplus
+}
+#endif
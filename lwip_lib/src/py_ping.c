@@ -0,0 +1,230 @@
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*
+ * ICMP echo engine used by python bindings (PingEngine).
+ *
+ * The engine owns a raw ICMP pcb and keeps many echo requests in flight
+ * across many targets. Every request occupies the slot selected by its
+ * sequence number, the slot holds the target and the send timestamp.
+ * Matching replies are timestamped in the receive callback and queued,
+ * python collects the queued replies in one foreign call, so the RTT
+ * does not include the python scheduling delays.
+ */
+
+#include "lwip/opt.h"
+
+#if LWIP_RAW && LWIP_ICMP
+
+#include "lwip/icmp.h"
+#include "lwip/inet_chksum.h"
+#include "lwip/ip.h"
+#include "lwip/pbuf.h"
+#include "lwip/raw.h"
+
+#include <stdlib.h>
+#include <time.h>
+
+struct lwip_py_ping_reply {
+    u32_t addr;
+    u16_t seq;
+    u16_t reserved;
+    u32_t rtt_us;
+};
+
+struct lwip_py_ping_slot {
+    u64_t sent_us;
+    u32_t addr;
+    u16_t seq;
+    u8_t used;
+};
+
+struct lwip_py_ping_engine {
+    struct raw_pcb *pcb;
+    u16_t id;
+    u16_t capacity;
+    struct lwip_py_ping_slot *slots;
+    struct lwip_py_ping_reply *replies;
+    u32_t reply_head;
+    u32_t reply_count;
+};
+
+static u64_t lwip_py_ping_now_us(void)
+{
+    struct timespec ts;
+
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (u64_t)ts.tv_sec * 1000000U + (u64_t)ts.tv_nsec / 1000U;
+}
+
+static u8_t lwip_py_ping_recv(
+    void *arg, struct raw_pcb *pcb, struct pbuf *p, const ip_addr_t *addr)
+{
+    struct lwip_py_ping_engine *engine = (struct lwip_py_ping_engine *)arg;
+    struct icmp_echo_hdr echo;
+    struct lwip_py_ping_slot *slot;
+    u16_t ip_hlen;
+    u16_t seq;
+    u64_t received_us = lwip_py_ping_now_us();
+
+    LWIP_UNUSED_ARG(pcb);
+
+    if (p->tot_len < IP_HLEN + sizeof(echo)) {
+        return 0;
+    }
+    ip_hlen = (u16_t)((pbuf_get_at(p, 0) & 0x0F) * 4);
+    if (pbuf_copy_partial(p, &echo, sizeof(echo), ip_hlen) != sizeof(echo)) {
+        return 0;
+    }
+    if (ICMPH_TYPE(&echo) != ICMP_ER || echo.id != lwip_htons(engine->id)) {
+        return 0;
+    }
+
+    seq = lwip_ntohs(echo.seqno);
+    slot = &engine->slots[seq % engine->capacity];
+    if (!slot->used || slot->seq != seq
+        || slot->addr != ip4_addr_get_u32(ip_2_ip4(addr))) {
+        return 0;
+    }
+    slot->used = 0;
+
+    /* the reply is dropped if python does not collect in time, the
+     * echo is reported as lost on its timeout then */
+    if (engine->reply_count < engine->capacity) {
+        struct lwip_py_ping_reply *reply = &engine->replies[
+            (engine->reply_head + engine->reply_count) % engine->capacity];
+
+        reply->addr = slot->addr;
+        reply->seq = seq;
+        reply->reserved = 0;
+        reply->rtt_us = (u32_t)(received_us - slot->sent_us);
+        ++engine->reply_count;
+    }
+
+    pbuf_free(p);
+    return 1;
+}
+
+struct lwip_py_ping_engine *lwip_py_ping_engine_new(u16_t id, u16_t capacity)
+{
+    struct lwip_py_ping_engine *engine;
+
+    if (capacity == 0) {
+        return NULL;
+    }
+
+    engine = (struct lwip_py_ping_engine *)calloc(1, sizeof(*engine));
+    if (engine == NULL) {
+        return NULL;
+    }
+    engine->id = id;
+    engine->capacity = capacity;
+    engine->slots = (struct lwip_py_ping_slot *)calloc(
+        capacity, sizeof(*engine->slots));
+    engine->replies = (struct lwip_py_ping_reply *)calloc(
+        capacity, sizeof(*engine->replies));
+    engine->pcb = raw_new(IP_PROTO_ICMP);
+    if (engine->slots == NULL || engine->replies == NULL
+        || engine->pcb == NULL) {
+        if (engine->pcb != NULL) {
+            raw_remove(engine->pcb);
+        }
+        free(engine->slots);
+        free(engine->replies);
+        free(engine);
+        return NULL;
+    }
+
+    raw_recv(engine->pcb, lwip_py_ping_recv, engine);
+    return engine;
+}
+
+void lwip_py_ping_engine_free(struct lwip_py_ping_engine *engine)
+{
+    raw_remove(engine->pcb);
+    free(engine->slots);
+    free(engine->replies);
+    free(engine);
+}
+
+/*
+ * Send echo request with the given sequence number. Returns
+ * ERR_INPROGRESS if the slot of the sequence number is still occupied
+ * by an outstanding request.
+ */
+err_t lwip_py_ping_engine_send(struct lwip_py_ping_engine *engine,
+                               const ip_addr_t *target,
+                               u16_t seq,
+                               u16_t payload_size)
+{
+    struct lwip_py_ping_slot *slot = &engine->slots[seq % engine->capacity];
+    struct icmp_echo_hdr *echo;
+    struct pbuf *p;
+    u16_t size = (u16_t)(sizeof(*echo) + payload_size);
+    u16_t i;
+    err_t result;
+
+    if (slot->used) {
+        return ERR_INPROGRESS;
+    }
+
+    p = pbuf_alloc(PBUF_IP, size, PBUF_RAM);
+    if (p == NULL) {
+        return ERR_MEM;
+    }
+
+    echo = (struct icmp_echo_hdr *)p->payload;
+    ICMPH_TYPE_SET(echo, ICMP_ECHO);
+    ICMPH_CODE_SET(echo, 0);
+    echo->chksum = 0;
+    echo->id = lwip_htons(engine->id);
+    echo->seqno = lwip_htons(seq);
+    for (i = 0; i < payload_size; ++i) {
+        ((u8_t *)echo)[sizeof(*echo) + i] = (u8_t)i;
+    }
+    echo->chksum = inet_chksum(echo, size);
+
+    slot->addr = ip4_addr_get_u32(ip_2_ip4(target));
+    slot->seq = seq;
+    slot->sent_us = lwip_py_ping_now_us();
+    slot->used = 1;
+
+    result = raw_sendto(engine->pcb, p, target);
+    pbuf_free(p);
+    if (result != ERR_OK) {
+        slot->used = 0;
+    }
+    return result;
+}
+
+/* Forget the outstanding request (timed out), a late reply is ignored. */
+void lwip_py_ping_engine_cancel(struct lwip_py_ping_engine *engine, u16_t seq)
+{
+    struct lwip_py_ping_slot *slot = &engine->slots[seq % engine->capacity];
+
+    if (slot->seq == seq) {
+        slot->used = 0;
+    }
+}
+
+/* Move up to max_count queued replies into the array. */
+u32_t lwip_py_ping_engine_collect(struct lwip_py_ping_engine *engine,
+                                  struct lwip_py_ping_reply *replies,
+                                  u32_t max_count)
+{
+    u32_t count = 0;
+
+    while (count < max_count && engine->reply_count > 0) {
+        replies[count++] = engine->replies[engine->reply_head];
+        engine->reply_head = (engine->reply_head + 1) % engine->capacity;
+        --engine->reply_count;
+    }
+    return count;
+}
+
+#endif /* LWIP_RAW && LWIP_ICMP */
+
+#ifdef __cplusplus
+}
+#endif
@@ -0,0 +1,91 @@
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*
+ * Raw pcb operations used by python bindings.
+ *
+ * The batch send passes the prepared packets to raw_sendto in one
+ * foreign call. The counting receive function consumes the packets of
+ * the pcb protocol and only counts them, so the receive side of a load
+ * test does not call into python per packet.
+ */
+
+#include "lwip/opt.h"
+
+#if LWIP_RAW
+
+#include "lwip/pbuf.h"
+#include "lwip/raw.h"
+
+struct lwip_py_raw_packet {
+    const void *data;
+    u16_t len;
+    ip_addr_t addr;
+};
+
+struct lwip_py_raw_counters {
+    u64_t packets;
+    u64_t bytes;
+};
+
+int lwip_py_raw_sendto_many(struct raw_pcb *pcb,
+                            const struct lwip_py_raw_packet *packets,
+                            int count,
+                            err_t *results)
+{
+    int sent = 0;
+    int i;
+
+    for (i = 0; i < count; ++i) {
+        const struct lwip_py_raw_packet *packet = &packets[i];
+        err_t result = ERR_MEM;
+        struct pbuf *p = pbuf_alloc(PBUF_IP, packet->len, PBUF_RAM);
+
+        if (p != NULL) {
+            result = pbuf_take(p, packet->data, packet->len);
+            if (result == ERR_OK) {
+                result = raw_sendto(pcb, p, &packet->addr);
+            }
+            pbuf_free(p);
+        }
+
+        if (results != NULL) {
+            results[i] = result;
+        }
+        if (result == ERR_OK) {
+            ++sent;
+        }
+    }
+
+    return sent;
+}
+
+static u8_t lwip_py_raw_count_recv(
+    void *arg, struct raw_pcb *pcb, struct pbuf *p, const ip_addr_t *addr)
+{
+    struct lwip_py_raw_counters *counters =
+        (struct lwip_py_raw_counters *)arg;
+
+    LWIP_UNUSED_ARG(pcb);
+    LWIP_UNUSED_ARG(addr);
+
+    ++counters->packets;
+    counters->bytes += p->tot_len;
+    pbuf_free(p);
+    return 1;
+}
+
+/* Consume and count the received packets (the counters are owned by
+ * the caller and must outlive the receive function registration). */
+void lwip_py_raw_count(struct raw_pcb *pcb,
+                       struct lwip_py_raw_counters *counters)
+{
+    raw_recv(pcb, lwip_py_raw_count_recv, counters);
+}
+
+#endif /* LWIP_RAW */
+
+#ifdef __cplusplus
+}
+#endif
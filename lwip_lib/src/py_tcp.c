@@ -0,0 +1,111 @@
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*
+ * TCP helpers used by python bindings.
+ *
+ * The send buffer state is only available via macros accessing the
+ * pcb fields, so it is exposed via functions here. The write helper
+ * enqueues as much data as the send buffer allows in one foreign call.
+ * The configuration reporter exposes the compile-time options limiting
+ * the TCP performance, so the measurements can be related to them.
+ */
+
+#include "lwip/opt.h"
+
+#if LWIP_TCP
+
+#include "lwip/pbuf.h"
+#include "lwip/tcp.h"
+
+struct lwip_py_tcp_config {
+    u32_t mss;
+    u32_t wnd;
+    u32_t snd_buf;
+    u32_t snd_queuelen;
+    u32_t mem_size;
+    u32_t memp_num_pbuf;
+    u32_t memp_num_tcp_pcb;
+    u32_t memp_num_tcp_pcb_listen;
+    u32_t memp_num_tcp_seg;
+    u32_t pbuf_pool_size;
+    u32_t pbuf_pool_bufsize;
+};
+
+void lwip_py_get_tcp_config(struct lwip_py_tcp_config *config)
+{
+    config->mss = (u32_t)TCP_MSS;
+    config->wnd = (u32_t)TCP_WND;
+    config->snd_buf = (u32_t)TCP_SND_BUF;
+    config->snd_queuelen = (u32_t)TCP_SND_QUEUELEN;
+    config->mem_size = (u32_t)MEM_SIZE;
+    config->memp_num_pbuf = (u32_t)MEMP_NUM_PBUF;
+    config->memp_num_tcp_pcb = (u32_t)MEMP_NUM_TCP_PCB;
+    config->memp_num_tcp_pcb_listen = (u32_t)MEMP_NUM_TCP_PCB_LISTEN;
+    config->memp_num_tcp_seg = (u32_t)MEMP_NUM_TCP_SEG;
+    config->pbuf_pool_size = (u32_t)PBUF_POOL_SIZE;
+    config->pbuf_pool_bufsize = (u32_t)PBUF_POOL_BUFSIZE;
+}
+
+u16_t lwip_py_tcp_sndbuf(const struct tcp_pcb *pcb)
+{
+    return (u16_t)tcp_sndbuf(pcb);
+}
+
+u16_t lwip_py_tcp_sndqueuelen(const struct tcp_pcb *pcb)
+{
+    return (u16_t)tcp_sndqueuelen(pcb);
+}
+
+void lwip_py_tcp_set_nodelay(struct tcp_pcb *pcb, int enabled)
+{
+    if (enabled) {
+        tcp_nagle_disable(pcb);
+    } else {
+        tcp_nagle_enable(pcb);
+    }
+}
+
+/*
+ * Enqueue up to len bytes limited by the send buffer. Returns the number
+ * of enqueued bytes (0 if the send buffer or the segment queue is full)
+ * or negative lwIP error.
+ */
+s32_t lwip_py_tcp_write_some(
+    struct tcp_pcb *pcb, const void *data, u32_t len, u8_t apiflags)
+{
+    u32_t written = 0;
+
+    while (written < len) {
+        u32_t chunk = LWIP_MIN(len - written, (u32_t)tcp_sndbuf(pcb));
+        u8_t flags = apiflags;
+        err_t result;
+
+        chunk = LWIP_MIN(chunk, 0xFFFFU);
+        if (chunk == 0) {
+            break;
+        }
+        if (written + chunk < len) {
+            flags |= TCP_WRITE_FLAG_MORE;
+        }
+
+        result = tcp_write(
+            pcb, (const u8_t *)data + written, (u16_t)chunk, flags);
+        if (result == ERR_MEM) {
+            break;
+        }
+        if (result != ERR_OK) {
+            return result;
+        }
+        written += chunk;
+    }
+
+    return (s32_t)written;
+}
+
+#endif /* LWIP_TCP */
+
+#ifdef __cplusplus
+}
+#endif
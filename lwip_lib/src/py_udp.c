@@ -0,0 +1,76 @@
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*
+ * Batched UDP operations used by python bindings.
+ *
+ * The functions process the whole batch in one foreign call, so the
+ * ctypes overhead is paid once per batch instead of once per datagram.
+ */
+
+#include "lwip/opt.h"
+
+#if LWIP_UDP
+
+#include "lwip/pbuf.h"
+#include "lwip/udp.h"
+
+struct lwip_py_datagram {
+    const void *data;
+    u16_t len;
+    u16_t port;
+    ip_addr_t addr;
+};
+
+err_t lwip_py_udp_send(struct udp_pcb *pcb, const void *data, u16_t len)
+{
+    err_t result = ERR_MEM;
+    struct pbuf *p = pbuf_alloc(PBUF_TRANSPORT, len, PBUF_RAM);
+
+    if (p != NULL) {
+        result = pbuf_take(p, data, len);
+        if (result == ERR_OK) {
+            result = udp_send(pcb, p);
+        }
+        pbuf_free(p);
+    }
+
+    return result;
+}
+
+int lwip_py_udp_send_many(struct udp_pcb *pcb,
+                          const struct lwip_py_datagram *datagrams,
+                          int count,
+                          err_t *results)
+{
+    int sent = 0;
+    int i;
+
+    for (i = 0; i < count; ++i) {
+        const struct lwip_py_datagram *datagram = &datagrams[i];
+        err_t result = ERR_MEM;
+        struct pbuf *p = pbuf_alloc(PBUF_TRANSPORT, datagram->len, PBUF_RAM);
+
+        if (p != NULL) {
+            result = pbuf_take(p, datagram->data, datagram->len);
+            if (result == ERR_OK) {
+                result = udp_sendto(pcb, p, &datagram->addr, datagram->port);
+            }
+            pbuf_free(p);
+        }
+
+        results[i] = result;
+        if (result == ERR_OK) {
+            ++sent;
+        }
+    }
+
+    return sent;
+}
+
+#endif /* LWIP_UDP */
+
+#ifdef __cplusplus
+}
+#endif
@@ -0,0 +1,19 @@
+from lwip_py.aio.datagram import (
+    LwipDatagramTransport,
+    create_datagram_endpoint,
+)
+from lwip_py.aio.streams import (
+    LwipStreamServer,
+    LwipStreamTransport,
+    open_connection,
+    start_server,
+)
+
+__all__ = [
+    'LwipDatagramTransport',
+    'LwipStreamServer',
+    'LwipStreamTransport',
+    'create_datagram_endpoint',
+    'open_connection',
+    'start_server',
+]
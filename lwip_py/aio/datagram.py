@@ -0,0 +1,280 @@
+"""
+asyncio datagram transport on top of the lwip UDP socket.
+
+The transport lives in the asyncio event loop thread while the socket
+is serviced in the host thread: datagrams to send are queued and sent in
+the host context, received datagrams are pulled from the socket receive
+queue and delivered to the protocol in the loop thread (one loop wakeup
+per batch of datagrams).
+
+If the stack runs out of pbufs the outgoing datagrams stay queued and
+are retried, the protocol is paused (pause_writing) while the queue is
+above the high-water mark.
+"""
+import asyncio
+import collections
+import threading
+
+from lwip_py.stack import IpV4Addr, SocketTypes, exceptions
+from lwip_py.utility import address_helpers
+
+_ERR_MEM = -1
+_RETRY_DELAY = 0.001
+_RECV_BATCH = 64
+
+
+def _is_out_of_memory(send_error):
+    return isinstance(send_error, exceptions.AllocationError) or (
+        send_error.args and send_error.args[0] == _ERR_MEM
+    )
+
+
+class LwipDatagramTransport(asyncio.DatagramTransport):
+    """Datagram transport sending and receiving via lwip UDP socket."""
+
+    def __init__(
+        self, loop, host, udp_socket, protocol, remote_addr=None,
+        recv_queue_size=1024,
+    ):
+        """
+        Initialize new transport.
+
+        The socket should be bound, the transport takes its ownership.
+        Should be created in the host context.
+
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop
+            loop to deliver protocol callbacks in
+        host : Host
+            host servicing the socket
+        udp_socket : UdpSocket
+            bound socket
+        protocol : asyncio.DatagramProtocol
+            protocol to serve
+        remote_addr : tuple(string, int), optional
+            remote end point the socket is connected to (only its
+            datagrams are received), by default None
+        recv_queue_size : int, optional
+            capacity of the socket receive queue, by default 1024
+        """
+        super().__init__()
+        self._loop = loop
+        self._host = host
+        self._socket = udp_socket
+        self._protocol = protocol
+        self._remote_addr = remote_addr and tuple(remote_addr)
+        self._extra = {
+            'sockname': (
+                udp_socket.get_local_address(), udp_socket.get_local_port(),
+            ),
+            'peername': remote_addr,
+        }
+
+        self._lock = threading.Lock()
+        self._outgoing = collections.deque()
+        self._buffer_size = 0
+        self._flush_scheduled = False
+        self._closing = False
+        self._closed = False
+        self._paused = False
+        self._drop_outgoing = False
+        self.set_write_buffer_limits()
+
+        if remote_addr is not None:
+            udp_socket.connect(IpV4Addr(remote_addr[0]), remote_addr[1])
+        udp_socket.enable_recv_queue(recv_queue_size, self._on_readable)
+        self._loop.call_soon_threadsafe(self._protocol.connection_made, self)
+
+    def sendto(self, data, addr=None):
+        """
+        Queue datagram to be sent.
+
+        Parameters
+        ----------
+        data : bytes_like
+            datagram payload
+        addr : tuple(string, int), optional
+            destination, by default None (remote address)
+
+        Raises
+        ------
+        ValueError
+            if the destination is missing or differs from the remote
+            address of the connected transport
+        """
+        if self._closing:
+            raise RuntimeError('Transport is closing')
+
+        if self._remote_addr is not None:
+            if addr is not None and tuple(addr) != self._remote_addr:
+                raise ValueError(
+                    'Invalid address: must be None or {0}'.format(
+                        self._remote_addr,
+                    ),
+                )
+            destination = None
+        elif addr is None:
+            raise ValueError('Destination address is not specified')
+        else:
+            destination = (IpV4Addr(addr[0]), addr[1])
+
+        payload = bytes(data)
+        with self._lock:
+            self._outgoing.append((payload, destination))
+            self._buffer_size += len(payload)
+            schedule_flush = not self._flush_scheduled
+            self._flush_scheduled = True
+            should_pause = (
+                not self._paused and self._buffer_size > self._high_water
+            )
+            self._paused = self._paused or should_pause
+
+        if schedule_flush:
+            self._host.execute(self._flush)
+        if should_pause:
+            self._protocol.pause_writing()
+
+    def get_write_buffer_size(self):
+        return self._buffer_size
+
+    def get_write_buffer_limits(self):
+        return (self._low_water, self._high_water)
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        """
+        Set the flow control limits of the outgoing queue.
+
+        Parameters
+        ----------
+        high : int, optional
+            size to pause the protocol at, by default 64 KiB
+        low : int, optional
+            size to resume the protocol at, by default high / 4
+        """
+        self._high_water = 64 * 1024 if high is None else high
+        self._low_water = self._high_water // 4 if low is None else low
+
+    def get_extra_info(self, name, default=None):
+        return self._extra.get(name, default)
+
+    def is_closing(self):
+        return self._closing
+
+    def close(self):
+        """Close the transport after the queued datagrams are sent."""
+        if self._closing:
+            return
+        self._closing = True
+        with self._lock:
+            schedule_flush = not self._flush_scheduled
+            self._flush_scheduled = True
+        if schedule_flush:
+            self._host.execute(self._flush)
+
+    def abort(self):
+        """Close the transport dropping the queued datagrams."""
+        self._drop_outgoing = True
+        self.close()
+
+    def _flush(self, host):
+        while True:
+            with self._lock:
+                if self._drop_outgoing:
+                    self._outgoing.clear()
+                    self._buffer_size = 0
+                if not self._outgoing:
+                    self._flush_scheduled = False
+                    break
+                payload, destination = self._outgoing[0]
+
+            try:
+                if destination is None:
+                    self._socket.send(payload)
+                else:
+                    self._socket.send_to(payload, *destination)
+            except exceptions.StackException as send_error:
+                if _is_out_of_memory(send_error):
+                    self._host.execute(self._flush, _RETRY_DELAY)
+                    return
+                self._loop.call_soon_threadsafe(
+                    self._protocol.error_received, send_error,
+                )
+
+            with self._lock:
+                self._outgoing.popleft()
+                self._buffer_size -= len(payload)
+                should_resume = (
+                    self._paused and self._buffer_size <= self._low_water
+                )
+                self._paused = self._paused and not should_resume
+            if should_resume:
+                self._loop.call_soon_threadsafe(
+                    self._protocol.resume_writing,
+                )
+
+        if self._closing and not self._closed:
+            self._closed = True
+            self._socket.close()
+            self._loop.call_soon_threadsafe(
+                self._protocol.connection_lost, None,
+            )
+
+    def _on_readable(self, udp_socket):
+        self._loop.call_soon_threadsafe(self._deliver_datagrams)
+
+    def _deliver_datagrams(self):
+        if self._closed:
+            return
+
+        datagrams = self._socket.recv_many(_RECV_BATCH)
+        for payload, ip_address, port in datagrams:
+            self._protocol.datagram_received(
+                bytes(payload),
+                (address_helpers.int_ip_to_string(ip_address.addr), port),
+            )
+        if self._socket.get_queued_datagrams():
+            self._loop.call_soon(self._deliver_datagrams)
+
+
+async def create_datagram_endpoint(
+    host, protocol_factory, local_addr=None, remote_addr=None,
+    recv_queue_size=1024,
+):
+    """
+    Create datagram endpoint on the emulated host.
+
+    The counterpart of loop.create_datagram_endpoint, the protocol
+    callbacks are invoked in the running loop.
+
+    Parameters
+    ----------
+    host : Host
+        emulated host
+    protocol_factory : callable
+        callable returning asyncio.DatagramProtocol
+    local_addr : tuple(string, int), optional
+        address to bind to, by default None (any address, port
+        assigned by the stack)
+    remote_addr : tuple(string, int), optional
+        remote end point to connect the socket to, by default None
+    recv_queue_size : int, optional
+        capacity of the socket receive queue, by default 1024
+
+    Returns
+    -------
+    tuple(LwipDatagramTransport, asyncio.DatagramProtocol)
+        transport and protocol
+    """
+    loop = asyncio.get_event_loop()
+    protocol = protocol_factory()
+
+    def make_transport(host):
+        udp_socket = host.get_stack().make_socket(SocketTypes.sock_dgram)
+        udp_socket.bind(local_addr or ('', 0))
+        return LwipDatagramTransport(
+            loop, host, udp_socket, protocol, remote_addr, recv_queue_size,
+        )
+
+    transport = await asyncio.wrap_future(host.execute(make_transport))
+    return (transport, protocol)
@@ -0,0 +1,468 @@
+"""
+asyncio streams on top of the lwip TCP socket.
+
+The transport lives in the asyncio event loop thread while the socket
+is serviced in the host thread. Data crosses the threads in large
+chunks: written data is accumulated and passed to the socket by a
+single host task, received data is pulled from the socket in chunks of
+up to _READ_CHUNK bytes.
+
+Flow control follows the stack buffers: the written data counts in the
+write buffer till the socket passes it to the stack send buffer, so
+StreamWriter.drain() waits for the acknowledgements of the peer. The
+joined chunk is owned by the transport, so it is passed to the stack
+without the copy (the socket pins it till the acknowledgement). The
+received data is pulled from the socket (and the receive window is
+opened) only while the StreamReader does not pause the transport, so
+the peer is throttled by the pace of the reader.
+"""
+import asyncio
+import collections
+import threading
+
+from lwip_py.stack import IpV4Addr, SocketTypes, exceptions
+
+_DEFAULT_LIMIT = 2 ** 16
+_READ_CHUNK = 256 * 1024
+
+_ERR_ABRT = -13
+_ERR_RST = -14
+
+_connection_errors = {
+    _ERR_ABRT: ConnectionAbortedError,
+    _ERR_RST: ConnectionResetError,
+}
+
+
+def _make_connection_error(error_code):
+    error_type = _connection_errors.get(error_code, ConnectionError)
+    return error_type(str(exceptions.LwipError(error_code)))
+
+
+class LwipStreamTransport(asyncio.Transport):
+    """Stream transport sending and receiving via lwip TCP socket."""
+
+    def __init__(self, loop, host, tcp_socket, protocol):
+        """
+        Initialize new transport.
+
+        The socket should be connected, the transport takes its
+        ownership. Should be created in the host context.
+
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop
+            loop to deliver protocol callbacks in
+        host : Host
+            host servicing the socket
+        tcp_socket : TcpSocket
+            connected socket
+        protocol : asyncio.Protocol
+            protocol to serve
+        """
+        super().__init__()
+        self._loop = loop
+        self._host = host
+        self._socket = tcp_socket
+        self._protocol = protocol
+        self._extra = {
+            'sockname': (
+                tcp_socket.get_local_address(), tcp_socket.get_local_port(),
+            ),
+            'peername': (
+                tcp_socket.get_remote_address(),
+                tcp_socket.get_remote_port(),
+            ),
+        }
+
+        self._lock = threading.Lock()
+        self._outgoing = collections.deque()
+        self._flush_scheduled = False
+        self._handed_over = 0
+        self._reported = 0
+        self._buffer_size = 0
+        self._writing_paused = False
+        self._closing = False
+        self._closed = False
+
+        self._reading_paused = False
+        self._pulling = False
+        self.set_write_buffer_limits()
+
+        tcp_socket.set_recv_callback(self._on_readable)
+        tcp_socket.set_sent_callback(self._on_sent)
+        tcp_socket.set_error_callback(self._on_error)
+        self._loop.call_soon_threadsafe(self._protocol.connection_made, self)
+        self._on_readable(tcp_socket)
+
+    def write(self, data):
+        """
+        Queue data to be sent.
+
+        Parameters
+        ----------
+        data : bytes_like
+            data to send
+        """
+        if self._closing:
+            raise RuntimeError('Transport is closing')
+        if not data:
+            return
+
+        payload = bytes(data)
+        self._buffer_size += len(payload)
+        should_pause = (
+            not self._writing_paused and self._buffer_size > self._high_water
+        )
+        with self._lock:
+            self._outgoing.append(payload)
+            schedule_flush = not self._flush_scheduled
+            self._flush_scheduled = True
+        if schedule_flush:
+            self._host.execute(self._flush)
+
+        if should_pause:
+            self._writing_paused = True
+            self._protocol.pause_writing()
+
+    def can_write_eof(self):
+        return False
+
+    def get_write_buffer_size(self):
+        return self._buffer_size
+
+    def get_write_buffer_limits(self):
+        return (self._low_water, self._high_water)
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        """
+        Set the flow control limits of the outgoing data.
+
+        Parameters
+        ----------
+        high : int, optional
+            size to pause the protocol at, by default 64 KiB
+        low : int, optional
+            size to resume the protocol at, by default high / 4
+        """
+        self._high_water = 64 * 1024 if high is None else high
+        self._low_water = self._high_water // 4 if low is None else low
+
+    def get_extra_info(self, name, default=None):
+        return self._extra.get(name, default)
+
+    def is_closing(self):
+        return self._closing
+
+    def is_reading(self):
+        return not self._reading_paused and not self._closing
+
+    def pause_reading(self):
+        """Stop pulling the received data (the window closes)."""
+        self._reading_paused = True
+
+    def resume_reading(self):
+        """Continue pulling the received data."""
+        if self._reading_paused:
+            self._reading_paused = False
+            self._host.execute(self._resume_pulling)
+
+    def close(self):
+        """Close the connection after the written data is sent."""
+        if self._closing:
+            return
+        self._closing = True
+        with self._lock:
+            schedule_flush = not self._flush_scheduled
+            self._flush_scheduled = True
+        if schedule_flush:
+            self._host.execute(self._flush)
+
+    def abort(self):
+        """Abort the connection dropping the written data."""
+        self._closing = True
+        self._host.execute(self._abort)
+
+    def _flush(self, host):
+        with self._lock:
+            chunks = list(self._outgoing)
+            self._outgoing.clear()
+            self._flush_scheduled = False
+
+        if chunks and not self._closed:
+            data_to_send = b''.join(chunks)
+            self._handed_over += len(data_to_send)
+            try:
+                self._socket.send(data_to_send, copy=False)
+            except exceptions.StackException as send_error:
+                # the pcb is still allocated, it is freed by the abort
+                self._socket.abort()
+                self._lose_connection(send_error)
+                return
+            self._report_accepted()
+
+        if self._closing and not self._closed:
+            self._closed = True
+            self._socket.close()
+            self._loop.call_soon_threadsafe(
+                self._protocol.connection_lost, None,
+            )
+
+    def _abort(self, host):
+        if not self._closed:
+            self._socket.abort()
+            self._lose_connection(None)
+
+    def _lose_connection(self, connection_error):
+        self._closed = True
+        self._closing = True
+        self._loop.call_soon_threadsafe(
+            self._protocol.connection_lost, connection_error,
+        )
+
+    def _report_accepted(self):
+        accepted = self._handed_over - self._socket.get_pending_bytes()
+        if accepted > self._reported:
+            self._loop.call_soon_threadsafe(
+                self._on_accepted, accepted - self._reported,
+            )
+            self._reported = accepted
+
+    def _on_accepted(self, size):
+        self._buffer_size -= size
+        if self._writing_paused and self._buffer_size <= self._low_water:
+            self._writing_paused = False
+            self._protocol.resume_writing()
+
+    def _on_sent(self, tcp_socket, length):
+        self._report_accepted()
+
+    def _on_error(self, tcp_socket, error_code):
+        if not self._closed:
+            self._lose_connection(_make_connection_error(error_code))
+
+    def _on_readable(self, tcp_socket):
+        if not self._pulling:
+            self._pull()
+
+    def _resume_pulling(self, host):
+        if not self._pulling:
+            self._pull()
+
+    def _pull(self):
+        if self._closed or self._reading_paused:
+            self._pulling = False
+            return
+
+        received_data = self._socket.recv(_READ_CHUNK)
+        self._pulling = received_data is not None
+        if received_data is not None:
+            self._loop.call_soon_threadsafe(self._deliver, received_data)
+
+    def _deliver(self, received_data):
+        if self._closed and not received_data:
+            return
+        if received_data:
+            self._protocol.data_received(received_data)
+            self._host.execute(self._continue_pulling)
+        else:
+            self._protocol.eof_received()
+
+    def _continue_pulling(self, host):
+        self._pull()
+
+
+class LwipStreamServer(object):
+    """Listening socket accepting connections into asyncio streams."""
+
+    def __init__(self, loop, host, client_connected_cb, limit):
+        """
+        Initialize new server.
+
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop
+            loop to run the client callbacks in
+        host : Host
+            host servicing the listening socket
+        client_connected_cb : callable
+            callable (or coroutine function) receiving reader and writer
+        limit : int
+            buffer limit of the StreamReader
+        """
+        self._loop = loop
+        self._host = host
+        self._client_connected_cb = client_connected_cb
+        self._limit = limit
+        self._socket = None
+        self._local_address = None
+        self._closed = loop.create_future()
+
+    def listen(self, host, local_addr, backlog):
+        """
+        Start listening, should be called in the host context.
+
+        Parameters
+        ----------
+        host : Host
+            host servicing the socket
+        local_addr : tuple(string, int)
+            address to listen on
+        backlog : int
+            maximum number of pending connections
+        """
+        self._socket = host.get_stack().make_socket(SocketTypes.sock_stream)
+        self._socket.bind(local_addr)
+        self._socket.listen(self._on_accepted, backlog)
+        self._local_address = (
+            self._socket.get_local_address(), self._socket.get_local_port(),
+        )
+
+    def get_local_address(self):
+        """
+        Return the address the server listens on.
+
+        Returns
+        -------
+        tuple(string, int)
+            ip address and port
+        """
+        return self._local_address
+
+    def is_serving(self):
+        return not self._closed.done()
+
+    def close(self):
+        """Stop accepting connections, accepted ones stay open."""
+        if self._closed.done():
+            return
+        self._host.execute(lambda host: self._socket.close())
+        self._closed.set_result(None)
+
+    async def wait_closed(self):
+        await asyncio.shield(self._closed)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+        await self.wait_closed()
+
+    def _on_accepted(self, tcp_socket):
+        self._loop.call_soon_threadsafe(self._start_client, tcp_socket)
+
+    def _start_client(self, tcp_socket):
+        if self._closed.done():
+            self._host.execute(lambda host: tcp_socket.abort())
+            return
+        reader = asyncio.StreamReader(limit=self._limit, loop=self._loop)
+        protocol = asyncio.StreamReaderProtocol(
+            reader, self._client_connected_cb, loop=self._loop,
+        )
+        self._host.execute(
+            lambda host: LwipStreamTransport(
+                self._loop, host, tcp_socket, protocol,
+            ),
+        )
+
+
+async def open_connection(host, remote_addr, limit=_DEFAULT_LIMIT):
+    """
+    Open the TCP connection from the emulated host.
+
+    The counterpart of asyncio.open_connection.
+
+    Parameters
+    ----------
+    host : Host
+        emulated host
+    remote_addr : tuple(string, int)
+        address to connect to
+    limit : int, optional
+        buffer limit of the StreamReader, by default 64 KiB
+
+    Returns
+    -------
+    tuple(asyncio.StreamReader, asyncio.StreamWriter)
+        streams of the connection
+
+    Raises
+    ------
+    ConnectionError
+        if the connection can not be established
+    """
+    loop = asyncio.get_event_loop()
+    connected = loop.create_future()
+
+    def on_connected(tcp_socket, error_code):
+        if not connected.done():
+            connected.set_result(error_code)
+
+    def connect(host):
+        tcp_socket = host.get_stack().make_socket(SocketTypes.sock_stream)
+        tcp_socket.set_error_callback(
+            lambda sock, error_code: loop.call_soon_threadsafe(
+                on_connected, sock, error_code,
+            ),
+        )
+        tcp_socket.connect(
+            IpV4Addr(remote_addr[0]),
+            remote_addr[1],
+            lambda sock, error_code: loop.call_soon_threadsafe(
+                on_connected, sock, error_code,
+            ),
+        )
+        return tcp_socket
+
+    tcp_socket = await asyncio.wrap_future(host.execute(connect))
+    error_code = await connected
+    if error_code == _ERR_RST:
+        raise ConnectionRefusedError(str(exceptions.LwipError(error_code)))
+    if error_code:
+        raise _make_connection_error(error_code)
+
+    reader = asyncio.StreamReader(limit=limit, loop=loop)
+    protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+    transport = await asyncio.wrap_future(
+        host.execute(
+            lambda host: LwipStreamTransport(loop, host, tcp_socket, protocol),
+        ),
+    )
+    writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+    return (reader, writer)
+
+
+async def start_server(
+    client_connected_cb, host, local_addr, limit=_DEFAULT_LIMIT, backlog=255,
+):
+    """
+    Start the TCP server on the emulated host.
+
+    The counterpart of asyncio.start_server, the callback is invoked in
+    the running loop for every accepted connection.
+
+    Parameters
+    ----------
+    client_connected_cb : callable
+        callable (or coroutine function) receiving reader and writer
+    host : Host
+        emulated host
+    local_addr : tuple(string, int)
+        address to listen on
+    limit : int, optional
+        buffer limit of the StreamReader, by default 64 KiB
+    backlog : int, optional
+        maximum number of pending connections, by default 255
+
+    Returns
+    -------
+    LwipStreamServer
+        listening server
+    """
+    loop = asyncio.get_event_loop()
+    server = LwipStreamServer(loop, host, client_connected_cb, limit)
+    await asyncio.wrap_future(
+        host.execute(lambda host: server.listen(host, local_addr, backlog)),
+    )
+    return server
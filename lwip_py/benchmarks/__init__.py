@@ -0,0 +1 @@
+"""Benchmarks of the emulated network (require built lwip libraries)."""
@@ -0,0 +1,128 @@
+"""
+Benchmark of asyncio UDP protocols running on the emulated hosts.
+
+Echo server and client are plain asyncio.DatagramProtocol classes, only
+the endpoints are created via lwip_py.aio.create_datagram_endpoint.
+The client keeps the given number of datagrams in flight and measures
+the echo rate.
+
+Usage:
+    python3 -m lwip_py.benchmarks.asyncio_udp -l lwip_lib/build/liblwip.so
+"""
+import argparse
+import asyncio
+import time
+
+from lwip_py.aio import create_datagram_endpoint
+from lwip_py.emulation import EthernetNetwork
+
+_SERVER = ('10.0.0.1', 7)
+
+
+class _EchoServer(asyncio.DatagramProtocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.transport.sendto(data, addr)
+
+
+class _EchoClient(asyncio.DatagramProtocol):
+    def __init__(self, datagrams, window, size):
+        self._datagrams = datagrams
+        self._window = window
+        self._payload = bytes(size)
+        self._sent = 0
+        self.received = 0
+        self.done = asyncio.get_event_loop().create_future()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        for _ in range(self._window):
+            self._send()
+
+    def datagram_received(self, data, addr):
+        self.received += 1
+        if self.received == self._datagrams:
+            self.done.set_result(None)
+        else:
+            self._send()
+
+    def _send(self):
+        if self._sent < self._datagrams:
+            self._sent += 1
+            self.transport.sendto(self._payload)
+
+
+async def _run(network, args):
+    await create_datagram_endpoint(
+        network.get_host('server'), _EchoServer, local_addr=('', _SERVER[1]),
+    )
+
+    started = time.perf_counter()
+    transport, client = await create_datagram_endpoint(
+        network.get_host('client'),
+        lambda: _EchoClient(args.datagrams, args.window, args.size),
+        remote_addr=_SERVER,
+    )
+    try:
+        await asyncio.wait_for(client.done, args.timeout)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - started
+    transport.close()
+    return (client.received, elapsed)
+
+
+def _parse_args():
+    arg_parser = argparse.ArgumentParser(
+        description='Measure asyncio UDP echo rate over lwip',
+    )
+    arg_parser.add_argument(
+        '-l',
+        '--lwip_lib',
+        help='path to lwip shared library',
+        default='lwip_lib/build/liblwip.so',
+    )
+    arg_parser.add_argument(
+        '-p', '--profile', help='lwip build profile', default=None,
+    )
+    arg_parser.add_argument(
+        '-n', '--datagrams', type=int, default=10000,
+        help='number of echoed datagrams',
+    )
+    arg_parser.add_argument(
+        '-w', '--window', type=int, default=8,
+        help='datagrams in flight',
+    )
+    arg_parser.add_argument(
+        '-s', '--size', type=int, default=64, help='datagram size',
+    )
+    arg_parser.add_argument(
+        '-t', '--timeout', type=float, default=60.0,
+        help='timeout in seconds',
+    )
+    return arg_parser.parse_args()
+
+
+def _main():
+    args = _parse_args()
+    network = EthernetNetwork(args.lwip_lib, default_profile=args.profile)
+    network.add_host('server', ('s.eth1', _SERVER[0], '255.255.255.0', ''))
+    network.add_host('client', ('c.eth1', '10.0.0.2', '255.255.255.0', ''))
+    network.start()
+    network.set_up_interfaces()
+    loop = asyncio.new_event_loop()
+    try:
+        received, elapsed = loop.run_until_complete(_run(network, args))
+    finally:
+        loop.close()
+        network.stop()
+
+    print('{0} of {1} datagrams echoed in {2:.3f}s: {3:.0f}/s'.format(
+        received, args.datagrams, elapsed, received / elapsed,
+    ))
+
+
+if __name__ == '__main__':
+    _main()
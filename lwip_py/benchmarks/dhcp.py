@@ -0,0 +1,167 @@
+"""
+Benchmark of the DHCP boot storm.
+
+For every network size the script creates the DHCP server host and the
+client hosts (dhcp build profile), starts the DHCP client on all of
+them at once and measures:
+    bound       number of the clients bound within the timeout
+    all bound   time from the start of the clients to the last bound
+                client (status callback of the interface)
+    leases/s    lease rate of the server (new leases per second)
+    discovers   DHCPDISCOVER messages received by the server (the
+                retransmissions of the clients included)
+    naks        DHCPNAK messages sent by the server
+
+Usage:
+    python3 -m lwip_py.benchmarks.dhcp -l lwip_lib/build/liblwip.so
+"""
+import argparse
+import threading
+import time
+
+from lwip_py.emulation import DhcpServer, EthernetNetwork
+from lwip_py.utility import lib_profiles
+
+_SERVER = ('dhcp_server', ('srv.eth1', '10.0.0.1', '255.0.0.0', ''))
+_POOL_START = '10.1.0.1'
+_ZERO_ADDRESS = '0.0.0.0'
+
+_HEADER_FORMAT = '{0:>8}{1:>8}{2:>14}{3:>12}{4:>12}{5:>8}'
+_ROW_FORMAT = '{0:>8}{1:>8}{2:>14.3f}{3:>12.0f}{4:>12}{5:>8}'
+
+
+class _BoundClients(object):
+    def __init__(self, clients):
+        self._clients = clients
+        self._lock = threading.Lock()
+        self._bound = set()
+        self.started = None
+        self.all_bound = None
+        self.completion = threading.Event()
+
+    def get_bound(self):
+        with self._lock:
+            return len(self._bound)
+
+    def on_status(self, net_if):
+        if net_if.get_address() == _ZERO_ADDRESS:
+            return
+        if net_if.get_name() == _SERVER[1][0]:
+            return
+        with self._lock:
+            self._bound.add(net_if.get_name())
+            if len(self._bound) == self._clients:
+                self.all_bound = time.perf_counter()
+                self.completion.set()
+
+
+def _client_interface(index):
+    # the network assigns the unique hardware address to the client
+    return ('c{0}.eth1'.format(index), _ZERO_ADDRESS, '', '')
+
+
+def _start_dhcp(host, interface_name):
+    host.get_interface(interface_name).start_dhcp()
+
+
+def _run(path_to_lwip_lib, clients, args):
+    network = EthernetNetwork(
+        path_to_lwip_lib, default_profile=args.profile,
+    )
+    network.add_host(*_SERVER)
+    for index in range(clients):
+        network.add_host(
+            'client{0}'.format(index), _client_interface(index),
+        )
+    bound_clients = _BoundClients(clients)
+    network.set_status_callbacks(bound_clients.on_status, lambda _: None)
+    network.start()
+    network.set_up_interfaces()
+
+    try:
+        server = DhcpServer(
+            network.get_host(_SERVER[0]),
+            _SERVER[1][1],
+            _SERVER[1][2],
+            _POOL_START,
+            clients,
+            lease_time=args.lease_time,
+        )
+        bound_clients.started = time.perf_counter()
+        started_clients = [
+            network.get_host('client{0}'.format(index)).execute(
+                lambda host, name=_client_interface(index)[0]: _start_dhcp(
+                    host, name,
+                ),
+            )
+            for index in range(clients)
+        ]
+        for started_client in started_clients:
+            started_client.result()
+
+        bound_clients.completion.wait(args.timeout)
+        statistics = server.get_statistics()
+    finally:
+        network.stop()
+
+    all_bound = float('nan')
+    if bound_clients.all_bound is not None:
+        all_bound = bound_clients.all_bound - bound_clients.started
+    return (
+        bound_clients.get_bound(),
+        all_bound,
+        statistics.lease_rate,
+        statistics.discovers,
+        statistics.naks,
+    )
+
+
+def _parse_args():
+    arg_parser = argparse.ArgumentParser(
+        description='Measure the DHCP boot storm of the emulated network',
+    )
+    arg_parser.add_argument(
+        '-l',
+        '--lwip_lib',
+        help='path to the default lwip shared library',
+        default='lwip_lib/build/liblwip.so',
+    )
+    arg_parser.add_argument(
+        '-n',
+        '--clients',
+        help='network sizes (number of DHCP clients) to measure',
+        type=int,
+        nargs='+',
+        default=[10, 100, 1000],
+    )
+    arg_parser.add_argument(
+        '-p',
+        '--profile',
+        help='build profile of the hosts (built with DHCP)',
+        choices=lib_profiles.PROFILES,
+        default='dhcp',
+    )
+    arg_parser.add_argument(
+        '-e', '--lease_time', type=int, default=3600,
+        help='lease time in seconds',
+    )
+    arg_parser.add_argument(
+        '-t', '--timeout', type=float, default=120.0,
+        help='time to wait for all clients to be bound in seconds',
+    )
+    return arg_parser.parse_args()
+
+
+def _main():
+    args = _parse_args()
+    print(_HEADER_FORMAT.format(
+        'clients', 'bound', 'all bound s', 'leases/s', 'discovers', 'naks',
+    ))
+    for clients in args.clients:
+        print(_ROW_FORMAT.format(
+            clients, *_run(args.lwip_lib, clients, args),
+        ))
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,202 @@
+"""
+Benchmark comparing the lwip build profiles.
+
+For every profile which library is built the script creates two-host
+network and measures:
+    startup     time to load the libraries and set up the interfaces
+    round trip  UDP ping-pong exchange rate (datagrams per second)
+    burst       one-way UDP throughput with the given datagram size
+
+Usage:
+    python3 -m lwip_py.benchmarks.profiles -l lwip_lib/build/liblwip.so
+"""
+import argparse
+import os
+import threading
+import time
+
+from lwip_py.emulation import EthernetNetwork
+from lwip_py.stack import IpV4Addr, SocketTypes, exceptions
+from lwip_py.utility import get_profile_library_path, lib_profiles
+
+_PEER_ONE = ('peer_one', ('p1.eth1', '127.3.2.1', '255.255.255.0', ''))
+_PEER_TWO = ('peer_two', ('p2.eth1', '127.3.2.2', '255.255.255.0', ''))
+_PORT = 1000
+
+
+class _PingPong(object):
+    def __init__(self, round_trips):
+        self._round_trips = round_trips
+        self.counter = 0
+        self.completion = threading.Event()
+
+    def start_echo(self, host):
+        self._echo_socket = host.get_stack().make_socket(
+            SocketTypes.sock_dgram,
+        )
+        self._echo_socket.bind(('', _PORT))
+        self._echo_socket.set_recv_callback(
+            lambda sock, data, address, port: sock.send_to(
+                data, address, port,
+            ),
+        )
+
+    def start_client(self, host):
+        self._client_socket = host.get_stack().make_socket(
+            SocketTypes.sock_dgram,
+        )
+        self._client_socket.bind(('', _PORT + 1))
+        self._client_socket.set_recv_callback(self._on_reply)
+        self._send()
+
+    def _on_reply(self, sock, data, address, port):
+        self.counter += 1
+        if self.counter >= self._round_trips:
+            self.completion.set()
+        else:
+            self._send()
+
+    def _send(self):
+        self._client_socket.send_to(
+            bytes(32), IpV4Addr('127.3.2.1'), _PORT,
+        )
+
+
+class _Burst(object):
+    def __init__(self, datagrams, datagram_size):
+        self._datagrams = datagrams
+        self._payload = bytes(datagram_size)
+        self.received = 0
+        self.sent = 0
+        self.last_received_time = None
+
+    def start_sink(self, host):
+        self._sink_socket = host.get_stack().make_socket(
+            SocketTypes.sock_dgram,
+        )
+        self._sink_socket.bind(('', _PORT + 2))
+        self._sink_socket.set_recv_callback(self._on_datagram)
+
+    def send(self, host):
+        source_socket = host.get_stack().make_socket(SocketTypes.sock_dgram)
+        source_socket.bind(('', _PORT + 3))
+        destination = IpV4Addr('127.3.2.1')
+        for _ in range(self._datagrams):
+            try:
+                source_socket.send_to(self._payload, destination, _PORT + 2)
+            except exceptions.StackException:
+                continue
+            self.sent += 1
+
+    def wait_for_completion(self, poll_interval=0.1):
+        received = -1
+        while received != self.received and self.received < self.sent:
+            received = self.received
+            time.sleep(poll_interval)
+
+    def _on_datagram(self, sock, data, address, port):
+        self.received += 1
+        self.last_received_time = time.perf_counter()
+
+
+def _run_profile(path_to_lwip_lib, profile, args):
+    started = time.perf_counter()
+    network = EthernetNetwork(path_to_lwip_lib, default_profile=profile)
+    network.add_host(*_PEER_ONE)
+    network.add_host(*_PEER_TWO)
+    network.start()
+    network.set_up_interfaces()
+    startup = time.perf_counter() - started
+
+    peer_one = network.get_host('peer_one')
+    peer_two = network.get_host('peer_two')
+    try:
+        ping_pong = _PingPong(args.round_trips)
+        peer_one.execute(ping_pong.start_echo).result()
+        started = time.perf_counter()
+        peer_two.execute(ping_pong.start_client).result()
+        ping_pong.completion.wait(args.timeout)
+        round_trip_rate = ping_pong.counter / (time.perf_counter() - started)
+
+        burst = _Burst(args.datagrams, args.size)
+        peer_one.execute(burst.start_sink).result()
+        started = time.perf_counter()
+        peer_two.execute(burst.send).result()
+        burst.wait_for_completion()
+        elapsed = (burst.last_received_time or time.perf_counter()) - started
+    finally:
+        network.stop()
+
+    return (
+        startup,
+        round_trip_rate,
+        burst.received / elapsed,
+        burst.received * args.size / elapsed / 1e6,
+        args.datagrams - burst.received,
+    )
+
+
+def _parse_args():
+    arg_parser = argparse.ArgumentParser(
+        description='Compare lwip build profiles',
+    )
+    arg_parser.add_argument(
+        '-l',
+        '--lwip_lib',
+        help='path to the default lwip shared library',
+        default='lwip_lib/build/liblwip.so',
+    )
+    arg_parser.add_argument(
+        '-p',
+        '--profiles',
+        help='profiles to compare',
+        nargs='+',
+        choices=lib_profiles.PROFILES,
+        default=list(lib_profiles.PROFILES),
+    )
+    arg_parser.add_argument(
+        '-r', '--round_trips', type=int, default=2000,
+        help='number of UDP round trips',
+    )
+    arg_parser.add_argument(
+        '-n', '--datagrams', type=int, default=5000,
+        help='number of datagrams in the burst',
+    )
+    arg_parser.add_argument(
+        '-s', '--size', type=int, default=1024,
+        help='size of the burst datagram',
+    )
+    arg_parser.add_argument(
+        '-t', '--timeout', type=float, default=60.0,
+        help='timeout of the single measurement in seconds',
+    )
+    return arg_parser.parse_args()
+
+
+def _main():
+    args = _parse_args()
+    print('{0:<12}{1:>12}{2:>14}{3:>14}{4:>10}{5:>8}'.format(
+        'profile', 'startup ms', 'round trip/s', 'burst dgr/s', 'MB/s', 'lost',
+    ))
+    for profile in args.profiles:
+        if not os.path.exists(
+            get_profile_library_path(args.lwip_lib, profile),
+        ):
+            print('{0:<12} not built'.format(profile))
+            continue
+
+        startup, round_trip_rate, burst_rate, throughput, lost = (
+            _run_profile(args.lwip_lib, profile, args)
+        )
+        print('{0:<12}{1:>12.1f}{2:>14.0f}{3:>14.0f}{4:>10.2f}{5:>8}'.format(
+            profile,
+            startup * 1000,
+            round_trip_rate,
+            burst_rate,
+            throughput,
+            lost,
+        ))
+
+
+if __name__ == '__main__':
+    _main()
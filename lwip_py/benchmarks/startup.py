@@ -0,0 +1,111 @@
+"""
+Benchmark of the emulated network startup.
+
+For every network size the script measures:
+    load        loading of the library instances only
+    add hosts   EthernetNetwork.add_host (load, lwip_init, netif_add)
+    start       start of the host threads and interfaces bring-up
+    stop        stop of the network
+
+Usage:
+    python3 -m lwip_py.benchmarks.startup -l lwip_lib/build/liblwip.so
+"""
+import argparse
+import time
+
+from lwip_py.emulation import EthernetNetwork
+from lwip_py.utility import MultiInstanceLibraryLoader
+
+_HEADER_FORMAT = '{0:>6}{1:>12}{2:>14}{3:>12}{4:>12}{5:>16}'
+_ROW_FORMAT = '{0:>6}{1:>12.3f}{2:>14.3f}{3:>12.3f}{4:>12.3f}{5:>16.3f}'
+
+
+def _measure(action):
+    started = time.perf_counter()
+    action()
+    return time.perf_counter() - started
+
+
+def _load_instances(path_to_lwip_lib, hosts, directory):
+    loader = MultiInstanceLibraryLoader(path_to_lwip_lib, directory)
+    return [loader() for _ in range(hosts)]
+
+
+def _add_hosts(network, hosts):
+    for index in range(hosts):
+        network.add_host(
+            'host{0}'.format(index),
+            (
+                'h{0}.eth1'.format(index),
+                '10.{0}.{1}.{2}'.format(
+                    index >> 16, (index >> 8) & 0xFF, (index & 0xFF) + 1,
+                ),
+                '255.0.0.0',
+                '',
+            ),
+        )
+
+
+def _run(path_to_lwip_lib, hosts, directory):
+    load = _measure(
+        lambda: _load_instances(path_to_lwip_lib, hosts, directory),
+    )
+
+    network = EthernetNetwork(path_to_lwip_lib)
+    add_hosts = _measure(lambda: _add_hosts(network, hosts))
+
+    def start():
+        network.start()
+        network.set_up_interfaces()
+
+    return (load, add_hosts, _measure(start), _measure(network.stop))
+
+
+def _parse_args():
+    arg_parser = argparse.ArgumentParser(
+        description='Measure startup time of the emulated network',
+    )
+    arg_parser.add_argument(
+        '-l',
+        '--lwip_lib',
+        help='path to lwip shared library',
+        default='lwip_lib/build/liblwip.so',
+    )
+    arg_parser.add_argument(
+        '-n',
+        '--hosts',
+        help='network sizes to measure',
+        type=int,
+        nargs='+',
+        default=[10, 100, 1000],
+    )
+    arg_parser.add_argument(
+        '-d',
+        '--directory',
+        help='directory for the library copies (default /dev/shm)',
+        default=None,
+    )
+    return arg_parser.parse_args()
+
+
+def _main():
+    args = _parse_args()
+    print(_HEADER_FORMAT.format(
+        'hosts', 'load s', 'add hosts s', 'start s', 'stop s', 'per host ms',
+    ))
+    for hosts in args.hosts:
+        load, add_hosts, start, stop = _run(
+            args.lwip_lib, hosts, args.directory,
+        )
+        print(_ROW_FORMAT.format(
+            hosts,
+            load,
+            add_hosts,
+            start,
+            stop,
+            (add_hosts + start) / hosts * 1000,
+        ))
+
+
+if __name__ == '__main__':
+    _main()
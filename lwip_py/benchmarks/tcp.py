@@ -0,0 +1,439 @@
+"""
+TCP benchmark of the lwip build profiles.
+
+For every profile which library is built the script creates a network
+of one server host and N client hosts, every client opens M flows to
+the server and measures:
+    goodput          payload delivered to the server per second (bulk
+                     transfer of the given size over every flow)
+    cpu per byte     process CPU time spent per delivered byte
+    retransmissions  TCP data segments seen on the bus again (the
+                     sequence range was already transmitted)
+    connection rate  connections opened and closed per second (the
+                     given number of connections per client, the given
+                     number of them in progress at once)
+
+The TCP related options of every library (TCP_MSS, TCP_WND, TCP_SND_BUF,
+pool sizes, see Stack.get_tcp_config) are reported along with the
+results. The results can be written as JSON to compare the runs (e.g.
+before and after lwipopts.h changes).
+
+The number of flows is limited by the pools of the profile (debug
+profile has MEMP_NUM_TCP_PCB 4).
+
+Usage:
+    python3 -m lwip_py.benchmarks.tcp -l lwip_lib/build/liblwip.so \\
+        -p release -n 2 -m 4 -o tcp_results.json
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+
+from lwip_py.emulation import EthernetNetwork
+from lwip_py.stack import IpV4Addr, SocketTypes, exceptions
+from lwip_py.utility import get_profile_library_path, lib_profiles
+
+_SERVER_IP = '10.0.0.1'
+_BULK_PORT = 5001
+_CHURN_PORT = 5002
+
+_ETHERNET_HEADER_SIZE = 14
+_ETHERTYPE_IPV4 = 0x0800
+_IP_PROTO_TCP = 6
+_SEQUENCE_MODULUS = 2 ** 32
+
+_ethertype = struct.Struct('!H')
+_ipv4 = struct.Struct('!BxH5xB2x4s4s')
+_tcp = struct.Struct('!HHI4xB')
+
+
+class _SegmentCounter(object):
+    """Bus observer counting the retransmitted TCP data segments."""
+
+    def __init__(self):
+        self._highest_ends = {}
+        self.segments = 0
+        self.retransmissions = 0
+
+    def __call__(self, netif, frame, was_forwarded):
+        if len(frame) < _ETHERNET_HEADER_SIZE + _ipv4.size + _tcp.size:
+            return
+        if _ethertype.unpack_from(frame, 12)[0] != _ETHERTYPE_IPV4:
+            return
+        version_ihl, total_length, protocol, src_ip, dst_ip = (
+            _ipv4.unpack_from(frame, _ETHERNET_HEADER_SIZE)
+        )
+        if protocol != _IP_PROTO_TCP:
+            return
+
+        ip_header_size = (version_ihl & 0x0F) * 4
+        src_port, dst_port, sequence, data_offset = _tcp.unpack_from(
+            frame, _ETHERNET_HEADER_SIZE + ip_header_size,
+        )
+        payload_size = total_length - ip_header_size - (data_offset >> 4) * 4
+        if payload_size <= 0:
+            return
+
+        self.segments += 1
+        flow = (src_ip, dst_ip, src_port, dst_port)
+        end = (sequence + payload_size) % _SEQUENCE_MODULUS
+        highest_end = self._highest_ends.get(flow)
+        if highest_end is not None:
+            advance = (end - highest_end) % _SEQUENCE_MODULUS
+            if not advance or advance >= _SEQUENCE_MODULUS // 2:
+                self.retransmissions += 1
+                return
+        self._highest_ends[flow] = end
+
+
+class _Sink(object):
+    """Server side: accepts the connections and drains the data."""
+
+    def __init__(self, expected_bytes=None):
+        self._expected_bytes = expected_bytes
+        self._sockets = set()
+        self.received = 0
+        self.last_received_time = None
+        self.completion = threading.Event()
+
+    def listen(self, host, port):
+        self._listener = host.get_stack().make_socket(SocketTypes.sock_stream)
+        self._listener.bind(('', port))
+        self._listener.listen(self._on_accepted)
+
+    def close(self, host):
+        self._listener.close()
+        for tcp_socket in self._sockets:
+            tcp_socket.abort()
+        self._sockets.clear()
+
+    def _on_accepted(self, tcp_socket):
+        self._sockets.add(tcp_socket)
+        tcp_socket.set_recv_callback(self._on_readable)
+        tcp_socket.set_error_callback(self._on_error)
+        self._on_readable(tcp_socket)
+
+    def _on_readable(self, tcp_socket):
+        received_data = tcp_socket.recv()
+        while received_data:
+            self.received += len(received_data)
+            received_data = tcp_socket.recv()
+
+        if received_data is not None:
+            self._sockets.discard(tcp_socket)
+            tcp_socket.close()
+        if self._expected_bytes is not None:
+            self.last_received_time = time.perf_counter()
+            if self.received >= self._expected_bytes:
+                self.completion.set()
+
+    def _on_error(self, tcp_socket, error_code):
+        self._sockets.discard(tcp_socket)
+
+
+class _BulkSender(object):
+    """Client side: sends the given amount of data over one flow."""
+
+    def __init__(self, payload, flow_size, zero_copy):
+        self._payload = memoryview(payload)
+        self._remaining = flow_size
+        self._zero_copy = zero_copy
+        self.error = None
+
+    def start(self, host):
+        self._socket = host.get_stack().make_socket(SocketTypes.sock_stream)
+        self._socket.set_sent_callback(self._on_sent)
+        self._socket.set_error_callback(self._on_error)
+        self._socket.connect(
+            IpV4Addr(_SERVER_IP), _BULK_PORT, self._on_connected,
+        )
+
+    def _on_connected(self, tcp_socket, error_code):
+        if error_code:
+            self.error = error_code
+        else:
+            self._fill()
+
+    def _on_sent(self, tcp_socket, length):
+        self._fill()
+
+    def _on_error(self, tcp_socket, error_code):
+        self.error = error_code
+
+    def _fill(self):
+        chunk_size = len(self._payload)
+        while self._remaining and self._socket.get_pending_bytes() == 0:
+            size = min(self._remaining, chunk_size)
+            self._socket.send(self._payload[:size], copy=not self._zero_copy)
+            self._remaining -= size
+        if not self._remaining:
+            self._socket.close()
+
+
+class _ConnectionChurn(object):
+    """Client side: opens and closes connections one after another."""
+
+    def __init__(self, connections):
+        self._to_start = connections
+        self._in_progress = 0
+        self._sockets = set()
+        self.completed = 0
+        self.failed = 0
+        self.completion = threading.Event()
+
+    def start(self, host, concurrency):
+        self._host = host
+        for _ in range(concurrency):
+            self._start_next()
+        if not self._in_progress:
+            self.completion.set()
+
+    def _start_next(self):
+        if not self._to_start:
+            return
+        self._to_start -= 1
+        self._in_progress += 1
+        tcp_socket = self._host.get_stack().make_socket(
+            SocketTypes.sock_stream,
+        )
+        self._sockets.add(tcp_socket)
+        tcp_socket.set_error_callback(self._on_error)
+        try:
+            tcp_socket.connect(
+                IpV4Addr(_SERVER_IP), _CHURN_PORT, self._on_connected,
+            )
+        except exceptions.StackException:
+            tcp_socket.abort()
+            self._finish(tcp_socket, failed=True)
+
+    def _on_connected(self, tcp_socket, error_code):
+        if not error_code:
+            tcp_socket.close()
+        self._finish(tcp_socket, failed=bool(error_code))
+
+    def _on_error(self, tcp_socket, error_code):
+        self._finish(tcp_socket, failed=True)
+
+    def _finish(self, tcp_socket, failed):
+        if tcp_socket not in self._sockets:
+            return
+        self._sockets.discard(tcp_socket)
+        self._in_progress -= 1
+        if failed:
+            self.failed += 1
+        else:
+            self.completed += 1
+        self._start_next()
+        if not self._in_progress:
+            self.completion.set()
+
+
+def _client_name(index):
+    return 'client{0}'.format(index)
+
+
+def _make_network(path_to_lwip_lib, profile, clients):
+    network = EthernetNetwork(path_to_lwip_lib, default_profile=profile)
+    network.add_host(
+        'server', ('srv.eth1', _SERVER_IP, '255.255.0.0', ''),
+    )
+    for index in range(clients):
+        network.add_host(
+            _client_name(index),
+            (
+                'c{0}.eth1'.format(index),
+                '10.0.{0}.{1}'.format(1 + index // 250, 1 + index % 250),
+                '255.255.0.0',
+                '',
+            ),
+        )
+    network.start()
+    network.set_up_interfaces()
+    return network
+
+
+def _measure_bulk(network, args):
+    segment_counter = _SegmentCounter()
+    network.get_ethernet_bus().add_observer(segment_counter)
+
+    server = network.get_host('server')
+    expected_bytes = args.clients * args.flows * args.flow_size
+    sink = _Sink(expected_bytes)
+    server.execute(lambda host: sink.listen(host, _BULK_PORT)).result()
+
+    payload = bytes(args.chunk)
+    senders = []
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    for index in range(args.clients):
+        host = network.get_host(_client_name(index))
+        for _ in range(args.flows):
+            sender = _BulkSender(payload, args.flow_size, args.zero_copy)
+            senders.append(sender)
+            host.execute(sender.start)
+    sink.completion.wait(args.timeout)
+    cpu_time = time.process_time() - cpu_started
+    elapsed = (sink.last_received_time or time.perf_counter()) - started
+    server.execute(sink.close).result()
+
+    received = sink.received
+    return {
+        'bytes': received,
+        'expected_bytes': expected_bytes,
+        'elapsed_s': elapsed,
+        'goodput_mbit_s': received * 8 / elapsed / 1e6,
+        'cpu_ns_per_byte': cpu_time * 1e9 / received if received else None,
+        'segments': segment_counter.segments,
+        'retransmissions': segment_counter.retransmissions,
+        'failed_flows': sum(sender.error is not None for sender in senders),
+    }
+
+
+def _measure_connection_rate(network, args):
+    server = network.get_host('server')
+    sink = _Sink()
+    server.execute(lambda host: sink.listen(host, _CHURN_PORT)).result()
+
+    churns = []
+    started = time.perf_counter()
+    for index in range(args.clients):
+        churn = _ConnectionChurn(args.connections)
+        churns.append(churn)
+        network.get_host(_client_name(index)).execute(
+            lambda host, churn=churn: churn.start(host, args.concurrency),
+        )
+    deadline = started + args.timeout
+    for churn in churns:
+        churn.completion.wait(max(0, deadline - time.perf_counter()))
+    elapsed = time.perf_counter() - started
+    server.execute(sink.close).result()
+
+    completed = sum(churn.completed for churn in churns)
+    return {
+        'connections': completed,
+        'failed_connections': sum(churn.failed for churn in churns),
+        'elapsed_s': elapsed,
+        'connections_per_s': completed / elapsed,
+    }
+
+
+def _run_profile(path_to_lwip_lib, profile, args):
+    network = _make_network(path_to_lwip_lib, profile, args.clients)
+    try:
+        tcp_config = network.get_host('server').execute(
+            lambda host: host.get_stack().get_tcp_config(),
+        ).result()
+        bulk = _measure_bulk(network, args)
+        connection_rate = None
+        if args.connections:
+            connection_rate = _measure_connection_rate(network, args)
+    finally:
+        network.stop()
+
+    return {
+        'profile': profile,
+        'tcp_config': tcp_config._asdict(),
+        'bulk': bulk,
+        'connection_rate': connection_rate,
+    }
+
+
+def _parse_args():
+    arg_parser = argparse.ArgumentParser(
+        description='Measure TCP performance of lwip build profiles',
+    )
+    arg_parser.add_argument(
+        '-l',
+        '--lwip_lib',
+        help='path to the default lwip shared library',
+        default='lwip_lib/build/liblwip.so',
+    )
+    arg_parser.add_argument(
+        '-p',
+        '--profiles',
+        help='profiles to compare',
+        nargs='+',
+        choices=lib_profiles.PROFILES,
+        default=list(lib_profiles.PROFILES),
+    )
+    arg_parser.add_argument(
+        '-n', '--clients', type=int, default=2,
+        help='number of client hosts',
+    )
+    arg_parser.add_argument(
+        '-m', '--flows', type=int, default=1,
+        help='number of bulk flows per client host',
+    )
+    arg_parser.add_argument(
+        '-b', '--flow_size', type=int, default=4 * 1024 * 1024,
+        help='bytes sent over every bulk flow',
+    )
+    arg_parser.add_argument(
+        '-s', '--chunk', type=int, default=64 * 1024,
+        help='size of the data passed to the socket at once',
+    )
+    arg_parser.add_argument(
+        '-z', '--zero_copy', action='store_true',
+        help='send without the copy into the lwip heap',
+    )
+    arg_parser.add_argument(
+        '-c', '--connections', type=int, default=200,
+        help='connections opened by every client host (0 to skip)',
+    )
+    arg_parser.add_argument(
+        '-w', '--concurrency', type=int, default=1,
+        help='connections in progress per client host',
+    )
+    arg_parser.add_argument(
+        '-t', '--timeout', type=float, default=60.0,
+        help='timeout of the single measurement in seconds',
+    )
+    arg_parser.add_argument(
+        '-o', '--output', help='path of the JSON results file',
+    )
+    return arg_parser.parse_args()
+
+
+def _main():
+    args = _parse_args()
+    results = []
+    print('{0:<12}{1:>12}{2:>12}{3:>10}{4:>12}'.format(
+        'profile', 'Mbit/s', 'ns/byte', 'rexmit', 'conn/s',
+    ))
+    for profile in args.profiles:
+        if not os.path.exists(
+            get_profile_library_path(args.lwip_lib, profile),
+        ):
+            print('{0:<12} not built'.format(profile))
+            continue
+
+        result = _run_profile(args.lwip_lib, profile, args)
+        results.append(result)
+        bulk = result['bulk']
+        connection_rate = result['connection_rate'] or {}
+        print('{0:<12}{1:>12.1f}{2:>12.1f}{3:>10}{4:>12.0f}'.format(
+            profile,
+            bulk['goodput_mbit_s'],
+            bulk['cpu_ns_per_byte'] or 0,
+            bulk['retransmissions'],
+            connection_rate.get('connections_per_s', 0),
+        ))
+
+    if args.output:
+        parameters = {
+            name: value for name, value in vars(args).items()
+            if name not in {'lwip_lib', 'output', 'profiles'}
+        }
+        with open(args.output, 'w') as output_file:
+            json.dump(
+                {'parameters': parameters, 'results': results},
+                output_file,
+                indent=2,
+            )
+
+
+if __name__ == '__main__':
+    _main()
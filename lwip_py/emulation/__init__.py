@@ -1,5 +1,16 @@
+from lwip_py.emulation.dhcp_server import DhcpServer
 from lwip_py.emulation.ethernet_bus import EthernetBus
 from lwip_py.emulation.ethernet_network import EthernetNetwork
 from lwip_py.emulation.host import Host
+from lwip_py.emulation.packet_generator import PacketCounter, PacketGenerator
+from lwip_py.emulation.ping_sweep import ping_sweep
 
-__all__ = ['EthernetBus', 'EthernetNetwork', 'Host']
+__all__ = [
+    'DhcpServer',
+    'EthernetBus',
+    'EthernetNetwork',
+    'Host',
+    'PacketCounter',
+    'PacketGenerator',
+    'ping_sweep',
+]
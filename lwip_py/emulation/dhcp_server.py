@@ -0,0 +1,405 @@
+"""
+DHCP server running on the emulated host.
+
+The server (RFC 2131, the subset used by the lwIP client) leases the
+addresses of a contiguous pool to the clients of the host subnet. It is
+driven by the datagrams received on the host, so it serves any number
+of clients at once. The replies to the clients without an address are
+broadcast to the subnet. The server counts the messages and records the
+time of every acknowledged lease, so the lease rate of a boot storm can
+be measured.
+
+The host of the server should use the dhcp build profile: the stacks
+built without DHCP drop the requests sent from 0.0.0.0.
+"""
+import collections
+import socket
+import struct
+import time
+
+from lwip_py.stack import IpV4Addr, SocketTypes
+
+SERVER_PORT = 67
+CLIENT_PORT = 68
+
+_BOOTREQUEST = 1
+_BOOTREPLY = 2
+_HTYPE_ETHERNET = 1
+_MAGIC_COOKIE = b'\x63\x82\x53\x63'
+_HEADER = struct.Struct('!BBBBIHH4s4s4s4s16s64s128s4s')
+_ZERO_ADDRESS = bytes(4)
+
+_DHCPDISCOVER = 1
+_DHCPOFFER = 2
+_DHCPREQUEST = 3
+_DHCPDECLINE = 4
+_DHCPACK = 5
+_DHCPNAK = 6
+_DHCPRELEASE = 7
+
+_OPTION_PAD = 0
+_OPTION_SUBNET_MASK = 1
+_OPTION_ROUTER = 3
+_OPTION_DNS_SERVER = 6
+_OPTION_REQUESTED_IP = 50
+_OPTION_LEASE_TIME = 51
+_OPTION_MESSAGE_TYPE = 53
+_OPTION_SERVER_ID = 54
+_OPTION_RENEWAL_TIME = 58
+_OPTION_REBINDING_TIME = 59
+_OPTION_END = 255
+
+# time the offered address is kept for the client in seconds
+_OFFER_TIMEOUT = 10
+
+DhcpServerStatistics = collections.namedtuple(
+    'DhcpServerStatistics',
+    [
+        'discovers',
+        'offers',
+        'requests',
+        'acks',
+        'naks',
+        'declines',
+        'releases',
+        'leases',
+        'time_to_leases',
+        'lease_rate',
+    ],
+)
+DhcpServerStatistics.__doc__ = """
+Statistics of the DHCP server.
+
+discovers       number of the received DHCPDISCOVER messages
+offers          number of the sent DHCPOFFER messages
+requests        number of the received DHCPREQUEST messages
+acks            number of the sent DHCPACK messages
+naks            number of the sent DHCPNAK messages
+declines        number of the received DHCPDECLINE messages
+releases        number of the received DHCPRELEASE messages
+leases          number of the clients holding the acknowledged lease
+time_to_leases  time from the first request to the last new lease in
+                seconds (None if nothing is leased)
+lease_rate      new leases per second over time_to_leases
+"""
+
+
+class _Lease(object):
+    def __init__(self, address, expires):
+        self.address = address
+        self.expires = expires
+        self.bound = False
+
+
+def _parse_options(options_data):
+    options = {}
+    index = 0
+    while index < len(options_data):
+        code = options_data[index]
+        if code == _OPTION_END:
+            break
+        if code == _OPTION_PAD:
+            index += 1
+            continue
+        if index + 1 >= len(options_data):
+            break
+        length = options_data[index + 1]
+        options[code] = bytes(options_data[index + 2:index + 2 + length])
+        index += 2 + length
+    return options
+
+
+def _encode_option(code, value_data):
+    return bytes((code, len(value_data))) + value_data
+
+
+def _address_to_int(address):
+    return int.from_bytes(address, 'big')
+
+
+def _int_to_address(address_int):
+    return address_int.to_bytes(4, 'big')
+
+
+class DhcpServer(object):
+    """
+    DHCP server leasing the addresses of the pool.
+
+    The leases are kept per client hardware address: the client gets
+    the same address again while its lease is not expired.
+    """
+
+    def __init__(
+        self,
+        host,
+        server_address,
+        netmask,
+        pool_start,
+        pool_size,
+        router=None,
+        dns_server=None,
+        lease_time=3600,
+    ):
+        """
+        Start the server on the host.
+
+        Parameters
+        ----------
+        host : Host
+            host to run the server on
+        server_address : string
+            address of the host interface serving the clients
+        netmask : string
+            network mask of the served subnet
+        pool_start : string
+            first address of the pool
+        pool_size : int
+            number of the addresses in the pool
+        router : string, optional
+            default gateway offered to the clients, by default None
+        dns_server : string, optional
+            DNS server offered to the clients, by default None
+        lease_time : int, optional
+            lease time in seconds, by default 3600
+        """
+        self._host = host
+        self._server_id = socket.inet_aton(server_address)
+        self._netmask = socket.inet_aton(netmask)
+        self._broadcast = IpV4Addr(socket.inet_ntoa(_int_to_address(
+            _address_to_int(self._server_id)
+            | (~_address_to_int(self._netmask) & 0xFFFFFFFF),
+        )))
+        self._lease_time = lease_time
+
+        first_address = _address_to_int(socket.inet_aton(pool_start))
+        self._free = collections.deque(
+            _int_to_address(first_address + index)
+            for index in range(pool_size)
+        )
+        self._leases = {}
+        self._received = collections.Counter()
+        self._sent = collections.Counter()
+        self._new_leases = 0
+        self._first_request = None
+        self._last_lease = None
+
+        self._options = _encode_option(_OPTION_SERVER_ID, self._server_id)
+        self._options += _encode_option(_OPTION_SUBNET_MASK, self._netmask)
+        self._options += b''.join(
+            _encode_option(code, struct.pack('!I', seconds))
+            for code, seconds in (
+                (_OPTION_LEASE_TIME, lease_time),
+                (_OPTION_RENEWAL_TIME, lease_time // 2),
+                (_OPTION_REBINDING_TIME, lease_time * 7 // 8),
+            )
+        )
+        if router:
+            self._options += _encode_option(
+                _OPTION_ROUTER, socket.inet_aton(router),
+            )
+        if dns_server:
+            self._options += _encode_option(
+                _OPTION_DNS_SERVER, socket.inet_aton(dns_server),
+            )
+
+        self._socket = host.execute(self._make_socket).result()
+
+    def get_statistics(self):
+        """
+        Return statistics of the server.
+
+        Returns
+        -------
+        DhcpServerStatistics
+            message counters and lease rate
+        """
+        return self._host.execute(
+            lambda host: self._get_statistics(),
+        ).result()
+
+    def get_leases(self):
+        """
+        Return the acknowledged leases.
+
+        Returns
+        -------
+        dict(bytes, string)
+            leased addresses indexed by the client hardware addresses
+        """
+        return self._host.execute(
+            lambda host: {
+                hwaddr: socket.inet_ntoa(lease.address)
+                for hwaddr, lease in self._leases.items()
+                if lease.bound
+            },
+        ).result()
+
+    def close(self):
+        """Stop the server."""
+        self._host.execute(lambda host: self._socket.close()).result()
+
+    def _make_socket(self, host):
+        server_socket = host.get_stack().make_socket(SocketTypes.sock_dgram)
+        server_socket.bind(('', SERVER_PORT))
+        server_socket.set_recv_callback(self._on_datagram)
+        return server_socket
+
+    def _get_statistics(self):
+        time_to_leases = None
+        lease_rate = 0.0
+        if self._last_lease is not None:
+            time_to_leases = self._last_lease - self._first_request
+            if time_to_leases:
+                lease_rate = self._new_leases / time_to_leases
+        return DhcpServerStatistics(
+            self._received[_DHCPDISCOVER],
+            self._sent[_DHCPOFFER],
+            self._received[_DHCPREQUEST],
+            self._sent[_DHCPACK],
+            self._sent[_DHCPNAK],
+            self._received[_DHCPDECLINE],
+            self._received[_DHCPRELEASE],
+            sum(lease.bound for lease in self._leases.values()),
+            time_to_leases,
+            lease_rate,
+        )
+
+    def _on_datagram(self, server_socket, payload, ip_address, port):
+        if len(payload) < _HEADER.size:
+            return
+        fields = _HEADER.unpack_from(payload)
+        (
+            op, htype, hlen, _, xid, _, flags,
+            ciaddr, _, _, giaddr, chaddr, _, _, cookie,
+        ) = fields
+        if (
+            op != _BOOTREQUEST
+            or htype != _HTYPE_ETHERNET
+            or cookie != _MAGIC_COOKIE
+        ):
+            return
+
+        options = _parse_options(payload[_HEADER.size:])
+        message_type = options.get(_OPTION_MESSAGE_TYPE)
+        if not message_type:
+            return
+        message_type = message_type[0]
+        hwaddr = chaddr[:hlen]
+        now = time.monotonic()
+        if self._first_request is None:
+            self._first_request = now
+        self._received[message_type] += 1
+
+        request = (xid, flags, ciaddr, giaddr, chaddr)
+        if message_type == _DHCPDISCOVER:
+            self._on_discover(request, hwaddr, options, now)
+        elif message_type == _DHCPREQUEST:
+            self._on_request(request, hwaddr, options, now)
+        elif message_type == _DHCPDECLINE:
+            self._on_decline(hwaddr, options)
+        elif message_type == _DHCPRELEASE:
+            self._on_release(hwaddr)
+
+    def _on_discover(self, request, hwaddr, options, now):
+        lease = self._leases.get(hwaddr)
+        if lease is None or (not lease.bound and lease.expires <= now):
+            address = self._allocate(
+                options.get(_OPTION_REQUESTED_IP), now,
+            )
+            if address is None:
+                return
+            if lease is not None:
+                self._free.append(lease.address)
+            lease = _Lease(address, now + _OFFER_TIMEOUT)
+            self._leases[hwaddr] = lease
+        self._reply(request, _DHCPOFFER, lease.address)
+
+    def _on_request(self, request, hwaddr, options, now):
+        _, _, ciaddr, _, _ = request
+        server_id = options.get(_OPTION_SERVER_ID)
+        lease = self._leases.get(hwaddr)
+        if server_id is not None and server_id != self._server_id:
+            # the client has chosen the offer of another server
+            if lease is not None and not lease.bound:
+                self._release_lease(hwaddr)
+            return
+
+        requested = options.get(_OPTION_REQUESTED_IP, ciaddr)
+        if lease is None or lease.address != requested:
+            self._reply(request, _DHCPNAK, _ZERO_ADDRESS)
+            return
+
+        if not lease.bound:
+            lease.bound = True
+            self._new_leases += 1
+            self._last_lease = now
+        lease.expires = now + self._lease_time
+        self._reply(request, _DHCPACK, lease.address)
+
+    def _on_decline(self, hwaddr, options):
+        lease = self._leases.get(hwaddr)
+        if lease is not None and lease.address == options.get(
+            _OPTION_REQUESTED_IP,
+        ):
+            # the address is used by another host, it is not leased again
+            del self._leases[hwaddr]
+
+    def _on_release(self, hwaddr):
+        if hwaddr in self._leases:
+            self._release_lease(hwaddr)
+
+    def _release_lease(self, hwaddr):
+        self._free.append(self._leases.pop(hwaddr).address)
+
+    def _allocate(self, requested, now):
+        if not self._free:
+            self._reclaim_expired(now)
+        if not self._free:
+            return None
+        if requested is not None and requested in self._free:
+            self._free.remove(requested)
+            return requested
+        return self._free.popleft()
+
+    def _reclaim_expired(self, now):
+        expired = [
+            hwaddr for hwaddr, lease in self._leases.items()
+            if lease.expires <= now
+        ]
+        for hwaddr in expired:
+            self._release_lease(hwaddr)
+
+    def _reply(self, request, message_type, yiaddr):
+        xid, flags, ciaddr, giaddr, chaddr = request
+        reply = _HEADER.pack(
+            _BOOTREPLY,
+            _HTYPE_ETHERNET,
+            6,
+            0,
+            xid,
+            0,
+            flags,
+            ciaddr if message_type != _DHCPNAK else _ZERO_ADDRESS,
+            yiaddr,
+            _ZERO_ADDRESS,
+            giaddr,
+            chaddr,
+            bytes(64),
+            bytes(128),
+            _MAGIC_COOKIE,
+        )
+        reply += _encode_option(_OPTION_MESSAGE_TYPE, bytes((message_type,)))
+        if message_type == _DHCPNAK:
+            reply += _encode_option(_OPTION_SERVER_ID, self._server_id)
+        else:
+            reply += self._options
+        reply += bytes((_OPTION_END,))
+
+        if message_type != _DHCPNAK and ciaddr != _ZERO_ADDRESS:
+            destination = IpV4Addr(socket.inet_ntoa(ciaddr))
+        else:
+            # the client has no address yet, the subnet broadcast reaches
+            # it without the default interface on the server host
+            destination = self._broadcast
+        self._socket.send_to(reply, destination, CLIENT_PORT)
+        self._sent[message_type] += 1
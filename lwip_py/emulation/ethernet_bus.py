@@ -1,6 +1,9 @@
 import threading
 
-from lwip_py.utility import SingleThreadExecutor
+from lwip_py.utility import SingleThreadExecutor, checksums
+
+_BROADCAST_HWADDR = b'\xff' * 6
+_MULTICAST_BIT = 0x01
 
 
 class EthernetBus(object):
@@ -10,6 +13,15 @@ class EthernetBus(object):
     The class provides possibility to register observers that will be
     triggered if data is forwarded via bus.
 
+    Multicast frames are delivered only to the interfaces that are
+    members of the destination multicast address
+    (NetIf.is_multicast_member), so the hosts that did not join the
+    group do not process them.
+
+    Frames sent by the interfaces with the checksum offload carry no
+    checksums, they are completed (once per frame, only when needed)
+    for the receiving interfaces without the offload and the observers
+    requesting the checksums.
     """
 
     def __init__(self, *interfaces):
@@ -32,7 +44,7 @@ class EthernetBus(object):
         self._task_queue = SingleThreadExecutor()
         self._task_thread = threading.Thread(target=self._task_queue.run)
 
-    def add_observer(self, observer_to_add):
+    def add_observer(self, observer_to_add, fill_checksums=False):
         """
         Add observer to react on data transmission.
 
@@ -44,8 +56,12 @@ class EthernetBus(object):
         ----------
         observer : executable
             executable that wil be invoked when the bus forwards data
+        fill_checksums : bool, optional
+            should the observer receive the frames sent with the
+            checksum offload with the checksums computed, by default
+            False
         """
-        self._observers.append(observer_to_add)
+        self._observers.append((observer_to_add, fill_checksums))
 
     def add_filter(self, filter_to_add):
         """
@@ -79,6 +95,23 @@ class EthernetBus(object):
         self._interfaces.append((interface, on_data_callback))
         interface.set_output_callbacks(self.get_output_callback())
 
+    def replace_interface(self, old_interface, new_interface):
+        """
+        Replace the interface connected to the bus.
+
+        The callback registered for the old interface is kept.
+
+        Parameters
+        ----------
+        old_interface : NetIf
+            connected interface
+        new_interface : NetIf
+            interface to connect instead
+        """
+        for index, (interface, callback) in enumerate(self._interfaces):
+            if interface is old_interface:
+                self._interfaces[index] = (new_interface, callback)
+
     def broadcast(self, netif_from, data_to_broadcast):
         """
         Forward data to all interfaces connected to the bus.
@@ -129,10 +162,46 @@ class EthernetBus(object):
             map(lambda fi: fi(netif_from, data_to_broadcast), self._filters),
         ) if self._filters else True
 
-        for observer in self._observers:
-            observer(netif_from, data_to_broadcast, should_forward)
+        frame = _Frame(data_to_broadcast, netif_from.is_checksum_offloaded())
+        for observer, fill_checksums in self._observers:
+            observer(
+                netif_from, frame.get(fill_checksums), should_forward,
+            )
+
+        if not should_forward:
+            return
 
-        if should_forward:
+        destination = bytes(data_to_broadcast[:6])
+        if (
+            destination[:1] and destination[0] & _MULTICAST_BIT
+            and destination != _BROADCAST_HWADDR
+        ):
             for interface, callback in self._interfaces:
-                if interface != netif_from:
-                    callback(interface, data_to_broadcast)
+                if interface != netif_from and (
+                    interface.is_multicast_member(destination)
+                ):
+                    callback(interface, frame.get_for(interface))
+            return
+
+        for interface, callback in self._interfaces:
+            if interface != netif_from:
+                callback(interface, frame.get_for(interface))
+
+
+class _Frame(object):
+    """Frame on the bus, the checksums are computed on first request."""
+
+    def __init__(self, data, without_checksums):
+        self._data = data
+        self._without_checksums = without_checksums
+        self._data_with_checksums = None
+
+    def get(self, with_checksums):
+        if not (with_checksums and self._without_checksums):
+            return self._data
+        if self._data_with_checksums is None:
+            self._data_with_checksums = checksums.fill_checksums(self._data)
+        return self._data_with_checksums
+
+    def get_for(self, interface):
+        return self.get(not interface.is_checksum_offloaded())
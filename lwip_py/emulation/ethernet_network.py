@@ -1,8 +1,23 @@
 """Model of a primitive ethernet network."""
+import collections
+
 from lwip_py.emulation.ethernet_bus import EthernetBus
 from lwip_py.emulation.host import Host
 from lwip_py.stack import Stack
-from lwip_py.utility import MultiInstanceLibraryLoader
+from lwip_py.stack.pbuf_tracker import PbufTracker
+from lwip_py.utility import (
+    MultiInstanceLibraryLoader,
+    address_helpers,
+    get_profile_library_path,
+)
+
+
+def _get_network(interface):
+    address = address_helpers.int_ip_from_string(interface[1])
+    mask = interface[2] if len(interface) > 2 and interface[2] else None
+    if mask is None:
+        return None
+    return address & address_helpers.int_ip_from_string(mask)
 
 
 class EthernetNetwork(object):
@@ -13,14 +28,57 @@ class EthernetNetwork(object):
     to configure them.
     """
 
-    def __init__(self, path_to_lwip_lib):
+    def __init__(
+        self,
+        path_to_lwip_lib,
+        default_profile=None,
+        track_pbufs=False,
+        lazy_hosts=False,
+        checksum_offload=False,
+        static_arp=False,
+    ):
+        """
+        Initialize new network.
+
+        Parameters
+        ----------
+        path_to_lwip_lib : string
+            path to the default lwip library (liblwip.so), libraries of
+            the other build profiles are expected in the same folder
+        default_profile : string, optional
+            build profile of the hosts added without explicit profile,
+            by default None (debug profile, liblwip.so)
+        track_pbufs : bool, optional
+            track the pbufs owned by the python code on every host and
+            report leaks when the host is stopped, by default False
+        lazy_hosts : bool, optional
+            materialize the hosts (library load, stack init, thread
+            start) only when they are used, by default False
+        checksum_offload : bool, optional
+            skip the checksum generation and checking on the interfaces
+            of the hosts which library supports it (release profile),
+            the bus completes the checksums for the other interfaces,
+            by default False
+        static_arp : bool, optional
+            add the neighbours of every host into its ARP table as static
+            entries when the interfaces are set up, so no ARP requests
+            are flooded at startup (a quarter of ARP_TABLE_SIZE of the
+            host library is kept for the dynamic entries, the neighbours
+            not fitting the rest are skipped), by default False
+        """
         self._path_to_lwip_lib = path_to_lwip_lib
+        self._default_profile = default_profile
+        self._track_pbufs = track_pbufs
+        self._lazy_hosts = lazy_hosts
+        self._checksum_offload = checksum_offload
+        self._static_arp = static_arp
+        self._address_plan = []
         self._ethernet_bus = EthernetBus()
         self._hosts = {}
         self._status_callback = None
         self._link_callback = None
 
-    def add_host(self, host_name, *host_interfaces):
+    def add_host(self, host_name, *host_interfaces, profile=None, lazy=None):
         """
         Add new network interface.
 
@@ -28,11 +86,25 @@ class EthernetNetwork(object):
         ----------
         host_name : string
             interface name
-        host_interfaces : enumerable(name, address, mask, gateway)
-            interface parameters
+        host_interfaces : enumerable(name, address, mask, gateway, hwaddr)
+            interface parameters (see Host.add_network_interface)
+        profile : string, optional
+            build profile of the host lwip library (see lib_profiles),
+            by default None (network default profile)
+        lazy : bool, optional
+            materialize the host when it first receives a frame addressed
+            to it or executes an action, by default None (network
+            setting)
         """
-        stack = Stack(MultiInstanceLibraryLoader(self._path_to_lwip_lib))
-        host = Host(stack)
+        path_to_lib = get_profile_library_path(
+            self._path_to_lwip_lib, profile or self._default_profile,
+        )
+        stack = Stack(
+            MultiInstanceLibraryLoader(path_to_lib),
+            PbufTracker() if self._track_pbufs else None,
+        )
+        host = Host(stack, self._lazy_hosts if lazy is None else lazy)
+        host.set_materialization_callback(self._on_host_materialized)
 
         for interface in host_interfaces:
             new_interface = host.add_network_interface(*interface)
@@ -43,6 +115,14 @@ class EthernetNetwork(object):
             self._ethernet_bus.add_interface(
                 new_interface, host.on_incoming_data,
             )
+            if host.is_materialized():
+                self._configure_checksum_offload(new_interface)
+            self._address_plan.append((
+                host_name,
+                _get_network(interface),
+                new_interface.get_address(),
+                new_interface.get_hwaddr(),
+            ))
 
         self._hosts[host_name] = host
 
@@ -67,9 +147,45 @@ class EthernetNetwork(object):
             host.stop()
 
     def set_up_interfaces(self):
+        if self._static_arp:
+            self._set_static_arp_entries()
         for host in self._hosts.values():
             host.set_up_interfaces(True)
 
+    def take_snapshot(self):
+        """Take snapshot of the stack state on every host."""
+        for host in self._hosts.values():
+            host.take_snapshot()
+
+    def reset(self):
+        """Reset every host to its last snapshot."""
+        for host in self._hosts.values():
+            host.reset()
+
+    def _set_static_arp_entries(self):
+        host_networks = collections.defaultdict(set)
+        network_entries = collections.defaultdict(list)
+        for host_name, network, address, hwaddr in self._address_plan:
+            host_networks[host_name].add(network)
+            network_entries[network].append((host_name, address, hwaddr))
+
+        for host_name, host in self._hosts.items():
+            host.set_static_arp_entries(
+                (address, hwaddr)
+                for network in host_networks[host_name]
+                for peer, address, hwaddr in network_entries[network]
+                if peer != host_name
+            )
+
+    def _on_host_materialized(self, host, interfaces):
+        for declared_interface, interface in interfaces:
+            self._ethernet_bus.replace_interface(declared_interface, interface)
+            self._configure_checksum_offload(interface)
+
+    def _configure_checksum_offload(self, interface):
+        if self._checksum_offload and interface.supports_checksum_offload():
+            interface.set_checksum_offload(True)
+
     def _internal_status_callback(self, net_if):
         if self._status_callback:
             self._status_callback(net_if)
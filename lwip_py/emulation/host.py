@@ -5,12 +5,83 @@ Provides single threaded execution context in which accesses to stack
 should be done.
 
 Emulates deployment model intended for no-OS integration, where single
-processing thread is used.
+processing thread is used. The lwip timers are serviced periodically in
+the same thread.
+
+A host can be created lazily: the interfaces are declared with their
+addresses, but the library is loaded, initialized and the thread is
+started only when the host is first used (frame addressed to it is
+received or an action is executed).
 """
+import itertools
+import socket
 import threading
+import warnings
 
+from lwip_py.stack.exceptions import StackException
 from lwip_py.stack.ip_address import IpV4Addr
-from lwip_py.utility import scheduler
+from lwip_py.utility import address_helpers, scheduler
+
+_BROADCAST_HWADDR = b'\xff' * 6
+_ARP_ETHERTYPE = b'\x08\x06'
+_ARP_TARGET_IP = slice(38, 42)
+_TIMEOUTS_PERIOD = 0.05
+_ZERO_ADDRESS = '0.0.0.0'
+# part of the ARP table kept for the dynamic entries (1 / share)
+_ARP_DYNAMIC_SHARE = 4
+
+# indexes of the hardware addresses of the interfaces without address,
+# shared by all hosts, so the addresses are unique on any bus
+_unaddressed_interfaces = itertools.count()
+
+
+class _DeclaredInterface(object):
+    """
+    Interface of the host that is not materialized yet.
+
+    The object stands for the network interface till the host is
+    materialized, the configured callbacks are then passed to the real
+    interface.
+    """
+
+    def __init__(self, name, address, mask, gateway, hwaddr):
+        self.parameters = (name, address, mask, gateway, hwaddr)
+        self.ip_address = socket.inet_aton(address)
+        self.hwaddr = bytes(hwaddr)
+        self.output_callbacks = None
+        self.status_callbacks = None
+        self.interface = None
+
+    def get_name(self):
+        return self.parameters[0]
+
+    def get_address(self):
+        return self.parameters[1]
+
+    def get_hwaddr(self):
+        return self.hwaddr
+
+    def set_output_callbacks(self, link_output, output=None):
+        self.output_callbacks = (link_output, output)
+
+    def set_status_callbacks(self, status_callback, link_callback):
+        self.status_callbacks = (status_callback, link_callback)
+
+    def is_multicast_member(self, hwaddr):
+        return False
+
+    def is_checksum_offloaded(self):
+        return False
+
+    def is_addressed_by(self, frame):
+        destination = bytes(frame[:6])
+        if destination == self.hwaddr:
+            return True
+        return (
+            destination == _BROADCAST_HWADDR
+            and frame[12:14] == _ARP_ETHERTYPE
+            and frame[_ARP_TARGET_IP] == self.ip_address
+        )
 
 
 class Host(object):
@@ -22,7 +93,7 @@ class Host(object):
     host.
     """
 
-    def __init__(self, stack):
+    def __init__(self, stack, lazy=False):
         """
         Initialize new Host object.
 
@@ -30,17 +101,37 @@ class Host(object):
         ----------
         stack : Stack
             network stack instance
+        lazy : bool, optional
+            postpone the stack initialization till the host is used,
+            by default False
         """
         self._stack = stack
         self._task_queue = scheduler.SingleThreadExecutor()
         self._working_thread = threading.Thread(target=self._task_queue.run)
+        self._snapshot = None
+        self._timeouts_task = None
+
+        self._materialization_lock = threading.Lock()
+        self._materialized = not lazy
+        self._materialization_callback = None
+        self._declared_interfaces = []
+        self._started = False
+        self._interfaces_up = False
+        self._static_arp_entries = []
 
-        self._stack.init()
+        if self._materialized:
+            self._stack.init()
 
-    def add_network_interface(self, name, address, mask=None, gateway=None):
+    def add_network_interface(
+        self, name, address, mask=None, gateway=None, hwaddr=None,
+    ):
         """
         Create new network interface for the host.
 
+        If the host is not materialized yet the interface is only
+        declared, the returned object accepts output and status
+        callbacks which are passed to the interface when it is created.
+
         Parameters
         ----------
         name : string
@@ -51,19 +142,108 @@ class Host(object):
             network mask, by default None
         gateway : string, optional
             ip address of the default gateway, by default None
+        hwaddr : tuple, optional
+            6-byte hardware address, by default None (derived from the
+            ip address, the interfaces with the address 0.0.0.0, e.g.
+            DHCP clients, get the unique one from
+            address_helpers.hwaddr_from_index)
 
         Returns
         -------
         NetIf
             new network interface
         """
+        if not hwaddr:
+            if address == _ZERO_ADDRESS:
+                hwaddr = address_helpers.hwaddr_from_index(
+                    next(_unaddressed_interfaces),
+                )
+            else:
+                hwaddr = address_helpers.hwaddr_from_ip_string(address)
+        with self._materialization_lock:
+            if not self._materialized:
+                declared_interface = _DeclaredInterface(
+                    name, address, mask, gateway, hwaddr,
+                )
+                self._declared_interfaces.append(declared_interface)
+                return declared_interface
+
+        return self._make_interface(name, address, mask, gateway, hwaddr)
+
+    def set_materialization_callback(self, callback):
+        """
+        Set callback invoked when the lazy host is materialized.
+
+        Callback receives the host and list of tuples (declared
+        interface, created NetIf).
+
+        Parameters
+        ----------
+        callback : callable
+            the callback function
+        """
+        self._materialization_callback = callback
+
+    def is_materialized(self):
+        """
+        Check if the stack of the host is initialized.
+
+        Returns
+        -------
+        bool
+            False for the lazy host that was not used yet
+        """
+        return self._materialized
+
+    def materialize(self):
+        """
+        Initialize the stack of the lazy host.
+
+        The library is loaded, the declared interfaces are created and
+        the host state (interfaces up, thread started) follows the calls
+        made before. Does nothing if the host is already materialized.
+        """
+        if self._materialized:
+            return
+
+        with self._materialization_lock:
+            if self._materialized:
+                return
+
+            self._stack.init()
+            created_interfaces = []
+            for declared_interface in self._declared_interfaces:
+                interface = self._make_interface(
+                    *declared_interface.parameters,
+                )
+                if declared_interface.status_callbacks:
+                    interface.set_status_callbacks(
+                        *declared_interface.status_callbacks,
+                    )
+                if declared_interface.output_callbacks:
+                    interface.set_output_callbacks(
+                        *declared_interface.output_callbacks,
+                    )
+                declared_interface.interface = interface
+                created_interfaces.append((declared_interface, interface))
+
+            if self._interfaces_up:
+                self._set_up_interfaces()
+            self._materialized = True
+
+            if self._materialization_callback:
+                self._materialization_callback(self, created_interfaces)
+            if self._started:
+                self._start_working_thread()
+
+    def _make_interface(self, name, address, mask, gateway, hwaddr):
         interface_ip = IpV4Addr(address)
         network_mask = IpV4Addr(mask) if mask else None
         gateway = IpV4Addr(gateway) if gateway else None
 
         interface = self._stack.make_interface(name)
         interface.set_name(b'In')
-        interface.add(interface_ip, network_mask, gateway)
+        interface.add(interface_ip, network_mask, gateway, hwaddr)
 
         interface.set_etharp_flag()
 
@@ -82,27 +262,131 @@ class Host(object):
         sync : bool, optional
             should operation be syncronized, by default False
         """
+        with self._materialization_lock:
+            if not self._materialized:
+                self._interfaces_up = True
+                return
+
         task = self._task_queue.schedule_delayed(
             scheduler.IMMEDIATE, scheduler.TOP_PRIO, self._set_up_interfaces,
         )
         if sync:
             task.result()
 
+    def set_static_arp_entries(self, entries):
+        """
+        Set the neighbours added into the ARP table as static entries.
+
+        The entries are added when the interfaces are set up, so the
+        first packets to the neighbours are sent without ARP resolution.
+        The static entries are never evicted, so a quarter of the ARP
+        table (at least one entry) is kept for the dynamic ones: the
+        entries not fitting the rest of the table are skipped. The
+        skipped entries and the entries that can not be added are
+        reported via RuntimeWarning.
+
+        Parameters
+        ----------
+        entries : iterable[tuple(string, bytes)]
+            ip addresses and hardware addresses of the neighbours
+        """
+        self._static_arp_entries = list(entries)
+
     def start(self):
         """
         Start handling of the stack activities on the host.
 
         The thread responsible for execution in the host context
-        will be started
+        will be started (when the lazy host is materialized)
         """
-        self._working_thread.start()
+        with self._materialization_lock:
+            self._started = True
+            if self._materialized:
+                self._start_working_thread()
 
     def stop(self):
-        """Stop handling of the networking activities on the host."""
+        """
+        Stop handling of the networking activities on the host.
+
+        If pbuf tracking is enabled the pbufs still owned by the python
+        code are reported as leaks via ResourceWarning.
+        """
+        with self._materialization_lock:
+            self._started = False
+            if not self._materialized:
+                return
+
+        if self._timeouts_task is not None:
+            self._timeouts_task.cancel()
         self._task_queue.stop(sync=True)
-        self._working_thread.join()
+        if self._working_thread.is_alive():
+            self._working_thread.join()
+
+        tracker = self._stack.get_pbuf_tracker()
+        if tracker is not None and tracker.get_outstanding():
+            warnings.warn(
+                'pbufs leaked on host ({0}):\n{1}'.format(
+                    ', '.join(self._stack.get_interfaces()),
+                    tracker.format_report(),
+                ),
+                ResourceWarning,
+            )
+
+    def get_outstanding_pbufs(self):
+        """
+        Return pbufs currently owned by the python code.
+
+        Returns
+        -------
+        list[OutstandingPbuf]
+            outstanding buffers (empty if pbuf tracking is not enabled)
+        """
+        tracker = self._stack.get_pbuf_tracker()
+        if tracker is None:
+            return []
+        return tracker.get_outstanding()
+
+    def take_snapshot(self):
+        """
+        Take snapshot of the stack state.
+
+        Typically taken after the interfaces bring-up to return the host
+        into this state later via reset.
+
+        Returns
+        -------
+        StackSnapshot
+            taken snapshot
+        """
+        self.materialize()
+        self._snapshot = self._execute_sync(self._stack.take_snapshot)
+        return self._snapshot
+
+    def reset(self, stack_snapshot=None):
+        """
+        Reset the stack state to the snapshot.
+
+        The state is restored in place without the library reload. The
+        traffic to the host should be quiesced, objects created after
+        the snapshot (sockets, ping clients) must not be used anymore.
+
+        Parameters
+        ----------
+        stack_snapshot : StackSnapshot, optional
+            snapshot to restore, by default None (last taken snapshot)
+
+        Raises
+        ------
+        ValueError
+            if no snapshot was taken
+        """
+        stack_snapshot = stack_snapshot or self._snapshot
+        if stack_snapshot is None:
+            raise ValueError('No snapshot to reset the host to')
+        self._execute_sync(self._stack.restore_snapshot, stack_snapshot)
 
     def get_stack(self):
+        self.materialize()
         return self._stack
 
     def get_interface(self, name):
@@ -119,6 +403,7 @@ class Host(object):
         NetIf
             requested network interface
         """
+        self.materialize()
         return self._stack.get_interfaces()[name]
 
     def on_incoming_data(self, interface, incoming_data):
@@ -132,6 +417,14 @@ class Host(object):
         incoming_data : arraylike
             data to forward
         """
+        if isinstance(interface, _DeclaredInterface):
+            if not self._materialized and not interface.is_addressed_by(
+                incoming_data,
+            ):
+                return
+            self.materialize()
+            interface = interface.interface
+
         self._task_queue.schedule_delayed(
             scheduler.IMMEDIATE,
             scheduler.TOP_PRIO,
@@ -153,11 +446,79 @@ class Host(object):
         future
             future for the scheduled task
         """
+        self.materialize()
         return self._task_queue.schedule_delayed(
             delay, scheduler.TOP_PRIO, action, self,
         )
 
+    def _start_working_thread(self):
+        self._schedule_timeouts()
+        self._working_thread.start()
+
+    def _schedule_timeouts(self):
+        try:
+            self._timeouts_task = self._task_queue.schedule_delayed(
+                _TIMEOUTS_PERIOD, scheduler.TOP_PRIO, self._service_timeouts,
+            )
+        except scheduler.Stopped:
+            self._timeouts_task = None
+
+    def _service_timeouts(self):
+        # lwip timers (TCP retransmission, ARP, IGMP) are driven here
+        self._stack.service_timeouts()
+        self._schedule_timeouts()
+
+    def _execute_sync(self, action, *args):
+        if not self._working_thread.is_alive():
+            return action(*args)
+        return self._task_queue.schedule_delayed(
+            scheduler.IMMEDIATE, scheduler.TOP_PRIO, action, *args,
+        ).result()
+
     def _set_up_interfaces(self):
         for inf in self._stack.get_interfaces().values():
             inf.set_link_up()
             inf.set_up()
+        self._add_static_arp_entries()
+
+    def _add_static_arp_entries(self):
+        if not self._static_arp_entries:
+            return
+
+        entries = self._static_arp_entries
+        table_size = self._stack.get_arp_table_size()
+        if table_size is not None:
+            static_slots = table_size - max(
+                1, table_size // _ARP_DYNAMIC_SHARE,
+            )
+            if len(entries) > static_slots:
+                warnings.warn(
+                    '{0} static ARP entries skipped on host ({1}), the '
+                    'ARP table of {2} entries keeps {3} for the static '
+                    'ones, first: {4}'.format(
+                        len(entries) - static_slots,
+                        ', '.join(self._stack.get_interfaces()),
+                        table_size,
+                        static_slots,
+                        entries[static_slots][0],
+                    ),
+                    RuntimeWarning,
+                )
+                entries = entries[:static_slots]
+
+        failed = []
+        for ip_address, hwaddr in entries:
+            try:
+                self._stack.add_static_arp_entry(ip_address, hwaddr)
+            except StackException as add_error:
+                failed.append((ip_address, add_error))
+        if failed:
+            warnings.warn(
+                '{0} static ARP entries not added on host ({1}), '
+                'first: {2} ({3})'.format(
+                    len(failed),
+                    ', '.join(self._stack.get_interfaces()),
+                    *failed[0],
+                ),
+                RuntimeWarning,
+            )
@@ -0,0 +1,243 @@
+"""
+Packet generator and counter over the emulated network.
+
+The generator sends custom IP payloads from the host at the target
+rate via the raw socket. The packets are prepared once from the
+templates, every tick of the generator sends the packets due since the
+start in batches, each batch is a single call into the library. The
+counter consumes and counts the packets of the protocol on the
+receiving host without calling into python per packet.
+"""
+import collections
+import concurrent.futures
+import itertools
+import time
+
+from lwip_py.stack import IpV4Addr, SocketTypes
+from lwip_py.stack.raw_socket import PacketBatch
+
+# IP protocol number reserved for experimentation (RFC 3692)
+EXPERIMENTAL_PROTOCOL = 253
+
+GeneratorStatistics = collections.namedtuple(
+    'GeneratorStatistics', ['sent', 'failed', 'duration', 'rate'],
+)
+GeneratorStatistics.__doc__ = """
+Statistics of the packet generator.
+
+sent      number of the packets passed to the interface
+failed    number of the packets the stack failed to send (e.g. ERR_MEM)
+duration  time since the start in seconds
+rate      achieved send rate in packets per second
+"""
+
+
+class PacketGenerator(object):
+    """
+    Sender of the IP payloads at the target rate.
+
+    The templates are sent in turn: every batch continues with the
+    template following the last one sent. The rate is kept on average:
+    the packets not sent in time (the host is busy) are sent on the next
+    tick.
+    """
+
+    def __init__(
+        self,
+        host,
+        destination,
+        templates,
+        rate,
+        protocol=EXPERIMENTAL_PROTOCOL,
+        batch_size=64,
+        count=None,
+        duration=None,
+        tick=0.001,
+    ):
+        """
+        Initialize new generator.
+
+        Parameters
+        ----------
+        host : Host
+            host to send from
+        destination : string
+            ip address of the receiving host
+        templates : iterable[bytes]
+            IP payloads to send
+        rate : float
+            target rate in packets per second
+        protocol : int, optional
+            IP protocol number, by default EXPERIMENTAL_PROTOCOL
+        batch_size : int, optional
+            maximum number of packets sent in one library call, by
+            default 64
+        count : int, optional
+            number of packets to send, by default None (no limit)
+        duration : float, optional
+            time to send in seconds, by default None (no limit)
+        tick : float, optional
+            period of the sending in seconds, by default 0.001
+
+        Raises
+        ------
+        ValueError
+            if there are no templates or the rate is not positive
+        """
+        templates = list(templates)
+        if not templates or rate <= 0:
+            raise ValueError()
+
+        self._host = host
+        self._protocol = protocol
+        self._rate = rate
+        self._count = count
+        self._duration = duration
+        self._tick = tick
+        destination_ip = IpV4Addr(destination)
+        # the prepared packets hold whole cycles of the templates, so the
+        # sending can continue from any of them
+        cycles = -(-batch_size // len(templates))
+        self._batch = PacketBatch(
+            (template, destination_ip)
+            for template in itertools.chain.from_iterable(
+                itertools.repeat(templates, cycles),
+            )
+        )
+        self._batch_size = batch_size
+        self._offset = 0
+        self._socket = None
+        self._started = None
+        self._sent = 0
+        self._failed = 0
+        self._stopped = False
+        self.future = concurrent.futures.Future()
+
+    def start(self):
+        """
+        Start sending.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            future of the final GeneratorStatistics, done when the count
+            or the duration is reached or the generator is stopped
+        """
+        self._host.execute(self._start).result()
+        return self.future
+
+    def stop(self):
+        """Stop sending, the future is done on the next tick."""
+        self._stopped = True
+
+    def get_statistics(self):
+        """
+        Return current statistics.
+
+        Returns
+        -------
+        GeneratorStatistics
+            statistics of the packets sent so far
+        """
+        duration = time.monotonic() - self._started if self._started else 0
+        return GeneratorStatistics(
+            self._sent,
+            self._failed,
+            duration,
+            self._sent / duration if duration else 0.0,
+        )
+
+    def _start(self, host):
+        self._socket = host.get_stack().make_socket(
+            SocketTypes.sock_raw, self._protocol,
+        )
+        self._started = time.monotonic()
+        self._send_due(host)
+
+    def _send_due(self, host):
+        if self.future.done():
+            return
+        try:
+            finished = self._send_batches()
+        except Exception as send_error:
+            self._socket.close()
+            self.future.set_exception(send_error)
+            return
+
+        if finished:
+            self._socket.close()
+            self.future.set_result(self.get_statistics())
+        else:
+            host.execute(self._send_due, self._tick)
+
+    def _send_batches(self):
+        elapsed = time.monotonic() - self._started
+        if self._duration is not None and elapsed >= self._duration:
+            self._stopped = True
+        if self._stopped:
+            return True
+
+        due = int(elapsed * self._rate) + 1
+        if self._count is not None:
+            due = min(due, self._count)
+        pending = due - self._sent - self._failed
+        while pending > 0:
+            batch_count = min(
+                pending, self._batch_size, len(self._batch) - self._offset,
+            )
+            sent = self._socket.send_batch(
+                self._batch, batch_count, offset=self._offset,
+            )
+            self._sent += sent
+            self._failed += batch_count - sent
+            self._offset = (self._offset + batch_count) % len(self._batch)
+            pending -= batch_count
+
+        return (
+            self._count is not None
+            and self._sent + self._failed >= self._count
+        )
+
+
+class PacketCounter(object):
+    """Counter of the packets of the protocol received by the host."""
+
+    def __init__(self, host, protocol=EXPERIMENTAL_PROTOCOL):
+        """
+        Start counting.
+
+        Parameters
+        ----------
+        host : Host
+            receiving host
+        protocol : int, optional
+            IP protocol number, by default EXPERIMENTAL_PROTOCOL
+        """
+        self._host = host
+        self._socket = host.execute(
+            lambda host: self._make_socket(host, protocol),
+        ).result()
+
+    def get_counters(self):
+        """
+        Return counters of the received packets.
+
+        Returns
+        -------
+        RawCounters
+            number of packets and bytes (including IP headers)
+        """
+        return self._host.execute(
+            lambda host: self._socket.get_counters(),
+        ).result()
+
+    def close(self):
+        """Stop counting and release the socket."""
+        self._host.execute(lambda host: self._socket.close()).result()
+
+    def _make_socket(self, host, protocol):
+        counting_socket = host.get_stack().make_socket(
+            SocketTypes.sock_raw, protocol,
+        )
+        counting_socket.enable_counting()
+        return counting_socket
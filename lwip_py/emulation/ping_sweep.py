@@ -0,0 +1,149 @@
+"""
+Reachability and latency sweep over the emulated network.
+
+The sweep pings all targets from the host at once with the native echo
+engine (PingEngine): every round sends one request to every target,
+the rounds are started at the given interval without waiting for the
+replies of the previous ones.
+"""
+import collections
+import concurrent.futures
+
+from lwip_py.stack import IpV4Addr, exceptions
+from lwip_py.stack.ping_engine import PingStatistics
+
+_ERR_MEM = -1
+_ERR_INPROGRESS = -5
+_TRANSIENT_ERRORS = frozenset((_ERR_MEM, _ERR_INPROGRESS))
+
+
+class _PingSweep(object):
+    def __init__(self, targets, count, interval, timeout, payload_size):
+        self._targets = list(targets)
+        self._count = count
+        self._interval = interval
+        self._timeout = timeout
+        self._payload_size = payload_size
+        self._queue = collections.deque()
+        self._rounds_started = 0
+        self._failed = collections.Counter()
+        self.future = concurrent.futures.Future()
+
+    def start(self, host, capacity, poll_interval):
+        self._engine = host.get_stack().make_ping_engine(capacity)
+        self._poll_interval = poll_interval
+        for round_index in range(self._count):
+            host.execute(
+                self._guarded(self._start_round),
+                round_index * self._interval,
+            )
+        host.execute(self._guarded(self._poll), poll_interval)
+
+    def _guarded(self, action):
+        def guarded_action(host):
+            if self.future.done():
+                return
+            try:
+                action(host)
+            except Exception as action_error:
+                self._engine.close()
+                self.future.set_exception(action_error)
+        return guarded_action
+
+    def _start_round(self, host):
+        self._rounds_started += 1
+        self._queue.extend(self._targets)
+        self._send_queued()
+
+    def _send_queued(self):
+        while self._queue:
+            target = self._queue[0]
+            try:
+                self._engine.send(
+                    IpV4Addr(target), self._timeout, self._payload_size,
+                )
+            except exceptions.StackException as send_error:
+                if send_error.args and send_error.args[0] in (
+                    _TRANSIENT_ERRORS
+                ):
+                    return
+                self._failed[target] += 1
+            self._queue.popleft()
+
+    def _poll(self, host):
+        outstanding = self._engine.collect()
+        self._send_queued()
+        if (
+            self._rounds_started < self._count
+            or self._queue
+            or outstanding
+        ):
+            host.execute(self._guarded(self._poll), self._poll_interval)
+            return
+
+        self._engine.close()
+        self.future.set_result(self._get_statistics())
+
+    def _get_statistics(self):
+        statistics = self._engine.get_statistics()
+        for target in self._targets:
+            target_statistics = statistics.get(target)
+            failed = self._failed[target]
+            if target_statistics is None:
+                statistics[target] = PingStatistics(
+                    target, failed, 0, 1.0 if failed else 0.0,
+                    None, None, None, {},
+                )
+            elif failed:
+                sent = target_statistics.sent + failed
+                statistics[target] = target_statistics._replace(
+                    sent=sent, loss=1 - target_statistics.received / sent,
+                )
+        return statistics
+
+
+def ping_sweep(
+    host,
+    targets,
+    count=3,
+    interval=0.1,
+    timeout=1.0,
+    payload_size=32,
+    capacity=1024,
+    poll_interval=0.01,
+):
+    """
+    Ping all targets from the host and collect the RTT statistics.
+
+    Parameters
+    ----------
+    host : Host
+        host to ping from
+    targets : iterable[string]
+        ip addresses to ping
+    count : int, optional
+        number of requests per target, by default 3
+    interval : float, optional
+        time between the rounds in seconds, by default 0.1
+    timeout : float, optional
+        time to wait for the reply in seconds, by default 1.0
+    payload_size : int, optional
+        size of the echo data, by default 32
+    capacity : int, optional
+        maximum number of outstanding requests, by default 1024
+    poll_interval : float, optional
+        period of the reply collection in seconds, by default 0.01
+        (the round trip times are measured by the library and do not
+        depend on it)
+
+    Returns
+    -------
+    concurrent.futures.Future
+        future of the dictionary target -> PingStatistics, the requests
+        that could not be sent (e.g. no route) are counted as lost
+    """
+    sweep = _PingSweep(targets, count, interval, timeout, payload_size)
+    host.execute(
+        lambda host: sweep.start(host, capacity, poll_interval),
+    ).result()
+    return sweep.future
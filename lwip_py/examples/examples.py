@@ -13,9 +13,8 @@ with --help parameter.
 import argparse
 import threading
 
-import scapy.all as scapy
 from lwip_py.emulation import EthernetNetwork
-from lwip_py.output import EthernetRecorder
+from lwip_py.output import EthernetRecorder, FrameTracer, PcapngRecorder
 from lwip_py.stack import IpAddr, IpV4Addr, SocketTypes
 
 
@@ -72,21 +71,6 @@ class _UdpPingPongApp(object):
         )
 
 
-def _ethernet_logger(printer, netif, frame, was_forwarded):
-    incoming_data = bytearray(frame)
-    eth_frame = scapy.Ether(scapy.raw(incoming_data))
-
-    ip_format_str = (
-        '{Ether:%Ether.src% > %Ether.dst%} ' +
-        '{ARP:ARP %ARP.op%} ' +
-        '{IP:IP %IP.src% > %IP.dst%} ' +
-        '{ICMP:ICMP %ICMP.type% %ICMP.code%} ' +
-        '{UDP:UDP %UDP.sport% > %UDP.dport%} '
-    )
-
-    printer(eth_frame.sprintf(ip_format_str))
-
-
 def _parse_args(program_description, available_scenarious):
     arg_parser = argparse.ArgumentParser(
         description=program_description,
@@ -102,6 +86,13 @@ def _parse_args(program_description, available_scenarious):
         action='store_true',
     )
 
+    arg_parser.add_argument(
+        '-p',
+        '--pcapng',
+        help='stream trafic into pcapng file',
+        default=None,
+    )
+
     arg_parser.add_argument(
         '-t',
         '--traffic_trace',
@@ -142,13 +133,19 @@ def _run_example():
         network.set_status_callbacks(print, print)
 
     if args.traffic_trace:
-        network.get_ethernet_bus().add_observer(
-            lambda *args: _ethernet_logger(print, *args),
-        )
+        network.get_ethernet_bus().add_observer(FrameTracer(print))
 
     if args.wireshark:
         ethernet_recorder = EthernetRecorder()
-        network.get_ethernet_bus().add_observer(ethernet_recorder)
+        network.get_ethernet_bus().add_observer(
+            ethernet_recorder, fill_checksums=True,
+        )
+
+    if args.pcapng:
+        pcapng_recorder = PcapngRecorder(args.pcapng)
+        network.get_ethernet_bus().add_observer(
+            pcapng_recorder, fill_checksums=True,
+        )
 
     network.start()
     network.set_up_interfaces()
@@ -174,7 +171,12 @@ def _run_example():
 
     network.stop()
 
+    if args.pcapng:
+        pcapng_recorder.close()
+
     if args.wireshark:
+        import scapy.all as scapy
+
         frames = (
             scapy.Ether(
                 scapy.raw(rd),
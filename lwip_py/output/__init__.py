@@ -1,3 +1,26 @@
+from lwip_py.output.capture_ring import CaptureRingReader, CaptureRingRecorder
 from lwip_py.output.ethernet_recorder import EthernetRecorder
+from lwip_py.output.frame_decoder import (
+    FrameSummary,
+    FrameTracer,
+    decode_frame,
+    decode_frames,
+    format_frames,
+    format_summary,
+)
+from lwip_py.output.pcapng_recorder import PcapngRecorder
+from lwip_py.output.pcapng_writer import PcapngWriter
 
-__all__ = ['EthernetRecorder']
+__all__ = [
+    'CaptureRingReader',
+    'CaptureRingRecorder',
+    'EthernetRecorder',
+    'FrameSummary',
+    'FrameTracer',
+    'PcapngRecorder',
+    'PcapngWriter',
+    'decode_frame',
+    'decode_frames',
+    'format_frames',
+    'format_summary',
+]
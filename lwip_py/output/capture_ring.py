@@ -0,0 +1,437 @@
+"""
+Live capture ring shared with other processes via memory-mapped file.
+
+The recorder appends frames transmitted on the bus into the ring located
+in the memory-mapped file. The writer never waits for readers: the
+record is copied into the mapping and the write position is published
+afterwards. Readers (typically in another process) follow the write
+position at their own pace. If a reader falls behind by more than the
+ring size the overwritten frames are reported as lost and the reader
+continues from the live position.
+
+File layout (little endian):
+    header      magic, version, header size, data size, write position,
+                sequence, interface table description
+    interfaces  table of interface names (fixed size entries)
+    data        ring of records: sequence, timestamp, length,
+                interface index, flags followed by the frame bytes
+                (padded to 8 bytes)
+"""
+import argparse
+import collections
+import mmap
+import struct
+import time
+
+from lwip_py.output.frame_decoder import decode_frame, format_summary
+from lwip_py.output.pcapng_writer import PcapngWriter
+
+_MAGIC = b'LWIPRING'
+_VERSION = 1
+
+_header = struct.Struct('<8sIIQQQII')
+_position = struct.Struct('<QQ')
+_record_header = struct.Struct('<QdIHH')
+
+_POSITION_OFFSET = 24
+_INTERFACE_COUNT_OFFSET = 44
+_INTERFACE_NAME_SIZE = 32
+_ALIGNMENT = 8
+_WRAP_MARKER = 0xFFFFFFFF
+
+CapturedFrame = collections.namedtuple(
+    'CapturedFrame', ['sequence', 'timestamp', 'interface', 'frame'],
+)
+
+
+def _align(size):
+    return (size + _ALIGNMENT - 1) & ~(_ALIGNMENT - 1)
+
+
+class CaptureRingRecorder(object):
+    """
+    Class records the frames transmitted on the bus into capture ring.
+
+    The instance should be registered as the bus observer. Recording is
+    done in the bus thread without any locking.
+    """
+
+    def __init__(
+        self, path, data_size=16 << 20, max_interfaces=64, snaplen=0xFFFF,
+    ):
+        """
+        Create the ring file and map it into memory.
+
+        Parameters
+        ----------
+        path : string
+            path to the ring file (created or truncated)
+        data_size : int, optional
+            size of the ring data area in bytes, by default 16 MiB
+        max_interfaces : int, optional
+            maximum number of distinct sending interfaces,
+            by default 64
+        snaplen : int, optional
+            maximum number of bytes stored per frame, by default 0xFFFF
+
+        Raises
+        ------
+        ValueError
+            if the ring is smaller than four records of snaplen size
+        """
+        self._snaplen = snaplen
+        self._data_size = _align(data_size)
+        if self._data_size < 4 * _align(_record_header.size + snaplen):
+            raise ValueError('Ring is too small for the snaplen')
+
+        self._max_interfaces = max_interfaces
+        self._data_offset = _align(
+            _header.size + max_interfaces * _INTERFACE_NAME_SIZE,
+        )
+        self._interface_ids = {}
+        self._write_position = 0
+        self._sequence = 0
+
+        with open(path, 'w+b') as ring_file:
+            ring_file.truncate(self._data_offset + self._data_size)
+            self._mmap = mmap.mmap(ring_file.fileno(), 0)
+
+        _header.pack_into(
+            self._mmap,
+            0,
+            _MAGIC,
+            _VERSION,
+            self._data_offset,
+            self._data_size,
+            0,
+            0,
+            max_interfaces,
+            0,
+        )
+
+    def __call__(self, netif, frame_to_record, was_forwarded):
+        """
+        Record transmitted frame.
+
+        Parameters
+        ----------
+        netif : NetIf
+            sending interface
+        frame_to_record : bytearray
+            frame bytes
+        was_forwarded : boolean
+            indicated if the data was forwarded or filtered out
+        """
+        frame = memoryview(frame_to_record)[:self._snaplen]
+        frame_length = len(frame)
+        record_size = _align(_record_header.size + frame_length)
+
+        offset = self._write_position % self._data_size
+        space_left = self._data_size - offset
+        if space_left < record_size:
+            if space_left >= _record_header.size:
+                _record_header.pack_into(
+                    self._mmap,
+                    self._data_offset + offset,
+                    self._sequence,
+                    0,
+                    _WRAP_MARKER,
+                    0,
+                    0,
+                )
+            self._write_position += space_left
+            offset = 0
+
+        record_offset = self._data_offset + offset
+        _record_header.pack_into(
+            self._mmap,
+            record_offset,
+            self._sequence,
+            time.time(),
+            frame_length,
+            self._get_interface_id(netif),
+            int(not was_forwarded),
+        )
+        data_offset = record_offset + _record_header.size
+        self._mmap[data_offset:data_offset + frame_length] = frame
+
+        self._write_position += record_size
+        self._sequence += 1
+        _position.pack_into(
+            self._mmap,
+            _POSITION_OFFSET,
+            self._write_position,
+            self._sequence,
+        )
+
+    def close(self):
+        """Unmap the ring file."""
+        self._mmap.close()
+
+    def _get_interface_id(self, netif):
+        interface_id = self._interface_ids.get(netif)
+        if interface_id is not None:
+            return interface_id
+
+        interface_id = len(self._interface_ids)
+        if interface_id >= self._max_interfaces:
+            return self._max_interfaces
+
+        name_offset = _header.size + interface_id * _INTERFACE_NAME_SIZE
+        name = netif.get_name().encode()[:_INTERFACE_NAME_SIZE - 1]
+        self._mmap[name_offset:name_offset + len(name)] = name
+        self._interface_ids[netif] = interface_id
+        struct.pack_into(
+            '<I', self._mmap, _INTERFACE_COUNT_OFFSET, interface_id + 1,
+        )
+        return interface_id
+
+
+class CaptureRingReader(object):
+    """
+    Class reads the frames from the capture ring.
+
+    The reader can be used from any process, it never modifies the ring.
+    """
+
+    def __init__(self, path, from_start=True):
+        """
+        Open and map the ring file.
+
+        Parameters
+        ----------
+        path : string
+            path to the ring file
+        from_start : bool, optional
+            start from the oldest record if the ring was not wrapped yet,
+            otherwise from the live position, by default True
+
+        Raises
+        ------
+        ValueError
+            if the file is not a capture ring
+        """
+        with open(path, 'rb') as ring_file:
+            self._mmap = mmap.mmap(
+                ring_file.fileno(), 0, access=mmap.ACCESS_READ,
+            )
+
+        header = _header.unpack_from(self._mmap, 0)
+        magic, version, data_offset, data_size = header[:4]
+        if magic != _MAGIC or version != _VERSION:
+            self._mmap.close()
+            raise ValueError('{0} is not a capture ring'.format(path))
+
+        self._data_offset = data_offset
+        self._data_size = data_size
+        self._max_record_size = min(
+            data_size // 4, _align(_record_header.size + 0xFFFF),
+        )
+        self._lost_frames = 0
+        self._pcapng_interface_ids = {}
+
+        write_position, sequence = self._read_position()
+        if from_start and write_position <= data_size:
+            self._read_position_value = 0
+            self._next_sequence = 0
+        else:
+            self._read_position_value = write_position
+            self._next_sequence = sequence
+
+    def read(self, max_frames=None):
+        """
+        Read frames recorded since the previous call.
+
+        Parameters
+        ----------
+        max_frames : int, optional
+            maximum number of frames to return, by default None (all)
+
+        Returns
+        -------
+        list[CapturedFrame]
+            recorded frames, oldest first
+        """
+        frames = []
+        write_position, sequence = self._read_position()
+
+        while self._read_position_value < write_position:
+            if max_frames is not None and len(frames) >= max_frames:
+                break
+
+            if write_position - self._read_position_value > self._data_size:
+                self._resync(write_position, sequence)
+                break
+
+            record_position = self._read_position_value
+            frame = self._read_record()
+            if not self._is_intact(record_position):
+                self._resync(*self._read_position())
+                break
+
+            if frame is not None:
+                if frame.sequence != self._next_sequence:
+                    self._lost_frames += frame.sequence - self._next_sequence
+                self._next_sequence = frame.sequence + 1
+                frames.append(frame)
+
+        return frames
+
+    def follow(self, poll_interval=0.1, should_stop=None):
+        """
+        Yield frames as they are recorded.
+
+        Parameters
+        ----------
+        poll_interval : float, optional
+            time to sleep if no new frames available, by default 0.1
+        should_stop : callable, optional
+            predicate checked between polls to end the iteration,
+            by default None (follow forever)
+
+        Yields
+        ------
+        CapturedFrame
+            recorded frame
+        """
+        while not (should_stop and should_stop()):
+            frames = self.read()
+            if not frames:
+                time.sleep(poll_interval)
+            yield from frames
+
+    def get_interface_names(self):
+        """
+        Return names of the recorded interfaces.
+
+        Returns
+        -------
+        list[string]
+            interface names indexed by interface identifier
+        """
+        interface_count = struct.unpack_from(
+            '<I', self._mmap, _INTERFACE_COUNT_OFFSET,
+        )[0]
+        names = []
+        for interface_id in range(interface_count):
+            name_offset = _header.size + interface_id * _INTERFACE_NAME_SIZE
+            name = self._mmap[name_offset:name_offset + _INTERFACE_NAME_SIZE]
+            names.append(name.rstrip(b'\0').decode())
+        return names
+
+    def get_lost_frames(self):
+        """
+        Return number of frames overwritten before they were read.
+
+        Returns
+        -------
+        int
+            number of lost frames
+        """
+        return self._lost_frames
+
+    def write_pcapng(self, writer, frames):
+        """
+        Write frames into pcapng file.
+
+        The interface descriptions are added to the writer once, the
+        frames written by the later calls reuse them.
+
+        Parameters
+        ----------
+        writer : PcapngWriter
+            output writer
+        frames : iterable[CapturedFrame]
+            frames to write
+        """
+        interface_ids = self._pcapng_interface_ids.setdefault(writer, {})
+        for frame in frames:
+            interface_id = interface_ids.get(frame.interface)
+            if interface_id is None:
+                interface_id = writer.add_interface(
+                    self._get_interface_name(frame.interface),
+                )
+                interface_ids[frame.interface] = interface_id
+            writer.write_frame(interface_id, frame.timestamp, frame.frame)
+
+    def close(self):
+        """Unmap the ring file."""
+        self._mmap.close()
+
+    def _get_interface_name(self, interface_id):
+        names = self.get_interface_names()
+        if interface_id < len(names):
+            return names[interface_id]
+        return 'if{0}'.format(interface_id)
+
+    def _read_position(self):
+        return _position.unpack_from(self._mmap, _POSITION_OFFSET)
+
+    def _read_record(self):
+        offset = self._read_position_value % self._data_size
+        space_left = self._data_size - offset
+        if space_left < _record_header.size:
+            self._read_position_value += space_left
+            return None
+
+        record_offset = self._data_offset + offset
+        sequence, timestamp, length, interface, _ = (
+            _record_header.unpack_from(self._mmap, record_offset)
+        )
+        if length == _WRAP_MARKER:
+            self._read_position_value += space_left
+            return None
+
+        data_offset = record_offset + _record_header.size
+        frame = self._mmap[data_offset:data_offset + length]
+        self._read_position_value += _align(_record_header.size + length)
+        return CapturedFrame(sequence, timestamp, interface, frame)
+
+    def _is_intact(self, record_position):
+        write_position, _ = self._read_position()
+        # the record being written and the wrap padding before it may
+        # both overwrite the data ahead of the published position
+        overwritten_till = (
+            write_position + 2 * self._max_record_size - self._data_size
+        )
+        return overwritten_till <= record_position
+
+    def _resync(self, write_position, sequence):
+        self._lost_frames += sequence - self._next_sequence
+        self._read_position_value = write_position
+        self._next_sequence = sequence
+
+
+def _main():
+    arg_parser = argparse.ArgumentParser(
+        description='Follow the capture ring written by the emulation',
+    )
+    arg_parser.add_argument('ring', help='path to the ring file')
+    arg_parser.add_argument(
+        '-p', '--pcapng', help='write frames into pcapng file', default=None,
+    )
+    args = arg_parser.parse_args()
+
+    reader = CaptureRingReader(args.ring)
+    writer = PcapngWriter(args.pcapng) if args.pcapng else None
+    try:
+        for frame in reader.follow():
+            if writer:
+                reader.write_pcapng(writer, (frame,))
+            else:
+                print('{0} {1:.6f} if{2} {3}'.format(
+                    frame.sequence,
+                    frame.timestamp,
+                    frame.interface,
+                    format_summary(decode_frame(frame.frame)),
+                ))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if writer:
+            writer.close()
+        reader.close()
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,522 @@
+"""
+Columnar storage of the captured frames for post-run analysis.
+
+Frames are stored as one payload blob with offsets array. Header fields
+(timestamps, lengths, MAC and IP addresses, protocol, ports) are
+extracted in vectorized way into NumPy columns, so the queries over
+millions of frames are done without Python loops.
+
+The module requires NumPy.
+"""
+import socket
+import struct
+import time
+
+import numpy as np
+
+_PROTOCOLS = {'icmp': 1, 'tcp': 6, 'udp': 17}
+
+_ETHERTYPE_IPV4 = 0x0800
+_ETHERTYPE_ARP = 0x0806
+_ETHERNET_HEADER_SIZE = 14
+_MIN_IPV4_FRAME = _ETHERNET_HEADER_SIZE + 20
+_MIN_ARP_FRAME = _ETHERNET_HEADER_SIZE + 28
+
+_COLUMNS = (
+    ('timestamp', np.float64),
+    ('interface', np.uint16),
+    ('length', np.uint32),
+    ('dst_mac', np.uint64),
+    ('src_mac', np.uint64),
+    ('ethertype', np.uint16),
+    ('src_ip', np.uint32),
+    ('dst_ip', np.uint32),
+    ('protocol', np.uint8),
+    ('src_port', np.uint16),
+    ('dst_port', np.uint16),
+)
+
+FLOW_FIELDS = ('src_ip', 'dst_ip', 'protocol', 'src_port', 'dst_port')
+
+
+def _ip_to_int(ip_address):
+    if isinstance(ip_address, str):
+        return struct.unpack('!I', socket.inet_aton(ip_address))[0]
+    return ip_address
+
+
+def _mac_to_int(mac):
+    if isinstance(mac, str):
+        return int(mac.replace(':', ''), 16)
+    if isinstance(mac, (bytes, bytearray)):
+        return int.from_bytes(mac, 'big')
+    return mac
+
+
+def _protocol_to_int(protocol):
+    if isinstance(protocol, str):
+        return _PROTOCOLS[protocol.lower()]
+    return protocol
+
+
+_converters = {
+    'src_ip': _ip_to_int,
+    'dst_ip': _ip_to_int,
+    'src_mac': _mac_to_int,
+    'dst_mac': _mac_to_int,
+    'protocol': _protocol_to_int,
+}
+
+
+def _gather(blob, positions, valid, width):
+    gathered = np.zeros(len(positions), dtype=np.uint64)
+    valid_positions = positions[valid]
+    field_value = np.zeros(len(valid_positions), dtype=np.uint64)
+    for byte_index in range(width):
+        field_value = (field_value << np.uint64(8)) | blob[
+            valid_positions + byte_index
+        ].astype(np.uint64)
+    gathered[valid] = field_value
+    return gathered
+
+
+def _extract_columns(blob, offsets):
+    starts = offsets[:-1]
+    lengths = np.diff(offsets)
+
+    is_ethernet = lengths >= _ETHERNET_HEADER_SIZE
+    ethertype = _gather(blob, starts + 12, is_ethernet, 2)
+    is_ipv4 = (ethertype == _ETHERTYPE_IPV4) & (lengths >= _MIN_IPV4_FRAME)
+    is_arp = (ethertype == _ETHERTYPE_ARP) & (lengths >= _MIN_ARP_FRAME)
+
+    header_length = np.zeros(len(starts), dtype=np.int64)
+    header_length[is_ipv4] = (blob[starts[is_ipv4] + 14] & 0x0F) * 4
+    protocol = _gather(blob, starts + 23, is_ipv4, 1)
+
+    transport = starts + _ETHERNET_HEADER_SIZE + header_length
+    has_ports = (
+        is_ipv4 &
+        ((protocol == _PROTOCOLS['tcp']) | (protocol == _PROTOCOLS['udp'])) &
+        (transport + 4 <= offsets[1:])
+    )
+
+    return {
+        'length': lengths,
+        'dst_mac': _gather(blob, starts, is_ethernet, 6),
+        'src_mac': _gather(blob, starts + 6, is_ethernet, 6),
+        'ethertype': ethertype,
+        'src_ip': (
+            _gather(blob, starts + 26, is_ipv4, 4) |
+            _gather(blob, starts + 28, is_arp, 4)
+        ),
+        'dst_ip': (
+            _gather(blob, starts + 30, is_ipv4, 4) |
+            _gather(blob, starts + 38, is_arp, 4)
+        ),
+        'protocol': protocol,
+        'src_port': _gather(blob, transport, has_ports, 2),
+        'dst_port': _gather(blob, transport + 2, has_ports, 2),
+    }
+
+
+class FlowIndex(object):
+    """
+    Index of the IPv4 flows (5-tuples) of the capture store.
+
+    Flows are numbered in the sorted order of their keys. For every flow
+    number of frames, number of bytes and first/last timestamps are
+    available as columns.
+    """
+
+    def __init__(self, store):
+        """
+        Build index for the store content.
+
+        Parameters
+        ----------
+        store : CaptureStore
+            indexed store
+        """
+        ip_frames = np.flatnonzero(
+            store.column('ethertype') == _ETHERTYPE_IPV4,
+        )
+        addresses = (
+            store.column('src_ip')[ip_frames].astype(np.uint64) <<
+            np.uint64(32)
+        ) | store.column('dst_ip')[ip_frames]
+        ports = (
+            store.column('protocol')[ip_frames].astype(np.uint64) <<
+            np.uint64(32)
+        ) | (
+            store.column('src_port')[ip_frames].astype(np.uint64) <<
+            np.uint64(16)
+        ) | store.column('dst_port')[ip_frames]
+
+        order = np.lexsort((ports, addresses))
+        addresses = addresses[order]
+        ports = ports[order]
+
+        is_flow_start = np.ones(len(order), dtype=bool)
+        is_flow_start[1:] = (
+            (addresses[1:] != addresses[:-1]) | (ports[1:] != ports[:-1])
+        )
+        starts = np.flatnonzero(is_flow_start)
+
+        self._keys = np.stack(
+            [
+                addresses[starts] >> np.uint64(32),
+                addresses[starts] & np.uint64(0xFFFFFFFF),
+                ports[starts] >> np.uint64(32),
+                (ports[starts] >> np.uint64(16)) & np.uint64(0xFFFF),
+                ports[starts] & np.uint64(0xFFFF),
+            ],
+            axis=1,
+        )
+        self._frames = ip_frames[order]
+        self._boundaries = np.append(starts, len(order))
+        self.frame_counts = np.diff(self._boundaries)
+
+        lengths = store.column('length')[self._frames].astype(np.uint64)
+        timestamps = store.column('timestamp')[self._frames]
+        if len(starts):
+            self.byte_counts = np.add.reduceat(lengths, starts)
+            self.first_timestamps = np.minimum.reduceat(timestamps, starts)
+            self.last_timestamps = np.maximum.reduceat(timestamps, starts)
+        else:
+            self.byte_counts = lengths
+            self.first_timestamps = timestamps
+            self.last_timestamps = timestamps
+
+    def __len__(self):
+        """
+        Return number of flows.
+
+        Returns
+        -------
+        int
+            number of flows
+        """
+        return len(self._keys)
+
+    def key(self, flow_id):
+        """
+        Return flow key.
+
+        Parameters
+        ----------
+        flow_id : int
+            flow number
+
+        Returns
+        -------
+        tuple
+            src_ip, dst_ip, protocol, src_port, dst_port (as integers)
+        """
+        return tuple(int(field) for field in self._keys[flow_id])
+
+    def find(self, **conditions):
+        """
+        Find flows matching the conditions.
+
+        Parameters
+        ----------
+        conditions : dictionary
+            values of the flow fields (src_ip, dst_ip, protocol,
+            src_port, dst_port), addresses and protocol names can be
+            given as strings
+
+        Returns
+        -------
+        numpy.ndarray
+            numbers of the matching flows
+        """
+        mask = np.ones(len(self._keys), dtype=bool)
+        for field, field_value in conditions.items():
+            converter = _converters.get(field)
+            field_value = converter(field_value) if converter else field_value
+            mask &= self._keys[:, FLOW_FIELDS.index(field)] == field_value
+        return np.flatnonzero(mask)
+
+    def get_frames(self, flow_id):
+        """
+        Return indices of the frames belonging to the flow.
+
+        Parameters
+        ----------
+        flow_id : int
+            flow number
+
+        Returns
+        -------
+        numpy.ndarray
+            frame indices in the capture order
+        """
+        return self._frames[
+            self._boundaries[flow_id]:self._boundaries[flow_id + 1]
+        ]
+
+
+class CaptureStore(object):
+    """
+    Columnar store of the captured frames.
+
+    The instance can be registered as the bus observer. Appended frames
+    are kept in the staging buffer and converted into columns in one
+    vectorized step when the columns are accessed.
+
+    Column names: timestamp, interface, length, dst_mac, src_mac,
+    ethertype, src_ip, dst_ip, protocol, src_port, dst_port. MAC and IP
+    addresses are integers in network order. For ARP frames ip columns
+    hold sender/target protocol addresses. Fields not present in the
+    frame are 0.
+    """
+
+    def __init__(self):
+        """Initialize empty store."""
+        self._interface_ids = {}
+        self._interface_names = []
+
+        self._columns = {
+            name: np.zeros(0, dtype=dtype) for name, dtype in _COLUMNS
+        }
+        self._blob = np.zeros(0, dtype=np.uint8)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._flow_index = None
+
+        self._reset_staging()
+
+    def __call__(self, netif, frame_to_record, was_forwarded):
+        """
+        Record transmitted frame.
+
+        Parameters
+        ----------
+        netif : NetIf
+            sending interface
+        frame_to_record : bytearray
+            frame bytes
+        was_forwarded : boolean
+            indicated if the data was forwarded or filtered out
+        """
+        interface_id = self._interface_ids.get(netif)
+        if interface_id is None:
+            interface_id = len(self._interface_names)
+            self._interface_ids[netif] = interface_id
+            self._interface_names.append(netif.get_name())
+
+        self.append(frame_to_record, interface=interface_id)
+
+    def __len__(self):
+        """
+        Return number of stored frames.
+
+        Returns
+        -------
+        int
+            number of frames
+        """
+        return len(self._offsets) - 1 + len(self._staged_timestamps)
+
+    @classmethod
+    def from_frames(cls, frames, timestamps=None):
+        """
+        Make store from the recorded frames.
+
+        Parameters
+        ----------
+        frames : iterable[bytes_like]
+            frames, e.g. EthernetRecorder.recorded_frames
+        timestamps : iterable[float], optional
+            capture times of the frames, by default None (zeros)
+
+        Returns
+        -------
+        CaptureStore
+            new store
+        """
+        store = cls()
+        if timestamps is None:
+            for frame in frames:
+                store.append(frame, timestamp=0)
+        else:
+            for frame, timestamp in zip(frames, timestamps):
+                store.append(frame, timestamp=timestamp)
+        return store
+
+    def append(self, frame, timestamp=None, interface=0):
+        """
+        Append frame to the store.
+
+        Parameters
+        ----------
+        frame : bytes_like
+            frame data
+        timestamp : float, optional
+            capture time, by default None (current time)
+        interface : int, optional
+            identifier of the capture interface, by default 0
+        """
+        self._staged_timestamps.append(
+            time.time() if timestamp is None else timestamp,
+        )
+        self._staged_interfaces.append(interface)
+        self._staged_payload += frame
+        self._staged_offsets.append(len(self._staged_payload))
+
+    def get_interface_names(self):
+        """
+        Return names of the interfaces recorded via the bus.
+
+        Returns
+        -------
+        list[string]
+            names indexed by interface identifier
+        """
+        return list(self._interface_names)
+
+    def column(self, name):
+        """
+        Return column.
+
+        Parameters
+        ----------
+        name : string
+            column name
+
+        Returns
+        -------
+        numpy.ndarray
+            column values, one per frame
+        """
+        self._commit_staging()
+        return self._columns[name]
+
+    def get_frame(self, index):
+        """
+        Return frame data.
+
+        Parameters
+        ----------
+        index : int
+            frame index
+
+        Returns
+        -------
+        bytes
+            frame data
+        """
+        self._commit_staging()
+        return self._blob[
+            self._offsets[index]:self._offsets[index + 1]
+        ].tobytes()
+
+    def select(self, start_time=None, end_time=None, **conditions):
+        """
+        Select frames matching all conditions.
+
+        Parameters
+        ----------
+        start_time : float, optional
+            minimum timestamp, by default None
+        end_time : float, optional
+            maximum timestamp (exclusive), by default None
+        conditions : dictionary
+            column values to match; addresses can be given as strings,
+            protocol as name ('icmp', 'tcp', 'udp')
+
+        Returns
+        -------
+        numpy.ndarray
+            boolean mask of the matching frames
+        """
+        self._commit_staging()
+
+        mask = np.ones(len(self), dtype=bool)
+        timestamps = self._columns['timestamp']
+        if start_time is not None:
+            mask &= timestamps >= start_time
+        if end_time is not None:
+            mask &= timestamps < end_time
+
+        for name, column_value in conditions.items():
+            converter = _converters.get(name)
+            if converter:
+                column_value = converter(column_value)
+            mask &= self._columns[name] == column_value
+        return mask
+
+    def count(self, **conditions):
+        """
+        Count frames matching the conditions.
+
+        Parameters
+        ----------
+        conditions : dictionary
+            conditions as accepted by select
+
+        Returns
+        -------
+        int
+            number of frames
+        """
+        return int(np.count_nonzero(self.select(**conditions)))
+
+    def total_bytes(self, **conditions):
+        """
+        Sum lengths of the frames matching the conditions.
+
+        Parameters
+        ----------
+        conditions : dictionary
+            conditions as accepted by select
+
+        Returns
+        -------
+        int
+            number of bytes
+        """
+        mask = self.select(**conditions)
+        return int(self._columns['length'][mask].sum())
+
+    def get_flow_index(self):
+        """
+        Return flow index (built on the first call after modification).
+
+        Returns
+        -------
+        FlowIndex
+            index of the flows
+        """
+        self._commit_staging()
+        if self._flow_index is None:
+            self._flow_index = FlowIndex(self)
+        return self._flow_index
+
+    def _reset_staging(self):
+        self._staged_timestamps = []
+        self._staged_interfaces = []
+        self._staged_payload = bytearray()
+        self._staged_offsets = [0]
+
+    def _commit_staging(self):
+        if not self._staged_timestamps:
+            return
+
+        blob = np.frombuffer(self._staged_payload, dtype=np.uint8).copy()
+        offsets = np.array(self._staged_offsets, dtype=np.int64)
+        new_columns = _extract_columns(blob, offsets)
+        new_columns['timestamp'] = self._staged_timestamps
+        new_columns['interface'] = self._staged_interfaces
+
+        for name, dtype in _COLUMNS:
+            self._columns[name] = np.concatenate((
+                self._columns[name],
+                np.asarray(new_columns[name]).astype(dtype),
+            ))
+
+        self._offsets = np.concatenate(
+            (self._offsets, offsets[1:] + self._offsets[-1]),
+        )
+        self._blob = np.concatenate((self._blob, blob))
+        self._flow_index = None
+        self._reset_staging()
@@ -1,10 +1,26 @@
 """The observer for the ethernet bus that records transmitted frames."""
+import collections
 
 
 class EthernetRecorder(object):
-    """Class records the data blocks transmitted on the bus."""
+    """
+    Class records the data blocks transmitted on the bus.
 
-    recorded_frames = []
+    Every recorder keeps its own frames. If the maximum number of frames
+    is specified only the last frames are kept (ring buffer), so the
+    memory consumption stays bounded during long runs.
+    """
+
+    def __init__(self, max_frames=None):
+        """
+        Initialize new recorder.
+
+        Parameters
+        ----------
+        max_frames : int, optional
+            number of the last frames to keep, by default None (unlimited)
+        """
+        self.recorded_frames = collections.deque(maxlen=max_frames)
 
     def __call__(self, netif, frame_to_record, was_forwarded):
         """
@@ -19,4 +35,4 @@ class EthernetRecorder(object):
         was_forwarded : boolean
             indicated if the data was forwarded or filtered out
         """
-        self.recorded_frames.append(frame_to_record)
\ No newline at end of file
+        self.recorded_frames.append(frame_to_record)
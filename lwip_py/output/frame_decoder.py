@@ -0,0 +1,307 @@
+"""
+Lightweight decoder of the frames transmitted on the ethernet bus.
+
+The decoder extracts the most important fields of Ethernet, ARP, IPv4,
+ICMP, UDP and TCP headers via precompiled structs directly from the
+frame buffer (no intermediate copies or object trees), so it is cheap
+enough to be used for the tracing of every frame.
+"""
+import collections
+import struct
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_ARP = 0x0806
+
+IP_PROTO_ICMP = 1
+IP_PROTO_TCP = 6
+IP_PROTO_UDP = 17
+
+FrameSummary = collections.namedtuple(
+    'FrameSummary',
+    [
+        'length',
+        'dst_mac',
+        'src_mac',
+        'ethertype',
+        'src_ip',
+        'dst_ip',
+        'ip_protocol',
+        'src_port',
+        'dst_port',
+        'details',
+    ],
+)
+FrameSummary.__doc__ = """
+Decoded frame summary.
+
+MAC and IP addresses are kept as bytes. Fields not present in the frame
+are None. Details depend on the protocol:
+    ARP  (opcode,), addresses are sender/target protocol addresses
+    ICMP (type, code)
+    UDP  (datagram length,)
+    TCP  (flags, sequence number, acknowledgement number, payload length)
+"""
+
+_ETHERNET_HEADER_SIZE = 14
+
+_ethernet = struct.Struct('!6s6sH')
+_arp = struct.Struct('!HHBBH6s4s6s4s')
+_ipv4 = struct.Struct('!BBHHHBBH4s4s')
+_icmp = struct.Struct('!BB')
+_udp = struct.Struct('!HHH')
+_tcp = struct.Struct('!HHIIBB')
+
+_arp_operations = {1: 'who-has', 2: 'is-at'}
+
+_tcp_flags = (
+    (0x01, 'F'), (0x02, 'S'), (0x04, 'R'), (0x08, 'P'), (0x10, '.'),
+)
+
+
+def _decode_transport(frame, ip_protocol, offset, end):
+    if ip_protocol == IP_PROTO_UDP and end - offset >= _udp.size:
+        src_port, dst_port, datagram_length = _udp.unpack_from(frame, offset)
+        return (src_port, dst_port, (datagram_length,))
+
+    if ip_protocol == IP_PROTO_TCP and end - offset >= _tcp.size:
+        src_port, dst_port, seq, ack, data_offset, flags = (
+            _tcp.unpack_from(frame, offset)
+        )
+        payload_length = end - offset - (data_offset >> 4) * 4
+        return (src_port, dst_port, (flags, seq, ack, payload_length))
+
+    if ip_protocol == IP_PROTO_ICMP and end - offset >= _icmp.size:
+        return (None, None, _icmp.unpack_from(frame, offset))
+
+    return (None, None, None)
+
+
+def decode_frame(frame):
+    """
+    Decode ethernet frame.
+
+    Parameters
+    ----------
+    frame : bytes_like
+        frame data
+
+    Returns
+    -------
+    FrameSummary
+        decoded frame summary, None if the frame is too short
+    """
+    length = len(frame)
+    if length < _ETHERNET_HEADER_SIZE:
+        return None
+
+    dst_mac, src_mac, ethertype = _ethernet.unpack_from(frame)
+    offset = _ETHERNET_HEADER_SIZE
+
+    if ethertype == ETHERTYPE_IPV4 and length - offset >= _ipv4.size:
+        (
+            version_ihl, _, total_length, _, _, _,
+            ip_protocol, _, src_ip, dst_ip,
+        ) = _ipv4.unpack_from(frame, offset)
+        end = min(length, offset + total_length)
+        src_port, dst_port, details = _decode_transport(
+            frame,
+            ip_protocol,
+            offset + (version_ihl & 0x0F) * 4,
+            end,
+        )
+        return FrameSummary(
+            length,
+            dst_mac,
+            src_mac,
+            ethertype,
+            src_ip,
+            dst_ip,
+            ip_protocol,
+            src_port,
+            dst_port,
+            details,
+        )
+
+    if ethertype == ETHERTYPE_ARP and length - offset >= _arp.size:
+        arp_fields = _arp.unpack_from(frame, offset)
+        return FrameSummary(
+            length,
+            dst_mac,
+            src_mac,
+            ethertype,
+            arp_fields[6],
+            arp_fields[8],
+            None,
+            None,
+            None,
+            (arp_fields[4],),
+        )
+
+    return FrameSummary(
+        length, dst_mac, src_mac, ethertype, None, None, None, None, None,
+        None,
+    )
+
+
+def decode_frames(frames):
+    """
+    Decode batch of frames.
+
+    Parameters
+    ----------
+    frames : iterable[bytes_like]
+        frames to decode
+
+    Returns
+    -------
+    list[FrameSummary]
+        decoded summaries (None for the frames that are too short)
+    """
+    return [decode_frame(frame) for frame in frames]
+
+
+def format_mac(mac):
+    """
+    Format MAC address.
+
+    Parameters
+    ----------
+    mac : bytes
+        6-byte address
+
+    Returns
+    -------
+    string
+        colon separated hex representation
+    """
+    return '%02x:%02x:%02x:%02x:%02x:%02x' % tuple(mac)
+
+
+def format_ip(ip_address):
+    """
+    Format IPv4 address.
+
+    Parameters
+    ----------
+    ip_address : bytes
+        4-byte address in network order
+
+    Returns
+    -------
+    string
+        dot separated representation
+    """
+    return '%d.%d.%d.%d' % tuple(ip_address)
+
+
+def _format_tcp_flags(flags):
+    return ''.join(symbol for mask, symbol in _tcp_flags if flags & mask)
+
+
+def _format_network_layer(summary):
+    if summary.ethertype == ETHERTYPE_ARP:
+        operation = summary.details[0]
+        return 'ARP {0} {1} tell {2}'.format(
+            _arp_operations.get(operation, operation),
+            format_ip(summary.dst_ip),
+            format_ip(summary.src_ip),
+        )
+
+    if summary.ethertype != ETHERTYPE_IPV4:
+        return 'type 0x{0:04x}'.format(summary.ethertype)
+
+    ip_layer = 'IP {0} > {1}'.format(
+        format_ip(summary.src_ip), format_ip(summary.dst_ip),
+    )
+    if summary.details is None:
+        return '{0} proto {1}'.format(ip_layer, summary.ip_protocol)
+
+    if summary.ip_protocol == IP_PROTO_ICMP:
+        return '{0} ICMP {1} {2}'.format(ip_layer, *summary.details)
+
+    if summary.ip_protocol == IP_PROTO_UDP:
+        return '{0} UDP {1} > {2} len {3}'.format(
+            ip_layer, summary.src_port, summary.dst_port, *summary.details,
+        )
+
+    flags, seq, ack, payload_length = summary.details
+    return '{0} TCP {1} > {2} [{3}] seq {4} ack {5} len {6}'.format(
+        ip_layer,
+        summary.src_port,
+        summary.dst_port,
+        _format_tcp_flags(flags),
+        seq,
+        ack,
+        payload_length,
+    )
+
+
+def format_summary(summary):
+    """
+    Format decoded frame as single text line.
+
+    Parameters
+    ----------
+    summary : FrameSummary
+        decoded frame
+
+    Returns
+    -------
+    string
+        human readable frame description
+    """
+    if summary is None:
+        return 'truncated frame'
+
+    return '{0} > {1} {2}'.format(
+        format_mac(summary.src_mac),
+        format_mac(summary.dst_mac),
+        _format_network_layer(summary),
+    )
+
+
+def format_frames(frames):
+    """
+    Decode and format batch of frames.
+
+    Parameters
+    ----------
+    frames : iterable[bytes_like]
+        frames to format
+
+    Returns
+    -------
+    list[string]
+        text line per frame
+    """
+    return [format_summary(decode_frame(frame)) for frame in frames]
+
+
+class FrameTracer(object):
+    """Bus observer printing one text line per transmitted frame."""
+
+    def __init__(self, printer=print):
+        """
+        Initialize new tracer.
+
+        Parameters
+        ----------
+        printer : callable, optional
+            callable receiving the text line, by default print
+        """
+        self._printer = printer
+
+    def __call__(self, netif, frame, was_forwarded):
+        """
+        Trace transmitted frame.
+
+        Parameters
+        ----------
+        netif : NetIf
+            sending interface
+        frame : bytearray
+            frame bytes
+        was_forwarded : boolean
+            indicated if the data was forwarded or filtered out
+        """
+        self._printer(format_summary(decode_frame(frame)))
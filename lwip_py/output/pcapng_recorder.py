@@ -0,0 +1,135 @@
+"""The observer for the ethernet bus streaming frames into pcapng files."""
+import queue
+import threading
+import time
+
+from lwip_py.output.ethernet_recorder import EthernetRecorder
+from lwip_py.output.pcapng_writer import PcapngWriter
+
+_STOP = object()
+
+
+class PcapngRecorder(EthernetRecorder):
+    """
+    Class streams the frames transmitted on the bus into pcapng file.
+
+    Frames are timestamped on the bus thread and handed over to the
+    background writer via bounded queue, so the bus is never blocked by
+    file operations. If the writer can not keep up and the queue is full
+    the frames are dropped and counted.
+
+    Optionally the last frames are kept in memory (see EthernetRecorder).
+    """
+
+    def __init__(
+        self,
+        path,
+        ring_size=0,
+        queue_size=65536,
+        flush_interval=1.0,
+        **writer_options,
+    ):
+        """
+        Initialize recorder and start the background writer.
+
+        Parameters
+        ----------
+        path : string
+            path to the output file
+        ring_size : int, optional
+            number of the last frames to keep in memory, by default 0
+        queue_size : int, optional
+            maximum number of frames waiting to be written,
+            by default 65536
+        flush_interval : float, optional
+            idle time in seconds after which buffered data is flushed,
+            by default 1.0
+        writer_options : dictionary
+            options forwarded to PcapngWriter (max_file_size, max_files,
+            buffer_size, snaplen)
+        """
+        super().__init__(max_frames=ring_size)
+
+        self._writer = PcapngWriter(path, **writer_options)
+        self._interface_ids = {}
+        self._flush_interval = flush_interval
+        self._queue = queue.Queue(queue_size)
+        self._dropped_frames = 0
+
+        self._writer_thread = threading.Thread(
+            target=self._write_frames, daemon=True,
+        )
+        self._writer_thread.start()
+
+    def __call__(self, netif, frame_to_record, was_forwarded):
+        """
+        Record transmitted frame.
+
+        Parameters
+        ----------
+        netif : NetIf
+            sending interface
+        frame_to_record : bytearray
+            frame bytes
+        was_forwarded : boolean
+            indicated if the data was forwarded or filtered out
+        """
+        super().__call__(netif, frame_to_record, was_forwarded)
+        try:
+            self._queue.put_nowait((netif, time.time(), frame_to_record))
+        except queue.Full:
+            self._dropped_frames += 1
+
+    def get_dropped_frames(self):
+        """
+        Return number of frames dropped due to the writer overload.
+
+        Returns
+        -------
+        int
+            number of dropped frames
+        """
+        return self._dropped_frames
+
+    def get_written_files(self):
+        """
+        Return capture files that are still kept.
+
+        Returns
+        -------
+        list[string]
+            paths of the files, oldest first
+        """
+        return self._writer.get_written_files()
+
+    def close(self):
+        """Write all pending frames and close the output."""
+        if self._writer_thread.is_alive():
+            self._queue.put(_STOP)
+            self._writer_thread.join()
+
+    def _get_interface_id(self, netif):
+        interface_id = self._interface_ids.get(netif)
+        if interface_id is None:
+            interface_id = self._writer.add_interface(netif.get_name())
+            self._interface_ids[netif] = interface_id
+        return interface_id
+
+    def _write_frames(self):
+        try:
+            while True:
+                try:
+                    record = self._queue.get(timeout=self._flush_interval)
+                except queue.Empty:
+                    self._writer.flush()
+                    continue
+
+                if record is _STOP:
+                    break
+
+                netif, timestamp, frame = record
+                self._writer.write_frame(
+                    self._get_interface_id(netif), timestamp, frame,
+                )
+        finally:
+            self._writer.close()
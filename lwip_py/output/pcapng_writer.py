@@ -0,0 +1,246 @@
+"""
+Writer of the capture files in pcapng format.
+
+The writer produces files that can be opened with wireshark/tcpdump.
+Output is buffered and can be rotated when the file reaches the size
+limit, so the captures of long runs can be split into several files and
+only the most recent of them can be kept on disk.
+"""
+import os
+import struct
+
+LINKTYPE_ETHERNET = 1
+
+_BLOCK_TYPE_SHB = 0x0A0D0D0A
+_BLOCK_TYPE_IDB = 0x00000001
+_BLOCK_TYPE_EPB = 0x00000006
+
+_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+_OPTION_END = 0
+_OPTION_IF_NAME = 2
+
+_block_header = struct.Struct('<II')
+_block_trailer = struct.Struct('<I')
+_shb_body = struct.Struct('<IHHq')
+_idb_body = struct.Struct('<HHI')
+_epb_body = struct.Struct('<IIIII')
+_option_header = struct.Struct('<HH')
+
+_padding = (b'', b'\0\0\0', b'\0\0', b'\0')
+
+
+def _pad(data_length):
+    return _padding[data_length % 4]
+
+
+def _make_block(block_type, *body_parts):
+    body = b''.join(body_parts)
+    total_length = _block_header.size + len(body) + _block_trailer.size
+    return b''.join((
+        _block_header.pack(block_type, total_length),
+        body,
+        _block_trailer.pack(total_length),
+    ))
+
+
+def _make_option(code, option_value):
+    return b''.join((
+        _option_header.pack(code, len(option_value)),
+        option_value,
+        _pad(len(option_value)),
+    ))
+
+
+class PcapngWriter(object):
+    """
+    Class writes frames into pcapng files.
+
+    If the maximum file size is specified the output is rotated: new file
+    is started (containing section header and all interface descriptions)
+    as soon as the current one exceeds the limit. The rotated files are
+    named `<name>_<index>.<ext>`. If the maximum number of files is
+    given, the oldest files are removed.
+
+    The class is not thread-safe, it is expected to be used from the
+    single thread.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_file_size=None,
+        max_files=None,
+        buffer_size=1 << 20,
+        snaplen=0xFFFF,
+    ):
+        """
+        Initialize new writer and open the first output file.
+
+        Parameters
+        ----------
+        path : string
+            path to the output file
+        max_file_size : int, optional
+            size in bytes after which the file is rotated, by default None
+            (no rotation)
+        max_files : int, optional
+            maximum number of rotated files to keep, by default None
+            (keep all)
+        buffer_size : int, optional
+            size of the output buffer, by default 1 MiB
+        snaplen : int, optional
+            maximum number of bytes stored per frame, by default 0xFFFF
+        """
+        self._path = path
+        self._max_file_size = max_file_size
+        self._max_files = max_files
+        self._buffer_size = buffer_size
+        self._snaplen = snaplen
+
+        self._interfaces = []
+        self._written_files = []
+        self._file = None
+        self._file_size = 0
+        self._file_index = 0
+
+        self._open_next_file()
+
+    def __enter__(self):
+        """
+        Enter the context.
+
+        Returns
+        -------
+        PcapngWriter
+            the writer itself
+        """
+        return self
+
+    def __exit__(self, e_type, e_value, e_trace):
+        """
+        Close the writer on the context exit.
+
+        Parameters
+        ----------
+        e_type :
+            exception type
+        e_value :
+            exception value
+        e_trace :
+            exception traceback
+        """
+        self.close()
+
+    def add_interface(self, name, link_type=LINKTYPE_ETHERNET):
+        """
+        Describe new capture interface.
+
+        Parameters
+        ----------
+        name : string
+            human readable interface name
+        link_type : int, optional
+            link layer type, by default LINKTYPE_ETHERNET
+
+        Returns
+        -------
+        int
+            identifier of the interface to be used in write_frame
+        """
+        interface = (name, link_type)
+        self._interfaces.append(interface)
+        self._write(self._make_interface_block(*interface))
+        return len(self._interfaces) - 1
+
+    def write_frame(self, interface_id, timestamp, frame):
+        """
+        Write captured frame.
+
+        Parameters
+        ----------
+        interface_id : int
+            identifier returned by add_interface
+        timestamp : float
+            capture time in seconds since epoch
+        frame : bytes_like
+            frame data
+        """
+        if self._max_file_size and self._file_size >= self._max_file_size:
+            self._open_next_file()
+
+        original_length = len(frame)
+        captured = frame[:self._snaplen]
+        captured_length = len(captured)
+        timestamp_us = int(timestamp * 1000000)
+
+        self._write(_make_block(
+            _BLOCK_TYPE_EPB,
+            _epb_body.pack(
+                interface_id,
+                timestamp_us >> 32,
+                timestamp_us & 0xFFFFFFFF,
+                captured_length,
+                original_length,
+            ),
+            bytes(captured),
+            _pad(captured_length),
+        ))
+
+    def get_written_files(self):
+        """
+        Return files produced by the writer that are still kept.
+
+        Returns
+        -------
+        list[string]
+            paths of the files, oldest first
+        """
+        return list(self._written_files)
+
+    def flush(self):
+        """Flush buffered data to the file."""
+        self._file.flush()
+
+    def close(self):
+        """Flush buffered data and close the current file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, block):
+        self._file.write(block)
+        self._file_size += len(block)
+
+    def _make_interface_block(self, name, link_type):
+        return _make_block(
+            _BLOCK_TYPE_IDB,
+            _idb_body.pack(link_type, 0, self._snaplen),
+            _make_option(_OPTION_IF_NAME, name.encode()),
+            _option_header.pack(_OPTION_END, 0),
+        )
+
+    def _make_file_name(self):
+        if not self._max_file_size:
+            return self._path
+
+        base, extension = os.path.splitext(self._path)
+        return '{0}_{1:05d}{2}'.format(base, self._file_index, extension)
+
+    def _open_next_file(self):
+        self.close()
+
+        file_name = self._make_file_name()
+        self._file_index += 1
+        self._file = open(file_name, 'wb', buffering=self._buffer_size)
+        self._file_size = 0
+        self._written_files.append(file_name)
+
+        if self._max_files and len(self._written_files) > self._max_files:
+            os.remove(self._written_files.pop(0))
+
+        self._write(_make_block(
+            _BLOCK_TYPE_SHB, _shb_body.pack(_BYTE_ORDER_MAGIC, 1, 0, -1),
+        ))
+        for interface in self._interfaces:
+            self._write(self._make_interface_block(*interface))
@@ -1,5 +1,6 @@
 import ctypes
 
+from lwip_py.stack import exceptions
 from lwip_py.stack.pbuf import PBuf
 from lwip_py.utility import ctypes_helper
 
@@ -32,6 +33,18 @@ class Allocator(object):
             lwip, 'pbuf_free', ctypes.c_uint8, [ctypes.POINTER(PBuf)],
         )
 
+        self._pbuf_copy_partial = ctypes_helper.wrap_function(
+            lwip,
+            'pbuf_copy_partial',
+            ctypes.c_uint16,
+            [
+                ctypes.POINTER(PBuf),
+                ctypes.c_void_p,
+                ctypes.c_uint16,
+                ctypes.c_uint16,
+            ],
+        )
+
     def allocate_raw_pbuf(self, size):
         """
         Allocate raw memory buffer via lwip stack facilities.
@@ -48,11 +61,18 @@ class Allocator(object):
         -------
         PBuf
             object representing allocated buffer
+
+        Raises
+        ------
+        AllocationError
+            if the stack pools are exhausted
         """
         pbuf_raw = 1
         pbuf_pool = 386
 
         new_pbuf = self._pbuf_alloc(pbuf_raw, size, pbuf_pool)
+        if not new_pbuf:
+            raise exceptions.AllocationError()
         return new_pbuf.contents
 
     def allocate_raw_pbuf_from_data(self, data_to_place, size=None):
@@ -92,6 +112,11 @@ class Allocator(object):
         -------
         PBuf
             object representing allocated buffer
+
+        Raises
+        ------
+        AllocationError
+            if the stack heap is exhausted
         """
         pbuf_transport = 74
         pbuf_ram = 640
@@ -99,9 +124,64 @@ class Allocator(object):
         size = size or len(data_to_place)
 
         new_pbuf = self._pbuf_alloc(pbuf_transport, size, pbuf_ram)
+        if not new_pbuf:
+            raise exceptions.AllocationError()
         self._pbuf_take(new_pbuf, data_to_place, size)
         return new_pbuf.contents
 
+    def copy_payload(self, pbuf):
+        """
+        Copy payload of the pbuf chain.
+
+        Parameters
+        ----------
+        pbuf : PBuf or pointer to PBuf
+            buffer to copy
+
+        Returns
+        -------
+        bytearray
+            copy of the payload (whole chain)
+        """
+        if isinstance(pbuf, ctypes._Pointer):
+            pbuf = pbuf.contents
+
+        size = pbuf.tot_len
+        payload = bytearray(size)
+        if size:
+            target = (ctypes.c_char * size).from_buffer(payload)
+            if pbuf.len == size:
+                ctypes.memmove(target, pbuf.payload, size)
+            else:
+                self._pbuf_copy_partial(pbuf, target, size, 0)
+        return payload
+
+    def take_over(self, pbuf):
+        """
+        Take over the pbuf passed by the stack.
+
+        The python code becomes responsible to free the buffer
+        (e.g. pbuf received in the socket callback).
+
+        Parameters
+        ----------
+        pbuf : PBuf or pointer to PBuf
+            received buffer
+        """
+
+    def hand_over(self, pbuf):
+        """
+        Hand over the pbuf to the stack.
+
+        The stack becomes responsible to free the buffer
+        (e.g. pbuf passed to the netif input).
+
+        Parameters
+        ----------
+        pbuf : PBuf or pointer to PBuf
+            buffer passed to the stack
+        """
+
     def free_pbuf(self, pbuf):
         """
         Free previously allocated PBuf.
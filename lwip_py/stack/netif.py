@@ -1,16 +1,30 @@
 """lwip netif python wrapper"""
+import collections
 import ctypes
 
+from lwip_py.stack import exceptions
 from lwip_py.stack.ip_address import IpAddr, IpV4Addr
 from lwip_py.stack.pbuf import PBuf
 from lwip_py.utility import address_helpers, ctypes_helper
 
 
+class _NetIfLayout(ctypes.Structure):
+    _fields_ = [
+        ('size', ctypes.c_uint16),
+        ('mtu_offset', ctypes.c_uint16),
+    ]
+
+
 class NetIf(object):
     """
     The class wraps lwip netif struct.
 
     The class represents single network interface.
+
+    The leading fields of the lwip netif structure are mirrored by
+    _LwipNetIf, the fields starting from mtu (_LwipNetIfSettings) are
+    located at the offset reported by the library since the fields
+    preceding them depend on the configuration.
     """
 
     flag_up = 0x1
@@ -20,9 +34,17 @@ class NetIf(object):
     flag_ethernet = 0x10
     flag_igmp = 0x20
 
+    ethernet_mtu = 1500
+
+    checksum_enable_all = 0xFFFF
+    checksum_disable_all = 0x0000
+
     class _LwipNetIf(ctypes.Structure):
         pass
 
+    class _LwipNetIfSettings(ctypes.Structure):
+        pass
+
     netif_init_fn_type = ctypes.CFUNCTYPE(
         ctypes.c_int8, ctypes.POINTER(_LwipNetIf),
     )
@@ -45,6 +67,16 @@ class NetIf(object):
         None, ctypes.POINTER(_LwipNetIf),
     )
 
+    netif_igmp_mac_filter_fn = ctypes.CFUNCTYPE(
+        ctypes.c_int8,
+        ctypes.POINTER(_LwipNetIf),
+        ctypes.POINTER(IpV4Addr),
+        ctypes.c_int,
+    )
+
+    mac_filter_del = 0
+    mac_filter_add = 1
+
     hwaddr_arr = ctypes.c_uint8 * 6
     name_arr = ctypes.c_char * 2
 
@@ -59,6 +91,9 @@ class NetIf(object):
         ('status_callback', netif_status_cbk_fn),
         ('link_callback', netif_status_cbk_fn),
         ('state', ctypes.c_void_p),
+    ]
+
+    _LwipNetIfSettings._fields_ = [
         ('mtu', ctypes.c_uint16),
         ('hwaddr', hwaddr_arr),
         ('hwaddr_len', ctypes.c_uint8),
@@ -121,6 +156,64 @@ class NetIf(object):
         )
 
         self._interface = self._LwipNetIf()
+        self._settings = self._map_configured_fields()
+
+        try:
+            self._set_igmp_mac_filter = ctypes_helper.wrap_function(
+                self._lwip,
+                'lwip_py_netif_set_igmp_mac_filter',
+                None,
+                [
+                    ctypes.POINTER(self._LwipNetIf),
+                    self.netif_igmp_mac_filter_fn,
+                ],
+            )
+            self._igmp_start = ctypes_helper.wrap_function(
+                self._lwip,
+                'igmp_start',
+                ctypes.c_int8,
+                [ctypes.POINTER(self._LwipNetIf)],
+            )
+        except AttributeError:
+            self._set_igmp_mac_filter = None
+            self._igmp_start = None
+        try:
+            self._set_checksum_ctrl = ctypes_helper.wrap_function(
+                self._lwip,
+                'lwip_py_netif_set_checksum_ctrl',
+                None,
+                [ctypes.POINTER(self._LwipNetIf), ctypes.c_uint16],
+            )
+        except AttributeError:
+            self._set_checksum_ctrl = None
+        try:
+            self._dhcp_start = ctypes_helper.wrap_function(
+                self._lwip,
+                'dhcp_start',
+                ctypes.c_int8,
+                [ctypes.POINTER(self._LwipNetIf)],
+            )
+            self._dhcp_release_and_stop = ctypes_helper.wrap_function(
+                self._lwip,
+                'dhcp_release_and_stop',
+                None,
+                [ctypes.POINTER(self._LwipNetIf)],
+            )
+            self._dhcp_supplied_address = ctypes_helper.wrap_function(
+                self._lwip,
+                'dhcp_supplied_address',
+                ctypes.c_uint8,
+                [ctypes.POINTER(self._LwipNetIf)],
+            )
+        except AttributeError:
+            self._dhcp_start = None
+            self._dhcp_release_and_stop = None
+            self._dhcp_supplied_address = None
+        self._checksum_offload = False
+        self._igmp_mac_filter = self.netif_igmp_mac_filter_fn(
+            self._igmp_mac_filter_internal,
+        )
+        self._multicast_hwaddrs = collections.Counter()
 
         self._netif_input = self.netif_input_fn_type()
         self._netif_output = self.netif_output_fn()
@@ -157,19 +250,30 @@ class NetIf(object):
 
         flags_str = ', '.join(
             [
-                fl[1] for fl in flags if self._interface.flags & fl[0]
+                fl[1] for fl in flags if self._settings.flags & fl[0]
             ],
         )
 
         return '{0}: flags={1}<{2}> inet {3} netmask {4} gw {5}'.format(
             self._name,
-            self._interface.flags,
+            self._settings.flags,
             flags_str,
             address_helpers.int_ip_to_string(self._interface.ip_addr.addr),
             address_helpers.int_ip_to_string(self._interface.netmask.addr),
             address_helpers.int_ip_to_string(self._interface.gw.addr),
         )
 
+    def get_name(self):
+        """
+        Return human readable interface name.
+
+        Returns
+        -------
+        string
+            interface name
+        """
+        return self._name
+
     def get_stack(self):
         """
         Return the stack that services the interface.
@@ -237,9 +341,28 @@ class NetIf(object):
         name : two symbol array
             symbols used to identify interface
         """
-        self._interface.name = name
+        self._settings.name = name
 
-    def add(self, ip_address, netmask, gateway):
+    def add(self, ip_address, netmask, gateway, hwaddr=None):
+        """
+        Add the interface to the stack.
+
+        The interface is set up as the ethernet one: the MTU is 1500
+        bytes (lwip DHCP client refuses the interfaces with the MTU
+        below 576), the ARP is enabled and the subnet broadcast address
+        is recognized (the replies of the DHCP server are broadcast).
+
+        Parameters
+        ----------
+        ip_address : IpV4Addr
+            interface address
+        netmask : IpV4Addr
+            network mask
+        gateway : IpV4Addr
+            default gateway
+        hwaddr : tuple, optional
+            6-byte hardware address, by default None (0A:0B:0C:0D:0E:0F)
+        """
         self._py_object = ctypes.py_object(self)
         self._netif_input = self.netif_input_fn_type(self._ip_input)
         self._netif_add(
@@ -252,9 +375,15 @@ class NetIf(object):
             self._netif_input,
         )
 
-        self._interface.hwaddr = (0xA, 0xB, 0xC, 0xD, 0xE, 0xF)
-        self._interface.hwaddr_len = 6
-        self._interface.flags = 8
+        self._settings.hwaddr = hwaddr or (0xA, 0xB, 0xC, 0xD, 0xE, 0xF)
+        self._settings.hwaddr_len = 6
+        self._settings.mtu = self.ethernet_mtu
+        self._settings.flags = self.flag_etharp | self.flag_broadcast
+
+        if self._igmp_start is not None:
+            self._settings.flags |= self.flag_igmp
+            self._set_igmp_mac_filter(self._interface, self._igmp_mac_filter)
+            self._igmp_start(self._interface)
 
     def set_up(self):
         netif_set_up = ctypes_helper.wrap_function(
@@ -303,7 +432,7 @@ class NetIf(object):
 
     def set_etharp_flag(self):
         etherarp_flag = 8
-        self._interface.flags = self._interface.flags | etherarp_flag
+        self._settings.flags = self._settings.flags | etherarp_flag
 
     def input(self, incoming_pbuf):
         self._interface.input(incoming_pbuf, self._interface)
@@ -318,11 +447,207 @@ class NetIf(object):
             array.from_buffer(incoming_data), len(incoming_data),
         )
 
+        allocator.hand_over(incoming_pbuf)
         self._interface.input(incoming_pbuf, self._interface)
 
+    def get_memory_region(self):
+        """
+        Return memory occupied by the low level interface structure.
+
+        The structure is owned by the python object, so it is not part
+        of the library data segments.
+
+        Returns
+        -------
+        tuple(int, int)
+            address and size of the structure
+        """
+        return (
+            ctypes.addressof(self._interface), ctypes.sizeof(self._interface),
+        )
+
     def get_address(self):
         return address_helpers.int_ip_to_string(self._interface.ip_addr.addr)
 
+    def get_hwaddr(self):
+        """
+        Return hardware address of the interface.
+
+        Returns
+        -------
+        bytes
+            6-byte hardware address
+        """
+        return bytes(self._settings.hwaddr)
+
+    def is_multicast_member(self, hwaddr):
+        """
+        Check if the interface accepts the multicast hardware address.
+
+        The multicast addresses are added by the stack when the
+        interface joins the multicast group (lwip igmp_mac_filter).
+
+        Parameters
+        ----------
+        hwaddr : bytes
+            6-byte multicast hardware address
+
+        Returns
+        -------
+        bool
+            True if the frames to the address should be received
+        """
+        return self._multicast_hwaddrs[bytes(hwaddr)] > 0
+
+    def supports_checksum_offload(self):
+        """
+        Check if the checksum handling can be controlled per interface.
+
+        Returns
+        -------
+        bool
+            True if the library is built with LWIP_CHECKSUM_CTRL_PER_NETIF
+        """
+        return self._set_checksum_ctrl is not None
+
+    def set_checksum_offload(self, enabled):
+        """
+        Enable or disable the checksum offload.
+
+        With the offload enabled the stack neither generates nor checks
+        the IP/UDP/TCP/ICMP checksums of the frames passing the
+        interface, so it should only be used on the links where all
+        parties trust each other (see EthernetBus).
+
+        Parameters
+        ----------
+        enabled : bool
+            should the checksums be skipped
+
+        Raises
+        ------
+        StackException
+            if the library is built without per interface checksum
+            control (see the release build profile)
+        """
+        if self._set_checksum_ctrl is None:
+            raise exceptions.StackException(
+                'lwip library is built without per interface checksum '
+                'control',
+            )
+        self._set_checksum_ctrl(
+            self._interface,
+            self.checksum_disable_all if enabled else self.checksum_enable_all,
+        )
+        self._checksum_offload = enabled
+
+    def is_checksum_offloaded(self):
+        """
+        Check if the checksum offload is enabled.
+
+        Returns
+        -------
+        bool
+            True if the frames of the interface carry no checksums
+        """
+        return self._checksum_offload
+
+    def start_dhcp(self):
+        """
+        Start the DHCP client on the interface.
+
+        The address is configured by the client once the lease is bound
+        (see is_dhcp_bound and the status callback). Should be called in
+        the host context after the interface is set up.
+
+        The server keeps the leases per hardware address, so every
+        client on the bus needs its own one (the host assigns the unique
+        one to the interface added with the address 0.0.0.0 and no
+        hwaddr, see Host.add_network_interface).
+
+        Raises
+        ------
+        StackException
+            if the library is built without DHCP (see the dhcp build
+            profile) or the client can not be started
+        """
+        self._check_dhcp()
+        start_result = self._dhcp_start(self._interface)
+        if start_result:
+            raise exceptions.StackException(start_result)
+
+    def stop_dhcp(self):
+        """
+        Release the lease and stop the DHCP client.
+
+        Raises
+        ------
+        StackException
+            if the library is built without DHCP
+        """
+        self._check_dhcp()
+        self._dhcp_release_and_stop(self._interface)
+
+    def is_dhcp_bound(self):
+        """
+        Check if the interface address is supplied by the DHCP server.
+
+        Returns
+        -------
+        bool
+            True if the lease is bound
+
+        Raises
+        ------
+        StackException
+            if the library is built without DHCP
+        """
+        self._check_dhcp()
+        return bool(self._dhcp_supplied_address(self._interface))
+
+    def _check_dhcp(self):
+        if self._dhcp_start is None:
+            raise exceptions.StackException(
+                'lwip library is built without DHCP',
+            )
+
+    def _map_configured_fields(self):
+        try:
+            get_layout = ctypes_helper.wrap_function(
+                self._lwip,
+                'lwip_py_get_netif_layout',
+                None,
+                [ctypes.POINTER(_NetIfLayout)],
+            )
+        except AttributeError:
+            get_layout = None
+
+        layout = _NetIfLayout(
+            ctypes.sizeof(self._LwipNetIf) + ctypes.sizeof(
+                self._LwipNetIfSettings,
+            ),
+            ctypes.sizeof(self._LwipNetIf),
+        )
+        if get_layout is not None:
+            get_layout(ctypes.byref(layout))
+
+        ctypes.resize(self._interface, layout.size)
+        # the memory added by resize is not initialized
+        ctypes.memset(ctypes.addressof(self._interface), 0, layout.size)
+        return self._LwipNetIfSettings.from_buffer(
+            self._interface, layout.mtu_offset,
+        )
+
+    def _igmp_mac_filter_internal(self, netif, group, action):
+        hwaddr = address_helpers.multicast_hwaddr_from_int_ip(
+            group.contents.addr,
+        )
+        if action == self.mac_filter_add:
+            self._multicast_hwaddrs[hwaddr] += 1
+        elif self._multicast_hwaddrs[hwaddr] > 0:
+            self._multicast_hwaddrs[hwaddr] -= 1
+        return 0
+
     def _report_netif_init(self, netif):
         return 0
 
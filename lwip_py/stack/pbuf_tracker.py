@@ -0,0 +1,249 @@
+"""
+Tracking of the pbufs owned by the python code.
+
+The tracker records every pbuf allocated, freed or passed between the
+python wrappers and the stack together with the allocation site and
+time. Outstanding records are the buffers the python side is
+responsible for; records that stay outstanding are leaks slowly
+exhausting the stack pools.
+"""
+import collections
+import ctypes
+import sys
+import threading
+import time
+
+from lwip_py.stack import memory_allocator
+
+OutstandingPbuf = collections.namedtuple(
+    'OutstandingPbuf', ['address', 'kind', 'size', 'site', 'age'],
+)
+OutstandingPbuf.__doc__ = """
+Pbuf owned by the python code.
+
+address     address of the pbuf structure
+kind        origin of the buffer ('raw', 'transport' or 'received')
+size        total length of the buffer at allocation
+site        allocation site, tuple of (file name, line, function)
+            innermost first
+age         seconds since allocation
+"""
+
+_Record = collections.namedtuple(
+    '_Record', ['kind', 'size', 'site', 'timestamp'],
+)
+
+
+_INTERNAL_FILES = frozenset((__file__, memory_allocator.__file__))
+
+
+def _get_address(pbuf):
+    if isinstance(pbuf, ctypes._Pointer):
+        return ctypes.cast(pbuf, ctypes.c_void_p).value
+    return ctypes.addressof(pbuf)
+
+
+class PbufTracker(object):
+    """Registry of the pbufs owned by the python code of one stack."""
+
+    def __init__(self, site_depth=4):
+        """
+        Initialize new tracker.
+
+        Parameters
+        ----------
+        site_depth : int, optional
+            number of the stack frames stored as allocation site,
+            by default 4
+        """
+        self._site_depth = site_depth
+        self._records = {}
+        self._lock = threading.Lock()
+        self._allocated = 0
+        self._freed = 0
+        self._unknown_frees = 0
+
+    def on_allocated(self, pbuf, kind):
+        """
+        Record the pbuf the python code became responsible for.
+
+        Parameters
+        ----------
+        pbuf : PBuf or pointer to PBuf
+            allocated or received buffer
+        kind : string
+            origin of the buffer
+        """
+        record = _Record(
+            kind, self._get_size(pbuf), self._get_site(), time.monotonic(),
+        )
+        with self._lock:
+            self._records[_get_address(pbuf)] = record
+            self._allocated += 1
+
+    def on_released(self, pbuf):
+        """
+        Record the pbuf freed or passed to the stack.
+
+        Parameters
+        ----------
+        pbuf : PBuf or pointer to PBuf
+            released buffer
+        """
+        with self._lock:
+            if self._records.pop(_get_address(pbuf), None) is None:
+                self._unknown_frees += 1
+            else:
+                self._freed += 1
+
+    def get_outstanding(self):
+        """
+        Return the pbufs currently owned by the python code.
+
+        Returns
+        -------
+        list[OutstandingPbuf]
+            outstanding buffers, oldest first
+        """
+        now = time.monotonic()
+        with self._lock:
+            records = list(self._records.items())
+        return sorted(
+            (
+                OutstandingPbuf(
+                    address,
+                    record.kind,
+                    record.size,
+                    record.site,
+                    now - record.timestamp,
+                )
+                for address, record in records
+            ),
+            key=lambda outstanding: -outstanding.age,
+        )
+
+    def get_counters(self):
+        """
+        Return tracking counters.
+
+        Returns
+        -------
+        tuple(int, int, int)
+            number of recorded allocations, releases and releases of
+            the buffers not known to the tracker
+        """
+        with self._lock:
+            return (self._allocated, self._freed, self._unknown_frees)
+
+    def save_state(self):
+        """
+        Return copy of the tracking records.
+
+        Returns
+        -------
+        object
+            opaque state to be passed to restore_state
+        """
+        with self._lock:
+            return dict(self._records)
+
+    def restore_state(self, state):
+        """
+        Replace the tracking records by the saved copy.
+
+        Parameters
+        ----------
+        state : object
+            state returned by save_state
+        """
+        with self._lock:
+            self._records = dict(state)
+
+    def format_report(self, limit=10):
+        """
+        Format outstanding pbufs grouped by the allocation site.
+
+        Parameters
+        ----------
+        limit : int, optional
+            maximum number of sites to report, by default 10
+
+        Returns
+        -------
+        string
+            human readable report
+        """
+        by_site = collections.defaultdict(list)
+        for outstanding in self.get_outstanding():
+            by_site[(outstanding.kind, outstanding.site)].append(outstanding)
+
+        lines = []
+        groups = sorted(by_site.items(), key=lambda group: -len(group[1]))
+        for (kind, site), buffers in groups[:limit]:
+            lines.append(
+                '{0} {1} pbuf(s), {2} bytes, oldest {3:.3f}s'.format(
+                    len(buffers),
+                    kind,
+                    sum(outstanding.size for outstanding in buffers),
+                    buffers[0].age,
+                ),
+            )
+            lines.extend(
+                '    {0}:{1} in {2}'.format(*frame) for frame in site
+            )
+        return '\n'.join(lines)
+
+    def _get_site(self):
+        site = []
+        frame = sys._getframe(2)
+        while frame is not None and len(site) < self._site_depth:
+            code = frame.f_code
+            if code.co_filename not in _INTERNAL_FILES:
+                site.append((code.co_filename, frame.f_lineno, code.co_name))
+            frame = frame.f_back
+        return tuple(site)
+
+    def _get_size(self, pbuf):
+        if isinstance(pbuf, ctypes._Pointer):
+            pbuf = pbuf.contents
+        return pbuf.tot_len
+
+
+class TrackingAllocator(memory_allocator.Allocator):
+    """Allocator recording the pbuf ownership in the tracker."""
+
+    def __init__(self, lwip, tracker):
+        """
+        Initialize new object.
+
+        Parameters
+        ----------
+        lwip : lib instance (loaded via ctypes)
+            lwip library instance
+        tracker : PbufTracker
+            tracker to record the ownership
+        """
+        super().__init__(lwip)
+        self._tracker = tracker
+
+    def allocate_raw_pbuf(self, size):
+        new_pbuf = super().allocate_raw_pbuf(size)
+        self._tracker.on_allocated(new_pbuf, 'raw')
+        return new_pbuf
+
+    def allocate_transport_pbuf_from_data(self, data_to_place, size=None):
+        new_pbuf = super().allocate_transport_pbuf_from_data(
+            data_to_place, size,
+        )
+        self._tracker.on_allocated(new_pbuf, 'transport')
+        return new_pbuf
+
+    def take_over(self, pbuf):
+        self._tracker.on_allocated(pbuf, 'received')
+
+    def hand_over(self, pbuf):
+        self._tracker.on_released(pbuf)
+
+    def free_pbuf(self, pbuf):
+        self._tracker.on_released(pbuf)
+        return super().free_pbuf(pbuf)
@@ -0,0 +1,282 @@
+"""
+Concurrent ICMP echo engine.
+
+The engine (py_ping.c) sends echo requests via the raw ICMP pcb and
+keeps many of them in flight across many targets. The replies are
+timestamped by the library when received, the engine collects them in
+batches and keeps the round trip times per target.
+"""
+import collections
+import ctypes
+import itertools
+import math
+import time
+
+from lwip_py.stack import exceptions
+from lwip_py.stack.ip_address import IpV4Addr
+from lwip_py.utility import address_helpers, ctypes_helper
+
+err_t = ctypes.c_int8
+
+_COLLECT_BATCH = 256
+_SEQUENCE_MODULUS = 0x10000
+
+# echo identifiers of the engines, distinct from the contrib ping (0xAFAF)
+_engine_ids = itertools.count(0x5000)
+
+PingStatistics = collections.namedtuple(
+    'PingStatistics',
+    [
+        'target',
+        'sent',
+        'received',
+        'loss',
+        'rtt_min',
+        'rtt_avg',
+        'rtt_max',
+        'rtt_percentiles',
+    ],
+)
+PingStatistics.__doc__ = """
+Echo statistics of the single target.
+
+target           ip address string
+sent             number of the requests completed (replied or timed out)
+received         number of the replies
+loss             ratio of the lost requests (0.0 - 1.0)
+rtt_min          minimal round trip time in seconds (None if no replies)
+rtt_avg          average round trip time in seconds
+rtt_max          maximal round trip time in seconds
+rtt_percentiles  dictionary percentile -> round trip time in seconds
+"""
+
+
+class _PingReply(ctypes.Structure):
+    _fields_ = [
+        ('addr', ctypes.c_uint32),
+        ('seq', ctypes.c_uint16),
+        ('reserved', ctypes.c_uint16),
+        ('rtt_us', ctypes.c_uint32),
+    ]
+
+
+class _TargetResults(object):
+    def __init__(self):
+        self.completed = 0
+        self.round_trip_times = []
+
+
+def _percentile(sorted_values, percentile):
+    rank = max(1, math.ceil(percentile / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class PingEngine(object):
+    """
+    ICMP echo engine keeping many requests in flight.
+
+    Should be used in the stack (host) context only. The replies are
+    taken from the library by collect, which should be called
+    periodically while requests are outstanding.
+    """
+
+    def __init__(self, lwip, capacity=1024):
+        """
+        Initialize new engine.
+
+        Parameters
+        ----------
+        lwip : lib instance (loaded via ctypes)
+            lwip library instance
+        capacity : int, optional
+            maximum number of outstanding requests, by default 1024
+
+        Raises
+        ------
+        AllocationError
+            if the engine (raw pcb) can not be allocated
+        """
+        self._lwip = lwip
+
+        self._engine_new = ctypes_helper.wrap_function(
+            self._lwip,
+            'lwip_py_ping_engine_new',
+            ctypes.c_void_p,
+            [ctypes.c_uint16, ctypes.c_uint16],
+        )
+        self._engine_free = ctypes_helper.wrap_function(
+            self._lwip, 'lwip_py_ping_engine_free', None, [ctypes.c_void_p],
+        )
+        self._engine_send = ctypes_helper.wrap_function(
+            self._lwip,
+            'lwip_py_ping_engine_send',
+            err_t,
+            [
+                ctypes.c_void_p,
+                ctypes.POINTER(IpV4Addr),
+                ctypes.c_uint16,
+                ctypes.c_uint16,
+            ],
+        )
+        self._engine_cancel = ctypes_helper.wrap_function(
+            self._lwip,
+            'lwip_py_ping_engine_cancel',
+            None,
+            [ctypes.c_void_p, ctypes.c_uint16],
+        )
+        self._engine_collect = ctypes_helper.wrap_function(
+            self._lwip,
+            'lwip_py_ping_engine_collect',
+            ctypes.c_uint32,
+            [ctypes.c_void_p, ctypes.POINTER(_PingReply), ctypes.c_uint32],
+        )
+
+        self._engine = self._engine_new(
+            next(_engine_ids) % _SEQUENCE_MODULUS, capacity,
+        )
+        if not self._engine:
+            raise exceptions.AllocationError()
+
+        self._replies = (_PingReply * _COLLECT_BATCH)()
+        self._next_seq = 0
+        self._outstanding = {}
+        self._results = collections.defaultdict(_TargetResults)
+
+    def send(self, target_ip, timeout=1.0, payload_size=32):
+        """
+        Send echo request.
+
+        Parameters
+        ----------
+        target_ip : IpV4Addr
+            address to ping
+        timeout : float, optional
+            time to wait for the reply in seconds, by default 1.0
+        payload_size : int, optional
+            size of the echo data, by default 32
+
+        Returns
+        -------
+        int
+            sequence number of the request
+
+        Raises
+        ------
+        StackException
+            if the request can not be sent (ERR_INPROGRESS if the
+            engine capacity is exhausted)
+        """
+        seq = self._next_seq
+        send_result = self._engine_send(
+            self._engine, target_ip, seq, payload_size,
+        )
+        if send_result:
+            raise exceptions.StackException(send_result)
+
+        self._next_seq = (seq + 1) % _SEQUENCE_MODULUS
+        self._outstanding[seq] = (
+            address_helpers.int_ip_to_string(target_ip.addr),
+            time.monotonic() + timeout,
+        )
+        return seq
+
+    def collect(self):
+        """
+        Take the received replies and expire the timed out requests.
+
+        Returns
+        -------
+        int
+            number of requests still outstanding
+        """
+        count = self._engine_collect(
+            self._engine, self._replies, _COLLECT_BATCH,
+        )
+        while count:
+            for reply in self._replies[:count]:
+                outstanding = self._outstanding.pop(reply.seq, None)
+                if outstanding is not None:
+                    target_results = self._results[outstanding[0]]
+                    target_results.completed += 1
+                    target_results.round_trip_times.append(
+                        reply.rtt_us / 1e6,
+                    )
+            count = self._engine_collect(
+                self._engine, self._replies, _COLLECT_BATCH,
+            )
+
+        now = time.monotonic()
+        expired = [
+            seq for seq, (_, deadline) in self._outstanding.items()
+            if deadline <= now
+        ]
+        for seq in expired:
+            target, _ = self._outstanding.pop(seq)
+            self._engine_cancel(self._engine, seq)
+            self._results[target].completed += 1
+
+        return len(self._outstanding)
+
+    def get_outstanding(self):
+        """
+        Return number of requests waiting for the reply.
+
+        Returns
+        -------
+        int
+            number of requests
+        """
+        return len(self._outstanding)
+
+    def get_statistics(self, percentiles=(50, 90, 99)):
+        """
+        Return statistics of the completed requests per target.
+
+        Parameters
+        ----------
+        percentiles : iterable[float], optional
+            round trip time percentiles to report, by default
+            (50, 90, 99)
+
+        Returns
+        -------
+        dict(string, PingStatistics)
+            statistics indexed by the target ip address strings
+        """
+        statistics = {}
+        for target, target_results in self._results.items():
+            round_trip_times = sorted(target_results.round_trip_times)
+            received = len(round_trip_times)
+            completed = target_results.completed
+            rtt_min = rtt_avg = rtt_max = None
+            rtt_percentiles = {}
+            if round_trip_times:
+                rtt_min = round_trip_times[0]
+                rtt_avg = sum(round_trip_times) / received
+                rtt_max = round_trip_times[-1]
+                rtt_percentiles = {
+                    percentile: _percentile(round_trip_times, percentile)
+                    for percentile in percentiles
+                }
+            statistics[target] = PingStatistics(
+                target,
+                completed,
+                received,
+                1 - received / completed if completed else 0.0,
+                rtt_min,
+                rtt_avg,
+                rtt_max,
+                rtt_percentiles,
+            )
+        return statistics
+
+    def reset_statistics(self):
+        """Forget the results of the completed requests."""
+        self._results.clear()
+
+    def close(self):
+        """Release the engine, outstanding requests are dropped."""
+        if self._engine:
+            self._engine_free(self._engine)
+            self._engine = None
+            self._outstanding.clear()
@@ -0,0 +1,404 @@
+"""Implementation of the lwip based Raw (IP protocol) socket."""
+
+import collections
+import ctypes
+
+from lwip_py.stack import PBuf, exceptions
+from lwip_py.stack.ip_address import IpV4Addr
+from lwip_py.utility import ctypes_helper
+
+err_t = ctypes.c_int8
+
+_ERR_MEM = -1
+
+raw_recv_fn_type = ctypes.CFUNCTYPE(
+    ctypes.c_uint8,
+    ctypes.c_void_p,
+    ctypes.c_void_p,
+    ctypes.POINTER(PBuf),
+    ctypes.POINTER(IpV4Addr),
+)
+
+RawCounters = collections.namedtuple('RawCounters', ['packets', 'bytes'])
+
+
+class _RawPacket(ctypes.Structure):
+    _fields_ = [
+        ('data', ctypes.c_void_p),
+        ('len', ctypes.c_uint16),
+        ('addr', IpV4Addr),
+    ]
+
+
+class _RawCounters(ctypes.Structure):
+    _fields_ = [
+        ('packets', ctypes.c_uint64),
+        ('bytes', ctypes.c_uint64),
+    ]
+
+
+class PacketBatch(object):
+    """
+    Packets prepared to be sent by RawSocket.send_batch.
+
+    The descriptors of the packets are built once, so sending the batch
+    again costs only the foreign call.
+    """
+
+    def __init__(self, packets):
+        """
+        Prepare the packets.
+
+        Parameters
+        ----------
+        packets : iterable[tuple(bytes, IpV4Addr)]
+            IP payload and destination per packet
+        """
+        packets = list(packets)
+        self._payloads = [bytes(payload) for payload, _ in packets]
+        self.descriptors = (_RawPacket * len(packets))()
+        for descriptor, payload, (_, ip_address) in zip(
+            self.descriptors, self._payloads, packets,
+        ):
+            descriptor.data = ctypes.cast(payload, ctypes.c_void_p).value
+            descriptor.len = len(payload)
+            descriptor.addr = ip_address
+
+    def __len__(self):
+        return len(self.descriptors)
+
+
+class RawSocket(object):
+    """
+    Class that implements Raw socket (not fully posix like).
+
+    The class wraps lwip raw_pcb: the payload passed to send is placed
+    after the IP header generated by the stack, the received packets of
+    the socket protocol are passed with their IP header. The received
+    packets are consumed by the socket (not processed by the stack)
+    while the receive callback or the counting is enabled.
+    """
+
+    def __init__(self, lwip, allocator, protocol):
+        """
+        Initialize new RawSocket object.
+
+        Parameters
+        ----------
+        lwip : lib instance
+            the instance of the lwip library, loaded via ctypes
+        allocator : Allocator
+            stack memory allocator
+        protocol : int
+            IP protocol number of the sent and received packets
+
+        Raises
+        ------
+        AllocationError
+            if the low-level socket allocation can not be done
+        """
+        self._lwip = lwip
+        self._allocator = allocator
+        self._rx_callback = None
+        self._counters = None
+
+        self._raw_new = ctypes_helper.wrap_function(
+            self._lwip, 'raw_new', ctypes.c_void_p, [ctypes.c_uint8],
+        )
+        self._raw_bind = ctypes_helper.wrap_function(
+            self._lwip,
+            'raw_bind',
+            err_t,
+            [ctypes.c_void_p, ctypes.POINTER(IpV4Addr)],
+        )
+        self._raw_connect = ctypes_helper.wrap_function(
+            self._lwip,
+            'raw_connect',
+            err_t,
+            [ctypes.c_void_p, ctypes.POINTER(IpV4Addr)],
+        )
+        self._raw_disconnect = ctypes_helper.wrap_function(
+            self._lwip, 'raw_disconnect', None, [ctypes.c_void_p],
+        )
+        self._raw_sendto = ctypes_helper.wrap_function(
+            self._lwip,
+            'raw_sendto',
+            err_t,
+            [ctypes.c_void_p, ctypes.POINTER(PBuf), ctypes.POINTER(IpV4Addr)],
+        )
+        self._raw_send = ctypes_helper.wrap_function(
+            self._lwip,
+            'raw_send',
+            err_t,
+            [ctypes.c_void_p, ctypes.POINTER(PBuf)],
+        )
+        self._raw_recv = ctypes_helper.wrap_function(
+            self._lwip,
+            'raw_recv',
+            None,
+            [ctypes.c_void_p, raw_recv_fn_type, ctypes.c_void_p],
+        )
+        self._raw_remove = ctypes_helper.wrap_function(
+            self._lwip, 'raw_remove', None, [ctypes.c_void_p],
+        )
+        try:
+            self._raw_sendto_many = ctypes_helper.wrap_function(
+                self._lwip,
+                'lwip_py_raw_sendto_many',
+                ctypes.c_int,
+                [
+                    ctypes.c_void_p,
+                    ctypes.POINTER(_RawPacket),
+                    ctypes.c_int,
+                    ctypes.POINTER(err_t),
+                ],
+            )
+            self._raw_count = ctypes_helper.wrap_function(
+                self._lwip,
+                'lwip_py_raw_count',
+                None,
+                [ctypes.c_void_p, ctypes.POINTER(_RawCounters)],
+            )
+        except AttributeError:
+            self._raw_sendto_many = None
+            self._raw_count = None
+
+        self._pcb = self._raw_new(protocol)
+        if not self._pcb:
+            raise exceptions.AllocationError()
+        self._internal_callback = raw_recv_fn_type(self._recv_callback)
+
+    def bind(self, ip_address):
+        """
+        Bind socket to the local address.
+
+        Parameters
+        ----------
+        ip_address : string
+            local address, empty string for any address
+
+        Raises
+        ------
+        StackException
+            if the low-level stack error occures
+        """
+        bind_result = self._raw_bind(
+            self._pcb, IpV4Addr(ip_address) if ip_address else IpV4Addr(),
+        )
+        if bind_result:
+            raise exceptions.StackException(bind_result)
+
+    def connect(self, ip_address):
+        """
+        Set the remote address of the socket.
+
+        The packets are then sent via send without the destination and
+        only the packets from the remote address are received.
+
+        Parameters
+        ----------
+        ip_address : IpV4Addr
+            address of the remote host
+
+        Raises
+        ------
+        StackException
+            if the low-level stack error occures
+        """
+        connect_result = self._raw_connect(self._pcb, ip_address)
+        if connect_result:
+            raise exceptions.StackException(connect_result)
+
+    def disconnect(self):
+        """Remove the remote address of the socket."""
+        self._raw_disconnect(self._pcb)
+
+    def send(self, data_to_send):
+        """
+        Send IP payload to the connected remote address.
+
+        Parameters
+        ----------
+        data_to_send : bytes_like
+            IP payload
+
+        Raises
+        ------
+        StackException
+            indicates that the internal lwip error occured
+        AllocationError
+            is raised if pbuf to place outgoing data can not be allocated
+        """
+        self._send_pbuf(data_to_send, self._raw_send)
+
+    def send_to(self, data_to_send, ip_address):
+        """
+        Send IP payload to the remote host.
+
+        Parameters
+        ----------
+        data_to_send : bytes_like
+            IP payload
+        ip_address : IpV4Addr
+            address of the remote host
+
+        Raises
+        ------
+        StackException
+            indicates that the internal lwip error occured
+        AllocationError
+            is raised if pbuf to place outgoing data can not be allocated
+        """
+        self._send_pbuf(
+            data_to_send,
+            lambda pcb, pbuf: self._raw_sendto(pcb, pbuf, ip_address),
+        )
+
+    def send_batch(self, batch, count=None, results=None, offset=0):
+        """
+        Send the prepared packets.
+
+        The batch is sent in one call into the library (if the library
+        provides lwip_py_raw_sendto_many), the failure of one packet
+        does not stop the batch.
+
+        Parameters
+        ----------
+        batch : PacketBatch
+            prepared packets
+        count : int, optional
+            number of the packets to send starting from the offset, by
+            default None (till the end of the batch)
+        results : ctypes array of err_t, optional
+            array receiving lwip error code per sent packet, by default
+            None
+        offset : int, optional
+            index of the first packet of the batch to send, by default 0
+
+        Returns
+        -------
+        int
+            number of sent packets
+        """
+        available = len(batch) - offset
+        count = available if count is None else min(count, available)
+        if count <= 0:
+            return 0
+
+        descriptors = batch.descriptors
+        if offset:
+            descriptors = (_RawPacket * count).from_buffer(
+                descriptors, offset * ctypes.sizeof(_RawPacket),
+            )
+        if self._raw_sendto_many is not None:
+            return self._raw_sendto_many(
+                self._pcb, descriptors, count, results,
+            )
+
+        sent = 0
+        for index, descriptor in enumerate(descriptors[:count]):
+            send_result = self._send_descriptor(descriptor)
+            if results is not None:
+                results[index] = send_result
+            sent += not send_result
+        return sent
+
+    def set_recv_callback(self, callback):
+        """
+        Set callback to be invoked on incoming packets.
+
+        Callback receives the socket, the packet (bytearray including
+        the IP header) and the source address (IpV4Addr). The packets
+        are not processed by the stack while the callback is set.
+
+        Parameters
+        ----------
+        callback : function
+            the callback function, None to return the packets to the
+            stack
+        """
+        self._rx_callback = callback
+        self._counters = None
+        if callback is None:
+            self._raw_recv(self._pcb, raw_recv_fn_type(), None)
+        else:
+            self._raw_recv(self._pcb, self._internal_callback, None)
+
+    def enable_counting(self):
+        """
+        Consume the incoming packets counting them.
+
+        The counting is done by the library without the callback into
+        python (if the library provides lwip_py_raw_count).
+        """
+        self._rx_callback = None
+        self._counters = _RawCounters()
+        if self._raw_count is not None:
+            self._raw_count(self._pcb, self._counters)
+        else:
+            self._raw_recv(self._pcb, self._internal_callback, None)
+
+    def get_counters(self):
+        """
+        Return counters of the consumed packets.
+
+        Returns
+        -------
+        RawCounters
+            number of packets and bytes (including IP headers) received
+            since the counting is enabled
+        """
+        if self._counters is None:
+            return RawCounters(0, 0)
+        return RawCounters(self._counters.packets, self._counters.bytes)
+
+    def close(self):
+        """
+        Release the low-level socket.
+
+        The socket can not be used after the call.
+        """
+        if self._pcb is not None:
+            self._raw_remove(self._pcb)
+            self._pcb = None
+
+    def _send_pbuf(self, data_to_send, send_function):
+        pbuf_to_send = self._allocator.allocate_transport_pbuf_from_data(
+            data_to_send,
+        )
+        try:
+            send_result = send_function(self._pcb, pbuf_to_send)
+        finally:
+            self._allocator.free_pbuf(pbuf_to_send)
+
+        if send_result:
+            raise exceptions.StackException(send_result)
+
+    def _send_descriptor(self, descriptor):
+        try:
+            self.send_to(
+                ctypes.string_at(descriptor.data, descriptor.len),
+                descriptor.addr,
+            )
+        except exceptions.AllocationError:
+            return _ERR_MEM
+        except exceptions.StackException as send_error:
+            return send_error.args[0]
+        return 0
+
+    def _recv_callback(self, arg, pcb, pbuf, addr):
+        self._allocator.take_over(pbuf)
+        try:
+            if self._counters is not None:
+                self._counters.packets += 1
+                self._counters.bytes += pbuf.contents.tot_len
+                return 1
+            payload = self._allocator.copy_payload(pbuf)
+        finally:
+            self._allocator.free_pbuf(pbuf)
+
+        if self._rx_callback:
+            ip_address = IpV4Addr()
+            ip_address.addr = addr.contents.addr
+            self._rx_callback(self, payload, ip_address)
+        return 1
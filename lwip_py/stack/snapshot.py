@@ -0,0 +1,179 @@
+"""
+Snapshot of the memory state of the library instance.
+
+The state of the lwip instance (globals, pools, heap) is located in the
+writable data segments of the loaded library (.data, .bss). The
+segments are found via dl_iterate_phdr for the instance load address,
+the relocation read-only part (PT_GNU_RELRO) is excluded. Restoring the
+copy of the segments in place returns the instance into the state at
+the time of the snapshot without reloading the library.
+"""
+import ctypes
+
+from lwip_py.stack import exceptions
+
+_RTLD_DI_LINKMAP = 2
+_PT_LOAD = 1
+_PT_GNU_RELRO = 0x6474E552
+_PF_W = 0x2
+
+_address_type = ctypes.c_size_t
+
+
+class _Elf64Phdr(ctypes.Structure):
+    _fields_ = [
+        ('p_type', ctypes.c_uint32),
+        ('p_flags', ctypes.c_uint32),
+        ('p_offset', ctypes.c_uint64),
+        ('p_vaddr', ctypes.c_uint64),
+        ('p_paddr', ctypes.c_uint64),
+        ('p_filesz', ctypes.c_uint64),
+        ('p_memsz', ctypes.c_uint64),
+        ('p_align', ctypes.c_uint64),
+    ]
+
+
+class _Elf32Phdr(ctypes.Structure):
+    _fields_ = [
+        ('p_type', ctypes.c_uint32),
+        ('p_offset', ctypes.c_uint32),
+        ('p_vaddr', ctypes.c_uint32),
+        ('p_paddr', ctypes.c_uint32),
+        ('p_filesz', ctypes.c_uint32),
+        ('p_memsz', ctypes.c_uint32),
+        ('p_flags', ctypes.c_uint32),
+        ('p_align', ctypes.c_uint32),
+    ]
+
+
+_Phdr = _Elf64Phdr if ctypes.sizeof(ctypes.c_void_p) == 8 else _Elf32Phdr
+
+
+class _DlPhdrInfo(ctypes.Structure):
+    _fields_ = [
+        ('dlpi_addr', _address_type),
+        ('dlpi_name', ctypes.c_char_p),
+        ('dlpi_phdr', ctypes.POINTER(_Phdr)),
+        ('dlpi_phnum', ctypes.c_uint16),
+    ]
+
+
+class _LinkMap(ctypes.Structure):
+    _fields_ = [('l_addr', _address_type)]
+
+
+_dl_iterate_phdr_callback = ctypes.CFUNCTYPE(
+    ctypes.c_int, ctypes.POINTER(_DlPhdrInfo), ctypes.c_size_t,
+    ctypes.c_void_p,
+)
+
+
+def _get_load_address(lib):
+    libc = ctypes.CDLL(None)
+    link_map = ctypes.POINTER(_LinkMap)()
+    if libc.dlinfo(
+        ctypes.c_void_p(lib._handle),
+        _RTLD_DI_LINKMAP,
+        ctypes.byref(link_map),
+    ):
+        raise exceptions.StackException('Library link map is not available')
+    return link_map.contents.l_addr
+
+
+def _subtract(region, excluded):
+    start, end = region
+    excluded_start, excluded_end = excluded
+    if excluded_end <= start or excluded_start >= end:
+        return [region]
+    return [
+        (part_start, part_end)
+        for part_start, part_end in (
+            (start, excluded_start), (excluded_end, end),
+        )
+        if part_end > part_start
+    ]
+
+
+def get_writable_regions(lib):
+    """
+    Return the writable data regions of the loaded library.
+
+    Parameters
+    ----------
+    lib : ctypes.CDLL
+        loaded library instance
+
+    Returns
+    -------
+    list[tuple(int, int)]
+        regions as (address, size) pairs
+
+    Raises
+    ------
+    StackException
+        if the library segments can not be found
+    """
+    load_address = _get_load_address(lib)
+    segments = []
+
+    def visit(info, size, data):
+        if info.contents.dlpi_addr != load_address:
+            return 0
+        for index in range(info.contents.dlpi_phnum):
+            phdr = info.contents.dlpi_phdr[index]
+            segments.append(
+                (phdr.p_type, phdr.p_flags, phdr.p_vaddr, phdr.p_memsz),
+            )
+        return 1
+
+    ctypes.CDLL(None).dl_iterate_phdr(_dl_iterate_phdr_callback(visit), None)
+    if not segments:
+        raise exceptions.StackException('Library segments are not found')
+
+    regions = [
+        (load_address + vaddr, load_address + vaddr + memsz)
+        for segment_type, flags, vaddr, memsz in segments
+        if segment_type == _PT_LOAD and flags & _PF_W
+    ]
+    for segment_type, _, vaddr, memsz in segments:
+        if segment_type == _PT_GNU_RELRO:
+            relro = (load_address + vaddr, load_address + vaddr + memsz)
+            regions = [
+                part for region in regions for part in _subtract(region, relro)
+            ]
+
+    return [(start, end - start) for start, end in regions]
+
+
+class MemorySnapshot(object):
+    """Copy of the memory regions that can be restored in place."""
+
+    def __init__(self, regions):
+        """
+        Copy the regions.
+
+        Parameters
+        ----------
+        regions : iterable[tuple(int, int)]
+            regions as (address, size) pairs
+        """
+        self._regions = [
+            (address, ctypes.string_at(address, size))
+            for address, size in regions
+        ]
+
+    def restore(self):
+        """Write the copied content back into the regions."""
+        for address, content in self._regions:
+            ctypes.memmove(address, content, len(content))
+
+    def get_size(self):
+        """
+        Return the size of the copied memory.
+
+        Returns
+        -------
+        int
+            number of bytes
+        """
+        return sum(len(content) for _, content in self._regions)
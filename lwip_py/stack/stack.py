@@ -1,10 +1,33 @@
 """lwip stack python wrapper."""
-from lwip_py.stack import udp_socket
+import collections
+import ctypes
+
+from lwip_py.stack import (
+    exceptions,
+    raw_socket,
+    snapshot,
+    tcp_socket,
+    udp_socket,
+)
+from lwip_py.stack.ip_address import IpV4Addr
 from lwip_py.stack.memory_allocator import Allocator
 from lwip_py.stack.netif import NetIf
+from lwip_py.stack.pbuf_tracker import TrackingAllocator
 from lwip_py.stack.ping_client import PingClient
+from lwip_py.stack.ping_engine import PingEngine
+from lwip_py.stack.stats import StatsReader
 from lwip_py.utility import ctypes_helper
 
+err_t = ctypes.c_int8
+
+StackSnapshot = collections.namedtuple(
+    'StackSnapshot', ['memory', 'interfaces', 'pbufs'],
+)
+
+
+class _EthAddr(ctypes.Structure):
+    _fields_ = [('addr', ctypes.c_uint8 * 6)]
+
 
 class SocketTypes(object):
     """Types of socket to create."""
@@ -17,7 +40,7 @@ class SocketTypes(object):
 class Stack(object):
     """Wrapper around lwip stack instance."""
 
-    def __init__(self, library_loader):
+    def __init__(self, library_loader, pbuf_tracker=None):
         """
         Initialize new object.
 
@@ -25,9 +48,14 @@ class Stack(object):
         ----------
         library_loader : callable
             callable returning new instance of the lwip lib
+        pbuf_tracker : PbufTracker, optional
+            tracker recording the pbufs owned by the python code,
+            by default None (no tracking)
         """
         self._library_loader = library_loader
+        self._pbuf_tracker = pbuf_tracker
         self._interfaces = {}
+        self._stats_reader = None
 
     def init(self):
         """
@@ -40,6 +68,15 @@ class Stack(object):
         self._sys_check_timeouts = ctypes_helper.wrap_function(
             self._lwip, 'sys_check_timeouts', None, None,
         )
+        self._writable_regions = None
+        self._etharp_add_static_entry = None
+
+        if self._pbuf_tracker is not None:
+            self._allocator = TrackingAllocator(
+                self._lwip, self._pbuf_tracker,
+            )
+        else:
+            self._allocator = Allocator(self._lwip)
 
         self._lwip.lwip_init()
 
@@ -63,19 +100,20 @@ class Stack(object):
 
     def make_allocator(self):
         """
-        Make new memory allocator associated with the stack.
+        Return memory allocator associated with the stack.
 
         Allocation will be happening from the pools and memory areas
-        reserved in the stack lib.
+        reserved in the stack lib. The allocator is shared by all users
+        of the stack.
 
         Returns
         -------
         MemoryAllocator
-            new allocator
+            stack allocator
         """
-        return Allocator(self._lwip)
+        return self._allocator
 
-    def make_socket(self, socket_type):
+    def make_socket(self, socket_type, protocol=None):
         """
         Make socket instance.
 
@@ -83,6 +121,8 @@ class Stack(object):
         ----------
         socket_type : int
             type of the socket to be created
+        protocol : int, optional
+            IP protocol number, required for SOCK_RAW, by default None
 
         Returns
         -------
@@ -92,10 +132,17 @@ class Stack(object):
         Raises
         ------
         ValueError
-            only SOCK_DGRAM is currently supported
+            only SOCK_DGRAM, SOCK_STREAM and SOCK_RAW (with the protocol)
+            are currently supported
         """
         if socket_type == SocketTypes.sock_dgram:
             return udp_socket.UdpSocket(self._lwip, self.make_allocator())
+        if socket_type == SocketTypes.sock_stream:
+            return tcp_socket.TcpSocket(self._lwip, self.make_allocator())
+        if socket_type == SocketTypes.sock_raw and protocol is not None:
+            return raw_socket.RawSocket(
+                self._lwip, self.make_allocator(), protocol,
+            )
 
         raise ValueError()
 
@@ -110,6 +157,86 @@ class Stack(object):
         """
         return PingClient(self._lwip)
 
+    def make_ping_engine(self, capacity=1024):
+        """
+        Make new ICMP echo engine.
+
+        Unlike the ping client, the engine keeps many requests in
+        flight across many targets and measures the round trip times.
+
+        Parameters
+        ----------
+        capacity : int, optional
+            maximum number of outstanding requests, by default 1024
+
+        Returns
+        -------
+        PingEngine
+            new engine
+        """
+        return PingEngine(self._lwip, capacity)
+
+    def add_static_arp_entry(self, ip_address, hwaddr):
+        """
+        Add static entry into the ARP table.
+
+        The entry is bound to the interface routing the address, so the
+        interfaces should be up. Should be called in the host context.
+
+        Parameters
+        ----------
+        ip_address : string
+            ip address of the neighbour
+        hwaddr : bytes
+            6-byte hardware address of the neighbour
+
+        Raises
+        ------
+        StackException
+            if the library is built without static ARP entries or the
+            entry can not be added (ERR_RTE if the address is not
+            routable, ERR_MEM if the ARP table is full)
+        """
+        if self._etharp_add_static_entry is None:
+            try:
+                self._etharp_add_static_entry = ctypes_helper.wrap_function(
+                    self._lwip,
+                    'etharp_add_static_entry',
+                    err_t,
+                    [ctypes.POINTER(IpV4Addr), ctypes.POINTER(_EthAddr)],
+                )
+            except AttributeError:
+                raise exceptions.StackException(
+                    'lwip library is built without static ARP entries',
+                )
+
+        add_result = self._etharp_add_static_entry(
+            IpV4Addr(ip_address), _EthAddr((ctypes.c_uint8 * 6)(*hwaddr)),
+        )
+        if add_result:
+            raise exceptions.StackException(add_result)
+
+    def get_arp_table_size(self):
+        """
+        Return the number of entries of the ARP table.
+
+        The static entries are never evicted, so they should leave room
+        for the dynamic ones.
+
+        Returns
+        -------
+        int
+            ARP_TABLE_SIZE of the library, None if the library does not
+            report it
+        """
+        try:
+            get_size = ctypes_helper.wrap_function(
+                self._lwip, 'lwip_py_get_arp_table_size', ctypes.c_uint16, [],
+            )
+        except AttributeError:
+            return None
+        return get_size()
+
     def get_interfaces(self):
         """
         Return interfaces associated with the stack.
@@ -121,6 +248,106 @@ class Stack(object):
         """
         return self._interfaces
 
+    def get_pbuf_tracker(self):
+        """
+        Return tracker of the pbufs owned by the python code.
+
+        Returns
+        -------
+        PbufTracker
+            the tracker, None if tracking is not enabled
+        """
+        return self._pbuf_tracker
+
+    def get_stats(self):
+        """
+        Return statistics of the stack instance.
+
+        Per-protocol counters and per-pool memory usage allow to size the
+        pools and to see where the packets are dropped. Should be called
+        in the host context to get consistent values.
+
+        Returns
+        -------
+        StackStats
+            statistics snapshot
+
+        Raises
+        ------
+        StackException
+            if the library is built without statistics (LWIP_STATS 0)
+        """
+        if self._stats_reader is None:
+            self._stats_reader = StatsReader(self._lwip)
+        return self._stats_reader.read()
+
+    def get_tcp_config(self):
+        """
+        Return the TCP related build options of the stack library.
+
+        Returns
+        -------
+        TcpConfig
+            segment size, windows, buffers and pool sizes
+        """
+        return tcp_socket.read_tcp_config(self._lwip)
+
+    def take_snapshot(self):
+        """
+        Take snapshot of the stack state.
+
+        The writable data segments of the library instance (globals,
+        pools, heap) and the interface structures are copied. Should be
+        called in the host context.
+
+        Returns
+        -------
+        StackSnapshot
+            snapshot to be passed to restore_snapshot
+
+        Raises
+        ------
+        StackException
+            if the data segments of the library can not be located
+        """
+        if self._writable_regions is None:
+            self._writable_regions = snapshot.get_writable_regions(self._lwip)
+
+        regions = list(self._writable_regions)
+        regions.extend(
+            netif.get_memory_region() for netif in self._interfaces.values()
+        )
+        return StackSnapshot(
+            snapshot.MemorySnapshot(regions),
+            dict(self._interfaces),
+            self._pbuf_tracker and self._pbuf_tracker.save_state(),
+        )
+
+    def restore_snapshot(self, stack_snapshot):
+        """
+        Restore the stack state from the snapshot in place.
+
+        The python objects created after the snapshot (sockets, ping
+        clients, interfaces) refer to the released stack resources and
+        must not be used after the restore. Should be called in the host
+        context.
+
+        Parameters
+        ----------
+        stack_snapshot : StackSnapshot
+            snapshot taken by take_snapshot
+        """
+        stack_snapshot.memory.restore()
+        self._interfaces = dict(stack_snapshot.interfaces)
+        if self._pbuf_tracker is not None:
+            self._pbuf_tracker.restore_state(stack_snapshot.pbufs)
+
+        try:
+            restart_timeouts = self._lwip.sys_restart_timeouts
+        except AttributeError:
+            return
+        restart_timeouts()
+
     def service_timeouts(self):
         """
         Service stack timeouts.
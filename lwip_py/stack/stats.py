@@ -0,0 +1,249 @@
+"""
+Access to lwip statistics (lwip_stats) of the library instance.
+
+The layout of the lwip_stats structure depends on the library
+configuration, so the ctypes mirror is built according to the layout
+reported by the library itself (lwip_py_get_stats_layout). The library
+has to be built with LWIP_STATS enabled (see liblwip_stats.so).
+"""
+import collections
+import ctypes
+
+from lwip_py.stack import exceptions
+from lwip_py.utility import ctypes_helper
+
+PROTOCOL_COUNTERS = (
+    'xmit',
+    'recv',
+    'fw',
+    'drop',
+    'chkerr',
+    'lenerr',
+    'memerr',
+    'rterr',
+    'proterr',
+    'opterr',
+    'err',
+    'cachehit',
+)
+
+IGMP_COUNTERS = (
+    'xmit',
+    'recv',
+    'drop',
+    'chkerr',
+    'lenerr',
+    'memerr',
+    'proterr',
+    'rx_v1',
+    'rx_group',
+    'rx_general',
+    'rx_report',
+    'tx_join',
+    'tx_leave',
+    'tx_report',
+)
+
+SYS_ELEMENTS = ('sem', 'mutex', 'mbox')
+
+ProtocolStats = collections.namedtuple('ProtocolStats', PROTOCOL_COUNTERS)
+IgmpStats = collections.namedtuple('IgmpStats', IGMP_COUNTERS)
+MemoryStats = collections.namedtuple(
+    'MemoryStats', ['avail', 'used', 'max', 'err', 'illegal'],
+)
+SysStats = collections.namedtuple('SysStats', ['used', 'max', 'err'])
+StackStats = collections.namedtuple(
+    'StackStats', ['protocols', 'heap', 'pools', 'sys'],
+)
+StackStats.__doc__ = """
+Snapshot of the stack statistics.
+
+protocols   dictionary protocol name -> ProtocolStats (IgmpStats for igmp)
+heap        MemoryStats of the lwip heap (None if not collected)
+pools       dictionary pool name -> MemoryStats
+sys         dictionary element name -> SysStats (empty for NO_SYS builds)
+"""
+
+_SECTION_LINK = 0x0001
+_SECTION_ETHARP = 0x0002
+_SECTION_IPFRAG = 0x0004
+_SECTION_IP = 0x0008
+_SECTION_ICMP = 0x0010
+_SECTION_IGMP = 0x0020
+_SECTION_UDP = 0x0040
+_SECTION_TCP = 0x0080
+_SECTION_MEM = 0x0100
+_SECTION_MEMP = 0x0200
+_SECTION_SYS = 0x0400
+_SECTION_MEM_NAME = 0x1000
+
+_PROTOCOL_SECTIONS = (
+    (_SECTION_LINK, 'link'),
+    (_SECTION_ETHARP, 'etharp'),
+    (_SECTION_IPFRAG, 'ip_frag'),
+    (_SECTION_IP, 'ip'),
+    (_SECTION_ICMP, 'icmp'),
+)
+
+
+class _StatsLayout(ctypes.Structure):
+    _fields_ = [
+        ('sections', ctypes.c_uint32),
+        ('stats_size', ctypes.c_uint32),
+        ('memp_count', ctypes.c_uint16),
+        ('counter_size', ctypes.c_uint8),
+        ('mem_size_size', ctypes.c_uint8),
+    ]
+
+
+_unsigned_types = {
+    1: ctypes.c_uint8,
+    2: ctypes.c_uint16,
+    4: ctypes.c_uint32,
+    8: ctypes.c_uint64,
+}
+
+
+def _make_structure(name, fields):
+    return type(name, (ctypes.Structure,), {'_fields_': fields})
+
+
+def _build_stats_structure(layout):
+    counter = _unsigned_types[layout.counter_size]
+    mem_size = _unsigned_types[layout.mem_size_size]
+
+    proto = _make_structure(
+        '_StatsProto', [(field, counter) for field in PROTOCOL_COUNTERS],
+    )
+    igmp = _make_structure(
+        '_StatsIgmp', [(field, counter) for field in IGMP_COUNTERS],
+    )
+    mem_fields = [
+        ('err', counter),
+        ('avail', mem_size),
+        ('used', mem_size),
+        ('max', mem_size),
+        ('illegal', counter),
+    ]
+    if layout.sections & _SECTION_MEM_NAME:
+        mem_fields.insert(0, ('name', ctypes.c_char_p))
+    mem = _make_structure('_StatsMem', mem_fields)
+    sys_element = _make_structure(
+        '_StatsSysElem', [(field, counter) for field in SysStats._fields],
+    )
+    sys_stats = _make_structure(
+        '_StatsSys', [(element, sys_element) for element in SYS_ELEMENTS],
+    )
+
+    fields = [
+        (section_name, proto)
+        for section, section_name in _PROTOCOL_SECTIONS
+        if layout.sections & section
+    ]
+    optional_fields = (
+        (_SECTION_IGMP, 'igmp', igmp),
+        (_SECTION_UDP, 'udp', proto),
+        (_SECTION_TCP, 'tcp', proto),
+        (_SECTION_MEM, 'mem', mem),
+        (_SECTION_MEMP, 'memp', ctypes.POINTER(mem) * layout.memp_count),
+        (_SECTION_SYS, 'sys', sys_stats),
+    )
+    fields.extend(
+        (field_name, field_type)
+        for section, field_name, field_type in optional_fields
+        if layout.sections & section
+    )
+    return _make_structure('_LwipStats', fields)
+
+
+def _to_tuple(tuple_type, structure):
+    return tuple_type(
+        *(getattr(structure, field) for field in tuple_type._fields),
+    )
+
+
+class StatsReader(object):
+    """Class reads statistics of the lwip library instance."""
+
+    def __init__(self, lwip):
+        """
+        Initialize new object.
+
+        Parameters
+        ----------
+        lwip : lib instance (loaded via ctypes)
+            lwip library instance
+
+        Raises
+        ------
+        StackException
+            if the library is built without statistics or the layout of
+            the statistics can not be mirrored
+        """
+        try:
+            get_layout = ctypes_helper.wrap_function(
+                lwip,
+                'lwip_py_get_stats_layout',
+                None,
+                [ctypes.POINTER(_StatsLayout)],
+            )
+        except AttributeError:
+            raise exceptions.StackException(
+                'lwip library is built without statistics',
+            )
+
+        layout = _StatsLayout()
+        get_layout(ctypes.byref(layout))
+        self._sections = layout.sections
+
+        stats_type = _build_stats_structure(layout)
+        if ctypes.sizeof(stats_type) != layout.stats_size:
+            raise exceptions.StackException(
+                'Unexpected layout of the lwip statistics',
+            )
+        self._stats = stats_type.in_dll(lwip, 'lwip_stats')
+
+    def read(self):
+        """
+        Read current statistics.
+
+        Returns
+        -------
+        StackStats
+            statistics snapshot
+        """
+        protocols = {
+            field_name: _to_tuple(
+                ProtocolStats, getattr(self._stats, field_name),
+            )
+            for field_name, _ in self._stats._fields_
+            if field_name not in {'igmp', 'mem', 'memp', 'sys'}
+        }
+        if self._sections & _SECTION_IGMP:
+            protocols['igmp'] = _to_tuple(IgmpStats, self._stats.igmp)
+
+        heap = None
+        if self._sections & _SECTION_MEM:
+            heap = _to_tuple(MemoryStats, self._stats.mem)
+
+        pools = {}
+        if self._sections & _SECTION_MEMP:
+            for index, pool in enumerate(self._stats.memp):
+                if pool:
+                    pools[self._get_pool_name(index, pool)] = _to_tuple(
+                        MemoryStats, pool.contents,
+                    )
+
+        sys_elements = {}
+        if self._sections & _SECTION_SYS:
+            sys_elements = {
+                element: _to_tuple(SysStats, getattr(self._stats.sys, element))
+                for element in SYS_ELEMENTS
+            }
+
+        return StackStats(protocols, heap, pools, sys_elements)
+
+    def _get_pool_name(self, index, pool):
+        if self._sections & _SECTION_MEM_NAME and pool.contents.name:
+            return pool.contents.name.decode()
+        return 'pool{0}'.format(index)
@@ -0,0 +1,1014 @@
+"""Implementation of the lwip based Tcp socket."""
+
+import collections
+import ctypes
+import itertools
+
+from lwip_py.stack import exceptions
+from lwip_py.stack.ip_address import IpV4Addr
+from lwip_py.stack.pbuf import PBuf
+from lwip_py.utility import address_helpers, ctypes_helper
+
+err_t = ctypes.c_int8
+
+_ERR_OK = 0
+_ERR_VAL = -6
+_ERR_ABRT = -13
+
+TCP_WRITE_FLAG_COPY = 0x01
+TCP_DEFAULT_LISTEN_BACKLOG = 0xFF
+
+_MAX_RECVED_LEN = 0xFFFF
+_POLL_INTERVAL = 2
+
+tcp_recv_fn_type = ctypes.CFUNCTYPE(
+    err_t, ctypes.c_void_p, ctypes.c_void_p, ctypes.POINTER(PBuf), err_t,
+)
+tcp_sent_fn_type = ctypes.CFUNCTYPE(
+    err_t, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint16,
+)
+tcp_err_fn_type = ctypes.CFUNCTYPE(None, ctypes.c_void_p, err_t)
+tcp_accept_fn_type = ctypes.CFUNCTYPE(
+    err_t, ctypes.c_void_p, ctypes.c_void_p, err_t,
+)
+tcp_connected_fn_type = ctypes.CFUNCTYPE(
+    err_t, ctypes.c_void_p, ctypes.c_void_p, err_t,
+)
+tcp_poll_fn_type = ctypes.CFUNCTYPE(err_t, ctypes.c_void_p, ctypes.c_void_p)
+
+TcpConfig = collections.namedtuple(
+    'TcpConfig',
+    [
+        'mss',
+        'wnd',
+        'snd_buf',
+        'snd_queuelen',
+        'mem_size',
+        'memp_num_pbuf',
+        'memp_num_tcp_pcb',
+        'memp_num_tcp_pcb_listen',
+        'memp_num_tcp_seg',
+        'pbuf_pool_size',
+        'pbuf_pool_bufsize',
+    ],
+)
+TcpConfig.__doc__ = """
+Compile-time options of the library limiting the TCP performance.
+
+The fields are the lwipopts.h values (TCP_MSS, TCP_WND, TCP_SND_BUF,
+TCP_SND_QUEUELEN, MEM_SIZE, MEMP_NUM_PBUF, MEMP_NUM_TCP_PCB,
+MEMP_NUM_TCP_PCB_LISTEN, MEMP_NUM_TCP_SEG, PBUF_POOL_SIZE,
+PBUF_POOL_BUFSIZE).
+"""
+
+
+class _LwipTcpConfig(ctypes.Structure):
+    _fields_ = [(field, ctypes.c_uint32) for field in TcpConfig._fields]
+
+
+def read_tcp_config(lwip):
+    """
+    Read the TCP related options the library is built with.
+
+    Parameters
+    ----------
+    lwip : lib instance (loaded via ctypes)
+        lwip library instance
+
+    Returns
+    -------
+    TcpConfig
+        the options
+    """
+    get_config = ctypes_helper.wrap_function(
+        lwip,
+        'lwip_py_get_tcp_config',
+        None,
+        [ctypes.POINTER(_LwipTcpConfig)],
+    )
+    config = _LwipTcpConfig()
+    get_config(ctypes.byref(config))
+    return TcpConfig(
+        *(getattr(config, field) for field in TcpConfig._fields),
+    )
+
+
+# Callbacks shared by all sockets: the socket is found by the callback
+# argument (tcp_arg), so no thunk is created per connection. The
+# registry keeps the sockets with the attached pcb alive.
+_sockets = {}
+_socket_ids = itertools.count(1)
+
+
+def _on_recv(arg, pcb, pbuf, err):
+    tcp_socket = _sockets.get(arg)
+    if tcp_socket is None:
+        # the data is refused and kept by the stack
+        return _ERR_VAL
+    return tcp_socket._recv_callback(arg, pcb, pbuf, err)
+
+
+def _on_sent(arg, pcb, length):
+    tcp_socket = _sockets.get(arg)
+    if tcp_socket is None:
+        return _ERR_OK
+    return tcp_socket._sent_callback(arg, pcb, length)
+
+
+def _on_err(arg, err):
+    tcp_socket = _sockets.get(arg)
+    if tcp_socket is not None:
+        tcp_socket._err_callback(arg, err)
+
+
+def _on_poll(arg, pcb):
+    tcp_socket = _sockets.get(arg)
+    if tcp_socket is None:
+        return _ERR_OK
+    return tcp_socket._poll_callback(arg, pcb)
+
+
+def _on_accept(arg, new_pcb, err):
+    tcp_socket = _sockets.get(arg)
+    if tcp_socket is None:
+        # the stack aborts the new connection
+        return _ERR_VAL
+    return tcp_socket._accept_callback(arg, new_pcb, err)
+
+
+def _on_connected(arg, pcb, err):
+    tcp_socket = _sockets.get(arg)
+    if tcp_socket is None:
+        return _ERR_OK
+    return tcp_socket._connected_callback(arg, pcb, err)
+
+
+_recv_trampoline = tcp_recv_fn_type(_on_recv)
+_sent_trampoline = tcp_sent_fn_type(_on_sent)
+_err_trampoline = tcp_err_fn_type(_on_err)
+_poll_trampoline = tcp_poll_fn_type(_on_poll)
+_accept_trampoline = tcp_accept_fn_type(_on_accept)
+_connected_trampoline = tcp_connected_fn_type(_on_connected)
+
+_no_recv = tcp_recv_fn_type()
+_no_sent = tcp_sent_fn_type()
+_no_err = tcp_err_fn_type()
+_no_poll = tcp_poll_fn_type()
+_no_accept = tcp_accept_fn_type()
+
+_PyBUF_SIMPLE = 0
+
+
+class _PyBuffer(ctypes.Structure):
+    _fields_ = [
+        ('buf', ctypes.c_void_p),
+        ('obj', ctypes.c_void_p),
+        ('len', ctypes.c_ssize_t),
+        ('itemsize', ctypes.c_ssize_t),
+        ('readonly', ctypes.c_int),
+        ('ndim', ctypes.c_int),
+        ('format', ctypes.c_char_p),
+        ('shape', ctypes.c_void_p),
+        ('strides', ctypes.c_void_p),
+        ('suboffsets', ctypes.c_void_p),
+        ('internal', ctypes.c_void_p),
+    ]
+
+
+_get_buffer = ctypes.pythonapi.PyObject_GetBuffer
+_get_buffer.restype = ctypes.c_int
+_get_buffer.argtypes = [
+    ctypes.py_object, ctypes.POINTER(_PyBuffer), ctypes.c_int,
+]
+_release_buffer = ctypes.pythonapi.PyBuffer_Release
+_release_buffer.restype = None
+_release_buffer.argtypes = [ctypes.POINTER(_PyBuffer)]
+
+
+class _PinnedBuffer(object):
+    """
+    Buffer export of the object passed to the stack without a copy.
+
+    The export keeps the object alive and its memory in place (e.g.
+    bytearray can not be resized while exported) till it is released.
+    """
+
+    def __init__(self, data):
+        # __del__ runs even if the export below fails
+        self._exported = False
+        self._view = _PyBuffer()
+        _get_buffer(data, ctypes.byref(self._view), _PyBUF_SIMPLE)
+        self._exported = True
+        self.address = self._view.buf
+        self.size = self._view.len
+
+    def release(self):
+        if self._exported:
+            self._exported = False
+            _release_buffer(ctypes.byref(self._view))
+
+    def __del__(self):
+        self.release()
+
+
+class TcpSocket(object):
+    """
+    Class that implements Tcp socket (not fully posix like).
+
+    The class wraps lwip low level connection representation tcp_pcb
+    (raw TCP api). Should be used in the stack (host) context only.
+
+    Outgoing data is passed to the stack as long as the send buffer
+    (tcp_sndbuf) allows, the rest is kept in the socket and written when
+    the stack reports the acknowledged data (tcp_sent) or on the poll
+    timer. Received data is queued in the socket and the receive window
+    is opened (tcp_recved) only when the application consumes the data
+    via recv, so a slow reader throttles the sender.
+
+    Data sent with copy=False is not copied into the lwip heap: the
+    segments reference the memory of the object, which is pinned (the
+    buffer export is held) till the peer acknowledges the data, as lwip
+    may need it for the retransmission.
+
+    The stack callbacks of all sockets are served by shared
+    trampolines dispatching by the callback argument (tcp_arg), so a
+    connection costs no callback thunks. The socket is referenced by
+    the module registry while its pcb is attached.
+
+    A listening socket either passes every accepted connection to the
+    callback or keeps them in the accept queue (accept). The queued
+    connections count against the listen backlog if the library is
+    built with TCP_LISTEN_BACKLOG (server profile), so the stack drops
+    the connection attempts above the backlog.
+    """
+
+    def __init__(self, lwip, allocator, pcb=None):
+        """
+        Initialize new object.
+
+        Parameters
+        ----------
+        lwip : lib instance (loaded via ctypes)
+            lwip library instance
+        allocator : Allocator
+            allocator to be used for pbuf management
+        pcb : int, optional
+            address of the connected tcp_pcb (accepted connection),
+            by default None
+        """
+        self._lwip = lwip
+        self._allocator = allocator
+
+        self._tcp_new_ip_type = ctypes_helper.wrap_function(
+            self._lwip, 'tcp_new_ip_type', ctypes.c_void_p, [ctypes.c_uint8],
+        )
+        self._tcp_bind = ctypes_helper.wrap_function(
+            self._lwip,
+            'tcp_bind',
+            err_t,
+            [ctypes.c_void_p, ctypes.POINTER(IpV4Addr), ctypes.c_uint16],
+        )
+        self._tcp_listen_with_backlog = ctypes_helper.wrap_function(
+            self._lwip,
+            'tcp_listen_with_backlog',
+            ctypes.c_void_p,
+            [ctypes.c_void_p, ctypes.c_uint8],
+        )
+        self._tcp_arg = ctypes_helper.wrap_function(
+            self._lwip, 'tcp_arg', None, [ctypes.c_void_p, ctypes.c_void_p],
+        )
+        self._tcp_accept = ctypes_helper.wrap_function(
+            self._lwip,
+            'tcp_accept',
+            None,
+            [ctypes.c_void_p, tcp_accept_fn_type],
+        )
+        self._tcp_connect = ctypes_helper.wrap_function(
+            self._lwip,
+            'tcp_connect',
+            err_t,
+            [
+                ctypes.c_void_p,
+                ctypes.POINTER(IpV4Addr),
+                ctypes.c_uint16,
+                tcp_connected_fn_type,
+            ],
+        )
+        self._tcp_recv = ctypes_helper.wrap_function(
+            self._lwip, 'tcp_recv', None, [ctypes.c_void_p, tcp_recv_fn_type],
+        )
+        self._tcp_sent = ctypes_helper.wrap_function(
+            self._lwip, 'tcp_sent', None, [ctypes.c_void_p, tcp_sent_fn_type],
+        )
+        self._tcp_err = ctypes_helper.wrap_function(
+            self._lwip, 'tcp_err', None, [ctypes.c_void_p, tcp_err_fn_type],
+        )
+        self._tcp_poll = ctypes_helper.wrap_function(
+            self._lwip,
+            'tcp_poll',
+            None,
+            [ctypes.c_void_p, tcp_poll_fn_type, ctypes.c_uint8],
+        )
+        self._tcp_recved = ctypes_helper.wrap_function(
+            self._lwip,
+            'tcp_recved',
+            None,
+            [ctypes.c_void_p, ctypes.c_uint16],
+        )
+        self._tcp_output = ctypes_helper.wrap_function(
+            self._lwip, 'tcp_output', err_t, [ctypes.c_void_p],
+        )
+        self._tcp_close = ctypes_helper.wrap_function(
+            self._lwip, 'tcp_close', err_t, [ctypes.c_void_p],
+        )
+        self._tcp_abort = ctypes_helper.wrap_function(
+            self._lwip, 'tcp_abort', None, [ctypes.c_void_p],
+        )
+        self._tcp_get_addrinfo = ctypes_helper.wrap_function(
+            self._lwip,
+            'tcp_tcp_get_tcp_addrinfo',
+            err_t,
+            [
+                ctypes.c_void_p,
+                ctypes.c_int,
+                ctypes.POINTER(IpV4Addr),
+                ctypes.POINTER(ctypes.c_uint16),
+            ],
+        )
+        self._tcp_sndbuf = ctypes_helper.wrap_function(
+            self._lwip, 'lwip_py_tcp_sndbuf', ctypes.c_uint16,
+            [ctypes.c_void_p],
+        )
+        self._tcp_set_nodelay = ctypes_helper.wrap_function(
+            self._lwip,
+            'lwip_py_tcp_set_nodelay',
+            None,
+            [ctypes.c_void_p, ctypes.c_int],
+        )
+        self._tcp_write_some = ctypes_helper.wrap_function(
+            self._lwip,
+            'lwip_py_tcp_write_some',
+            ctypes.c_int32,
+            [
+                ctypes.c_void_p,
+                ctypes.c_void_p,
+                ctypes.c_uint32,
+                ctypes.c_uint8,
+            ],
+        )
+
+        try:
+            self._tcp_backlog_delayed = ctypes_helper.wrap_function(
+                self._lwip, 'tcp_backlog_delayed', None, [ctypes.c_void_p],
+            )
+            self._tcp_backlog_accepted = ctypes_helper.wrap_function(
+                self._lwip, 'tcp_backlog_accepted', None, [ctypes.c_void_p],
+            )
+        except AttributeError:
+            self._tcp_backlog_delayed = None
+            self._tcp_backlog_accepted = None
+
+        self._id = next(_socket_ids)
+
+        self._recv_user_callback = None
+        self._sent_user_callback = None
+        self._error_user_callback = None
+        self._accept_user_callback = None
+        self._connected_user_callback = None
+
+        self._recv_queue = collections.deque()
+        self._queued_bytes = 0
+        self._eof = False
+        self._error = None
+
+        self._pending = collections.deque()
+        self._pending_bytes = 0
+        self._unacked_bytes = 0
+        self._written_bytes = 0
+        self._pinned = collections.deque()
+        self._closing = False
+        self._aborted = False
+
+        self._accept_queue = None
+        self._backlog = 0
+
+        self._pcb = pcb
+        if pcb is not None:
+            self._attach()
+
+    def bind(self, end_point):
+        """
+        Bind socket to the ip_address/port pair.
+
+        Parameters
+        ----------
+        end_point : tuple(ip address string, port)
+            ip address and port to bind to, port 0 lets the stack choose
+
+        Raises
+        ------
+        AllocationError
+            if the low-level socket allocation can not be done
+        StackException
+            if the low-level stack error occures
+        """
+        self._ensure_pcb()
+
+        ip_address_str, port = end_point
+        ip_address = IpV4Addr(ip_address_str) if ip_address_str else None
+
+        bind_result = self._tcp_bind(self._pcb, ip_address, port)
+        if bind_result:
+            raise exceptions.StackException(bind_result)
+
+    def listen(
+        self, accept_callback=None, backlog=TCP_DEFAULT_LISTEN_BACKLOG,
+    ):
+        """
+        Start accepting incoming connections.
+
+        The socket should be bound. Callback receives new TcpSocket for
+        every accepted connection. Without the callback the accepted
+        connections are kept in the accept queue (see accept), the
+        receive callback of the listening socket is invoked when a
+        connection is queued.
+
+        Parameters
+        ----------
+        accept_callback : callable, optional
+            callable receiving accepted socket, by default None (accept
+            queue)
+        backlog : int, optional
+            maximum number of connections accepted by the stack but not
+            taken from the accept queue, by default 255
+
+        Raises
+        ------
+        AllocationError
+            if the listening pcb can not be allocated
+        """
+        self._ensure_pcb()
+        listen_pcb = self._tcp_listen_with_backlog(self._pcb, backlog)
+        if not listen_pcb:
+            raise exceptions.AllocationError()
+
+        self._pcb = listen_pcb
+        self._accept_user_callback = accept_callback
+        self._accept_queue = collections.deque()
+        self._backlog = max(backlog, 1)
+        self._register()
+        self._tcp_accept(self._pcb, _accept_trampoline)
+
+    def accept(self):
+        """
+        Take the next connection from the accept queue.
+
+        Returns
+        -------
+        TcpSocket
+            accepted connection (it may have failed already, see
+            is_connected), None if the queue is empty
+        """
+        if not self._accept_queue:
+            return None
+        accepted_socket = self._accept_queue.popleft()
+        if (
+            self._tcp_backlog_accepted is not None
+            and accepted_socket._pcb is not None
+        ):
+            self._tcp_backlog_accepted(accepted_socket._pcb)
+        return accepted_socket
+
+    def get_accept_queue_length(self):
+        """
+        Return number of connections waiting in the accept queue.
+
+        Returns
+        -------
+        int
+            number of connections
+        """
+        return len(self._accept_queue or ())
+
+    def connect(self, ip_address, port, connected_callback=None):
+        """
+        Connect to the remote end point.
+
+        The connection is established asynchronously, the callback
+        receives the socket and the lwip error code (0 on success).
+        Data sent before the connection is established is kept in the
+        socket.
+
+        Parameters
+        ----------
+        ip_address : IpV4Addr
+            address of the remote host
+        port : int
+            remote port
+        connected_callback : callable, optional
+            callable invoked when the connection is established,
+            by default None
+
+        Raises
+        ------
+        AllocationError
+            if the low-level socket allocation can not be done
+        StackException
+            if the low-level stack error occures
+        """
+        self._ensure_pcb()
+        self._attach()
+        self._connected_user_callback = connected_callback
+
+        connect_result = self._tcp_connect(
+            self._pcb, ip_address, port, _connected_trampoline,
+        )
+        if connect_result:
+            raise exceptions.StackException(connect_result)
+
+    def send(self, data_to_send, copy=True):
+        """
+        Send data to the remote end point.
+
+        The data is passed to the stack as far as the send buffer
+        allows, the rest is kept in the socket till the stack
+        acknowledges the sent data.
+
+        Without the copy the object is referenced by the stack segments
+        till the peer acknowledges the data, so it should not be
+        modified in the meantime. The stack send buffer is not limited
+        by the lwip heap then (the segments take pbufs from the
+        MEMP_NUM_PBUF pool instead).
+
+        Parameters
+        ----------
+        data_to_send : bytes_like
+            data that should be sent (C-contiguous buffer if not copied)
+        copy : bool, optional
+            should the data be copied into the stack, by default True
+
+        Raises
+        ------
+        StackException
+            if the connection is closed or the internal lwip error
+            occured
+        """
+        if self._pcb is None or self._closing:
+            raise exceptions.StackException('Connection is closed')
+
+        if copy:
+            if not isinstance(data_to_send, bytes):
+                data_to_send = bytes(data_to_send)
+            owner = data_to_send
+            address = ctypes.cast(data_to_send, ctypes.c_void_p).value
+            size = len(data_to_send)
+        else:
+            owner = _PinnedBuffer(data_to_send)
+            address = owner.address
+            size = owner.size
+        if not size:
+            return
+
+        apiflags = TCP_WRITE_FLAG_COPY if copy else 0
+        self._pending.append([address, size, 0, owner, apiflags])
+        self._pending_bytes += size
+        write_error = self._write_pending()
+        if write_error:
+            raise exceptions.StackException(write_error)
+
+    def recv(self, max_bytes=None):
+        """
+        Pull received data from the socket.
+
+        The consumed amount of data is reported to the stack which opens
+        the receive window accordingly.
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            maximum amount of data to return, by default None (all
+            queued data)
+
+        Returns
+        -------
+        bytes
+            received data, empty if the remote end closed the connection
+            and all data was consumed, None if no data is available
+        """
+        if not self._recv_queue:
+            return b'' if self._eof else None
+
+        chunks = []
+        size = 0
+        while self._recv_queue and (max_bytes is None or size < max_bytes):
+            chunk = self._recv_queue.popleft()
+            if max_bytes is not None and size + len(chunk) > max_bytes:
+                split = max_bytes - size
+                self._recv_queue.appendleft(chunk[split:])
+                chunk = chunk[:split]
+            chunks.append(chunk)
+            size += len(chunk)
+
+        self._consume(size)
+        return b''.join(chunks)
+
+    def recv_into(self, buffer):
+        """
+        Pull received data into the buffer.
+
+        Parameters
+        ----------
+        buffer : bytes_like
+            writable buffer
+
+        Returns
+        -------
+        int
+            number of bytes written into the buffer, None if no data is
+            available (0 at the end of the stream)
+        """
+        received_data = self.recv(len(buffer))
+        if received_data is None:
+            return None
+        buffer[:len(received_data)] = received_data
+        return len(received_data)
+
+    def close(self):
+        """
+        Close the connection.
+
+        The data kept in the socket is sent before the connection is
+        closed, the connection is closed after the data sent without
+        the copy is acknowledged. The callbacks are not invoked after
+        the call.
+        """
+        self._recv_user_callback = None
+        self._sent_user_callback = None
+        self._error_user_callback = None
+        self._closing = True
+        if not self._pending and not self._pinned:
+            self._close_pcb()
+
+    def abort(self):
+        """Abort the connection (RST is sent), queued data is dropped."""
+        if self._accept_queue is not None:
+            self._close_pcb()
+            return
+        if self._pcb is not None:
+            pcb = self._pcb
+            self._detach()
+            self._aborted = True
+            self._tcp_abort(pcb)
+        self._release_pinned()
+        self._pending.clear()
+        self._pending_bytes = 0
+
+    def set_recv_callback(self, callback):
+        """
+        Set the callback invoked when the socket becomes readable.
+
+        Callback receives the socket when data is received, the remote
+        end closed the connection or the connection failed.
+
+        Parameters
+        ----------
+        callback : callable
+            the callback function
+        """
+        self._recv_user_callback = callback
+
+    def set_sent_callback(self, callback):
+        """
+        Set the callback invoked when the sent data is acknowledged.
+
+        Callback receives the socket and the amount of acknowledged
+        bytes, it is invoked after the data kept in the socket is
+        passed to the stack.
+
+        Parameters
+        ----------
+        callback : callable
+            the callback function
+        """
+        self._sent_user_callback = callback
+
+    def set_error_callback(self, callback):
+        """
+        Set the callback invoked when the connection fails.
+
+        Callback receives the socket and the lwip error code, the
+        connection is already released by the stack.
+
+        Parameters
+        ----------
+        callback : callable
+            the callback function
+        """
+        self._error_user_callback = callback
+
+    def set_nodelay(self, enabled=True):
+        """
+        Disable the Nagle algorithm.
+
+        Parameters
+        ----------
+        enabled : bool, optional
+            should the small segments be sent immediately,
+            by default True
+        """
+        self._tcp_set_nodelay(self._pcb, int(enabled))
+
+    def get_send_buffer_space(self):
+        """
+        Return free space of the stack send buffer.
+
+        Returns
+        -------
+        int
+            number of bytes that can be passed to the stack
+        """
+        if self._pcb is None:
+            return 0
+        return self._tcp_sndbuf(self._pcb)
+
+    def get_pending_bytes(self):
+        """
+        Return amount of data kept in the socket.
+
+        Returns
+        -------
+        int
+            number of bytes not passed to the stack yet
+        """
+        return self._pending_bytes
+
+    def get_unacked_bytes(self):
+        """
+        Return amount of data passed to the stack but not acknowledged.
+
+        Returns
+        -------
+        int
+            number of bytes
+        """
+        return self._unacked_bytes
+
+    def get_pinned_bytes(self):
+        """
+        Return amount of data referenced by the stack without a copy.
+
+        Returns
+        -------
+        int
+            number of bytes sent with copy=False and not acknowledged
+        """
+        return sum(pinned.size for _, pinned in self._pinned)
+
+    def get_queued_bytes(self):
+        """
+        Return amount of received data not consumed yet.
+
+        Returns
+        -------
+        int
+            number of bytes
+        """
+        return self._queued_bytes
+
+    def is_eof(self):
+        """
+        Check if the remote end closed the connection.
+
+        Returns
+        -------
+        bool
+            True if no more data will be received
+        """
+        return self._eof
+
+    def is_connected(self):
+        """
+        Check if the connection is alive.
+
+        Returns
+        -------
+        bool
+            False if the connection is closed or failed
+        """
+        return self._pcb is not None and self._error is None
+
+    def get_error(self):
+        """
+        Return the error the connection failed with.
+
+        Returns
+        -------
+        int
+            lwip error code, None if the connection did not fail
+        """
+        return self._error
+
+    def get_local_address(self):
+        return self._get_address_info(local=True)[0]
+
+    def get_local_port(self):
+        return self._get_address_info(local=True)[1]
+
+    def get_remote_address(self):
+        return self._get_address_info(local=False)[0]
+
+    def get_remote_port(self):
+        return self._get_address_info(local=False)[1]
+
+    def _get_address_info(self, local):
+        ip_address = IpV4Addr()
+        port = ctypes.c_uint16()
+        info_result = self._tcp_get_addrinfo(
+            self._pcb, int(local), ip_address, ctypes.byref(port),
+        )
+        if info_result:
+            raise exceptions.StackException(info_result)
+        return (
+            address_helpers.int_ip_to_string(ip_address.addr), port.value,
+        )
+
+    def _ensure_pcb(self):
+        if self._pcb is not None:
+            return
+        ip_type_v4 = 0
+        pcb = self._tcp_new_ip_type(ip_type_v4)
+        if not pcb:
+            raise exceptions.AllocationError()
+        self._pcb = pcb
+
+    def _register(self):
+        _sockets[self._id] = self
+        self._tcp_arg(self._pcb, self._id)
+
+    def _unregister(self):
+        _sockets.pop(self._id, None)
+
+    def _attach(self):
+        self._register()
+        self._tcp_recv(self._pcb, _recv_trampoline)
+        self._tcp_sent(self._pcb, _sent_trampoline)
+        self._tcp_err(self._pcb, _err_trampoline)
+        self._tcp_poll(self._pcb, _poll_trampoline, _POLL_INTERVAL)
+
+    def _detach(self):
+        pcb = self._pcb
+        self._pcb = None
+        self._unregister()
+        self._tcp_recv(pcb, _no_recv)
+        self._tcp_sent(pcb, _no_sent)
+        self._tcp_err(pcb, _no_err)
+        self._tcp_poll(pcb, _no_poll, 0)
+
+    def _close_pcb(self):
+        if self._pcb is None:
+            return
+        pcb = self._pcb
+        if self._accept_queue is not None:
+            self._pcb = None
+            self._unregister()
+            self._tcp_accept(pcb, _no_accept)
+            while self._accept_queue:
+                self._accept_queue.popleft().abort()
+        else:
+            self._detach()
+
+        if self._tcp_close(pcb):
+            self._aborted = True
+            self._tcp_abort(pcb)
+
+    def _get_callback_result(self):
+        # the pcb aborted in the callback must not be touched by lwip
+        return _ERR_ABRT if self._aborted else _ERR_OK
+
+    def _consume(self, size):
+        self._queued_bytes -= size
+        while size and self._pcb is not None:
+            window_update = min(size, _MAX_RECVED_LEN)
+            self._tcp_recved(self._pcb, window_update)
+            size -= window_update
+
+    def _write_pending(self):
+        written_total = 0
+        while self._pending and self._pcb is not None:
+            entry = self._pending[0]
+            address, size, offset, owner, apiflags = entry
+            written = self._tcp_write_some(
+                self._pcb, address + offset, size - offset, apiflags,
+            )
+            if written < 0:
+                self._account_written(written_total)
+                return written
+            written_total += written
+            if offset + written < size:
+                entry[2] = offset + written
+                break
+            self._pending.popleft()
+            if not apiflags & TCP_WRITE_FLAG_COPY:
+                self._pinned.append(
+                    (self._written_bytes + written_total, owner),
+                )
+
+        if written_total:
+            self._account_written(written_total)
+            self._tcp_output(self._pcb)
+        return _ERR_OK
+
+    def _account_written(self, written_total):
+        self._pending_bytes -= written_total
+        self._unacked_bytes += written_total
+        self._written_bytes += written_total
+
+    def _release_acked(self):
+        acked_bytes = self._written_bytes - self._unacked_bytes
+        while self._pinned and self._pinned[0][0] <= acked_bytes:
+            self._pinned.popleft()[1].release()
+
+    def _release_pinned(self):
+        # the stack has freed the segments referencing the objects
+        while self._pinned:
+            self._pinned.popleft()[1].release()
+        for entry in self._pending:
+            if not entry[4] & TCP_WRITE_FLAG_COPY:
+                entry[3].release()
+
+    def _flush_and_close(self):
+        self._write_pending()
+        if self._closing and not self._pending and not self._pinned:
+            self._close_pcb()
+
+    def _notify_readable(self):
+        if self._recv_user_callback is not None:
+            self._recv_user_callback(self)
+
+    def _recv_callback(self, arg, pcb, pbuf, err):
+        if not pbuf:
+            self._eof = True
+            self._notify_readable()
+            return self._get_callback_result()
+
+        self._allocator.take_over(pbuf)
+        try:
+            if err == _ERR_OK:
+                payload = self._allocator.copy_payload(pbuf)
+                self._recv_queue.append(bytes(payload))
+                self._queued_bytes += len(payload)
+        finally:
+            self._allocator.free_pbuf(pbuf)
+
+        self._notify_readable()
+        return self._get_callback_result()
+
+    def _sent_callback(self, arg, pcb, length):
+        self._unacked_bytes -= length
+        self._release_acked()
+        self._flush_and_close()
+        if self._sent_user_callback is not None:
+            self._sent_user_callback(self, length)
+        return self._get_callback_result()
+
+    def _poll_callback(self, arg, pcb):
+        self._flush_and_close()
+        return self._get_callback_result()
+
+    def _err_callback(self, arg, err):
+        self._pcb = None
+        self._unregister()
+        self._error = err
+        self._eof = True
+        self._release_pinned()
+        self._pending.clear()
+        self._pending_bytes = 0
+        if self._error_user_callback is not None:
+            self._error_user_callback(self, err)
+        self._notify_readable()
+
+    def _connected_callback(self, arg, pcb, err):
+        if err == _ERR_OK:
+            self._write_pending()
+        if self._connected_user_callback is not None:
+            self._connected_user_callback(self, err)
+        return self._get_callback_result()
+
+    def _accept_callback(self, arg, new_pcb, err):
+        if err != _ERR_OK or not new_pcb:
+            return _ERR_VAL
+
+        accepted_socket = TcpSocket(self._lwip, self._allocator, new_pcb)
+        if self._accept_user_callback is not None:
+            self._accept_user_callback(accepted_socket)
+            return accepted_socket._get_callback_result()
+
+        if len(self._accept_queue) >= self._backlog:
+            accepted_socket.abort()
+            return _ERR_ABRT
+        if self._tcp_backlog_delayed is not None:
+            # counts against the backlog till taken from the queue
+            self._tcp_backlog_delayed(new_pcb)
+        self._accept_queue.append(accepted_socket)
+        self._notify_readable()
+        return _ERR_OK
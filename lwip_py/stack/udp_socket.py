@@ -1,10 +1,11 @@
 """Implementation of the lwip based Udp socket."""
 
+import collections
 import ctypes
 
 from lwip_py.stack import PBuf, exceptions
 from lwip_py.stack.ip_address import IpV4Addr
-from lwip_py.utility import ctypes_helper
+from lwip_py.utility import address_helpers, ctypes_helper
 
 _IP_PCB_FIELDS = (
     ('local_ip', IpV4Addr),
@@ -42,6 +43,30 @@ _UdpPcb._fields_ = [
 
 err_t = ctypes.c_int8
 
+_ERR_MEM = -1
+
+
+class _Datagram(ctypes.Structure):
+    _fields_ = [
+        ('data', ctypes.c_void_p),
+        ('len', ctypes.c_uint16),
+        ('port', ctypes.c_uint16),
+        ('addr', IpV4Addr),
+    ]
+
+
+def _get_buffer_address(data, size, buffers):
+    if isinstance(data, bytes):
+        return ctypes.cast(data, ctypes.c_void_p).value
+
+    buffer_type = ctypes.c_char * size
+    try:
+        buffer = buffer_type.from_buffer(data)
+    except TypeError:
+        buffer = buffer_type.from_buffer_copy(data)
+    buffers.append(buffer)
+    return ctypes.addressof(buffer)
+
 
 class UdpSocket(object):
     """
@@ -49,9 +74,11 @@ class UdpSocket(object):
 
     The class wraps lwip low level socket representation udp_pcb.
     It allows to bind to the address/port, send data to the arbitrary
-    address/port and receive data. The received data is not stored in
-    the socket buffer, but forwarded via client specified callback.
-    The callback is invoked from the stack context.
+    address/port and receive data. By default the received data is not
+    stored in the socket buffer, but forwarded via client specified
+    callback invoked from the stack context. Optionally the datagrams
+    are stored in the bounded receive queue and can be pulled via
+    recv_from, recv_into and recv_many from any thread.
     """
 
     def __init__(self, lwip, allocator):
@@ -68,7 +95,11 @@ class UdpSocket(object):
         self._lwip = lwip
         self._allocator = allocator
         self._pcb = None
+        self._pcb_pointer = None
         self._rx_callback = None
+        self._recv_queue = None
+        self._readable_callback = None
+        self._dropped_datagrams = 0
 
         self._udp_new_ip_type = ctypes_helper.wrap_function(
             self._lwip,
@@ -103,6 +134,73 @@ class UdpSocket(object):
                 ctypes.c_uint16,
             ],
         )
+        self._udp_connect = ctypes_helper.wrap_function(
+            self._lwip,
+            'udp_connect',
+            err_t,
+            [
+                ctypes.POINTER(_UdpPcb),
+                ctypes.POINTER(IpV4Addr),
+                ctypes.c_uint16,
+            ],
+        )
+        self._udp_disconnect = ctypes_helper.wrap_function(
+            self._lwip,
+            'udp_disconnect',
+            None,
+            [ctypes.POINTER(_UdpPcb)],
+        )
+        self._udp_send = ctypes_helper.wrap_function(
+            self._lwip,
+            'udp_send',
+            err_t,
+            [ctypes.POINTER(_UdpPcb), ctypes.POINTER(PBuf)],
+        )
+        self._udp_remove = ctypes_helper.wrap_function(
+            self._lwip,
+            'udp_remove',
+            None,
+            [ctypes.POINTER(_UdpPcb)],
+        )
+        try:
+            self._udp_send_many = ctypes_helper.wrap_function(
+                self._lwip,
+                'lwip_py_udp_send_many',
+                ctypes.c_int,
+                [
+                    ctypes.POINTER(_UdpPcb),
+                    ctypes.POINTER(_Datagram),
+                    ctypes.c_int,
+                    ctypes.POINTER(err_t),
+                ],
+            )
+        except AttributeError:
+            self._udp_send_many = None
+        try:
+            self._udp_send_data = ctypes_helper.wrap_function(
+                self._lwip,
+                'lwip_py_udp_send',
+                err_t,
+                [ctypes.POINTER(_UdpPcb), ctypes.c_char_p, ctypes.c_uint16],
+            )
+        except AttributeError:
+            self._udp_send_data = None
+        try:
+            self._igmp_joingroup = ctypes_helper.wrap_function(
+                self._lwip,
+                'igmp_joingroup',
+                err_t,
+                [ctypes.POINTER(IpV4Addr), ctypes.POINTER(IpV4Addr)],
+            )
+            self._igmp_leavegroup = ctypes_helper.wrap_function(
+                self._lwip,
+                'igmp_leavegroup',
+                err_t,
+                [ctypes.POINTER(IpV4Addr), ctypes.POINTER(IpV4Addr)],
+            )
+        except AttributeError:
+            self._igmp_joingroup = None
+            self._igmp_leavegroup = None
 
     def bind(self, end_point):
         """
@@ -121,11 +219,14 @@ class UdpSocket(object):
             if the low-level stack error occures
         """
         ip_type_v4 = 0
-        self._pcb = self._udp_new_ip_type(ip_type_v4).contents
+        pcb_pointer = self._udp_new_ip_type(ip_type_v4)
 
-        if not self._pcb:
+        if not pcb_pointer:
             raise exceptions.AllocationError()
 
+        self._pcb_pointer = pcb_pointer
+        self._pcb = pcb_pointer.contents
+
         ip_address_str, port = end_point
         ip_address = IpV4Addr(ip_address_str) if ip_address_str else None
 
@@ -138,6 +239,150 @@ class UdpSocket(object):
             self._pcb, self._internal_callback, None,
         )
 
+    def connect(self, ip_address, port):
+        """
+        Set the remote end point of the socket.
+
+        The datagrams are then sent via send without the destination
+        and only the datagrams from the remote end point are received.
+
+        Parameters
+        ----------
+        ip_address : IpV4Addr
+            address of the remote host
+        port : int
+            remote port
+
+        Raises
+        ------
+        StackException
+            if the low-level stack error occures
+        """
+        connect_result = self._udp_connect(self._pcb, ip_address, port)
+        if connect_result:
+            raise exceptions.StackException(connect_result)
+
+    def disconnect(self):
+        """Remove the remote end point of the socket."""
+        self._udp_disconnect(self._pcb)
+
+    def send(self, data_to_send):
+        """
+        Send data to the connected remote end point.
+
+        Parameters
+        ----------
+        data_to_send : bytes_like
+            data that should be sent
+
+        Raises
+        ------
+        StackException
+            indicates that the internal lwip error occured
+        AllocationError
+            is raised if pbuf to place outgoing data can not be allocated
+        """
+        if self._udp_send_data is not None:
+            if not isinstance(data_to_send, bytes):
+                data_to_send = bytes(data_to_send)
+            send_result = self._udp_send_data(
+                self._pcb_pointer, data_to_send, len(data_to_send),
+            )
+            if send_result == _ERR_MEM:
+                raise exceptions.AllocationError()
+        else:
+            pbuf_to_send = self._allocator.allocate_transport_pbuf_from_data(
+                data_to_send,
+            )
+            try:
+                send_result = self._udp_send(self._pcb_pointer, pbuf_to_send)
+            finally:
+                self._allocator.free_pbuf(pbuf_to_send)
+
+        if send_result:
+            raise exceptions.StackException(send_result)
+
+    def join_group(self, group_address, interface_address=None):
+        """
+        Join the multicast group.
+
+        The membership belongs to the interface (as in lwip), the
+        datagrams sent to the group are received by all sockets bound
+        to the destination port.
+
+        Parameters
+        ----------
+        group_address : IpV4Addr
+            multicast group address
+        interface_address : IpV4Addr, optional
+            address of the interface to join the group on, by default
+            None (all interfaces)
+
+        Raises
+        ------
+        StackException
+            if the library is built without IGMP (see the multicast
+            build profile) or the low-level stack error occures
+        """
+        self._change_membership(
+            self._igmp_joingroup, group_address, interface_address,
+        )
+
+    def leave_group(self, group_address, interface_address=None):
+        """
+        Leave the multicast group.
+
+        Parameters
+        ----------
+        group_address : IpV4Addr
+            multicast group address
+        interface_address : IpV4Addr, optional
+            address of the interface to leave the group on, by default
+            None (all interfaces)
+
+        Raises
+        ------
+        StackException
+            if the library is built without IGMP or the low-level stack
+            error occures
+        """
+        self._change_membership(
+            self._igmp_leavegroup, group_address, interface_address,
+        )
+
+    def close(self):
+        """
+        Release the low-level socket.
+
+        The socket can not be used after the call.
+        """
+        if self._pcb is not None:
+            self._udp_remove(self._pcb)
+            self._pcb = None
+            self._pcb_pointer = None
+
+    def get_local_address(self):
+        """
+        Return the address the socket is bound to.
+
+        Returns
+        -------
+        string
+            local ip address ('0.0.0.0' if bound to any address)
+        """
+        return address_helpers.int_ip_to_string(self._pcb.local_ip.addr)
+
+    def get_local_port(self):
+        """
+        Return the port the socket is bound to.
+
+        Returns
+        -------
+        int
+            local port (assigned by the stack if bound to port 0)
+        """
+        return self._pcb.local_port
+
     def send_to(self, data_to_send, ip_address, port):
         """
         Send data to remote host.
@@ -162,14 +407,57 @@ class UdpSocket(object):
             data_to_send,
         )
 
-        if pbuf_to_send:
+        if not pbuf_to_send:
+            raise exceptions.AllocationError()
+
+        try:
             send_result = self._udp_send_to(
                 self._pcb, pbuf_to_send, ip_address, port,
             )
-            if send_result:
-                raise exceptions.StackException(send_result)
-        else:
-            raise exceptions.AllocationError()
+        finally:
+            self._allocator.free_pbuf(pbuf_to_send)
+
+        if send_result:
+            raise exceptions.StackException(send_result)
+
+    def send_many(self, datagrams):
+        """
+        Send batch of datagrams.
+
+        The batch is sent in one call into the library (if the library
+        provides lwip_py_udp_send_many), the failure of one datagram
+        does not stop the batch.
+
+        Parameters
+        ----------
+        datagrams : iterable[tuple(bytes_like, IpV4Addr, int)]
+            data, remote address and remote port per datagram
+
+        Returns
+        -------
+        list[int]
+            lwip error code per datagram (0 if the datagram was sent)
+        """
+        datagrams = list(datagrams)
+        if self._udp_send_many is None:
+            return [
+                self._send_with_status(*datagram) for datagram in datagrams
+            ]
+
+        count = len(datagrams)
+        batch = (_Datagram * count)()
+        results = (err_t * count)()
+        buffers = []
+        for entry, (data, ip_address, port) in zip(batch, datagrams):
+            # the length in bytes, len() counts the items of e.g. array
+            size = memoryview(data).nbytes
+            entry.data = _get_buffer_address(data, size, buffers)
+            entry.len = size
+            entry.port = port
+            entry.addr = ip_address
+
+        self._udp_send_many(self._pcb, batch, count, results)
+        return list(results)
 
     def set_recv_callback(self, callback):
         """
@@ -186,18 +474,164 @@ class UdpSocket(object):
         """
         self._rx_callback = callback
 
+    def enable_recv_queue(self, max_datagrams=64, readable_callback=None):
+        """
+        Store received datagrams in the bounded queue.
+
+        When the queue is enabled the receive callback is not invoked,
+        the datagrams are pulled via recv_from, recv_into or recv_many.
+        Datagrams received while the queue is full are dropped.
+
+        Parameters
+        ----------
+        max_datagrams : int, optional
+            queue capacity, by default 64
+        readable_callback : callable, optional
+            callable invoked with the socket from the stack context when
+            the queue becomes non-empty, by default None
+        """
+        self._recv_queue = collections.deque()
+        self._max_queued_datagrams = max_datagrams
+        self._readable_callback = readable_callback
+
+    def recv_from(self):
+        """
+        Pull the oldest received datagram.
+
+        Returns
+        -------
+        tuple(bytearray, IpV4Addr, int)
+            data, source address and source port, None if the queue is
+            empty
+        """
+        try:
+            payload, address, port = self._get_recv_queue().popleft()
+        except IndexError:
+            return None
+        return (payload, self._make_address(address), port)
+
+    def recv_into(self, buffer):
+        """
+        Pull the oldest received datagram into the buffer.
+
+        The datagram is truncated if the buffer is too small.
+
+        Parameters
+        ----------
+        buffer : writable bytes_like
+            target buffer
+
+        Returns
+        -------
+        tuple(int, IpV4Addr, int)
+            number of bytes written, source address and source port,
+            None if the queue is empty
+        """
+        try:
+            payload, address, port = self._get_recv_queue().popleft()
+        except IndexError:
+            return None
+
+        size = min(len(payload), len(buffer))
+        memoryview(buffer)[:size] = memoryview(payload)[:size]
+        return (size, self._make_address(address), port)
+
+    def recv_many(self, max_datagrams):
+        """
+        Pull up to max_datagrams received datagrams.
+
+        Parameters
+        ----------
+        max_datagrams : int
+            maximum number of datagrams to return
+
+        Returns
+        -------
+        list[tuple(bytearray, IpV4Addr, int)]
+            data, source address and source port per datagram, oldest
+            first
+        """
+        datagrams = []
+        pop = self._get_recv_queue().popleft
+        try:
+            for _ in range(max_datagrams):
+                payload, address, port = pop()
+                datagrams.append((payload, self._make_address(address), port))
+        except IndexError:
+            pass
+        return datagrams
+
+    def get_queued_datagrams(self):
+        """
+        Return number of datagrams waiting in the receive queue.
+
+        Returns
+        -------
+        int
+            number of queued datagrams
+        """
+        return len(self._recv_queue) if self._recv_queue is not None else 0
+
+    def get_dropped_datagrams(self):
+        """
+        Return number of datagrams dropped due to full receive queue.
+
+        Returns
+        -------
+        int
+            number of dropped datagrams
+        """
+        return self._dropped_datagrams
+
+    def _send_with_status(self, data_to_send, ip_address, port):
+        try:
+            self.send_to(data_to_send, ip_address, port)
+        except exceptions.AllocationError:
+            return _ERR_MEM
+        except exceptions.StackException as send_error:
+            return send_error.args[0]
+        return 0
+
+    def _get_recv_queue(self):
+        if self._recv_queue is None:
+            raise ValueError('Receive queue is not enabled')
+        return self._recv_queue
+
+    def _make_address(self, address):
+        ip_address = IpV4Addr()
+        ip_address.addr = address
+        return ip_address
+
     def _recv_callback(self, arg, pcb, pbuf, addr, port):
-        payload = ctypes.cast(
-            pbuf.contents.payload, ctypes.POINTER(
-                ctypes.c_uint8 * pbuf.contents.len,
-            ),
-        )
+        self._allocator.take_over(pbuf)
+        try:
+            payload = self._allocator.copy_payload(pbuf)
+        finally:
+            self._allocator.free_pbuf(pbuf)
+
+        if self._recv_queue is not None:
+            self._enqueue(payload, addr.contents.addr, port)
+        elif self._rx_callback:
+            self._rx_callback(
+                self, payload, self._make_address(addr.contents.addr), port,
+            )
 
-        addr_copy = IpV4Addr()
-        addr_copy.addr = addr.contents.addr
-        new_chunk = (bytearray(payload.contents), addr_copy, port)
+    def _enqueue(self, payload, address, port):
+        if len(self._recv_queue) >= self._max_queued_datagrams:
+            self._dropped_datagrams += 1
+            return
 
-        self._allocator.free_pbuf(pbuf)
+        self._recv_queue.append((payload, address, port))
+        if self._readable_callback and len(self._recv_queue) == 1:
+            self._readable_callback(self)
 
-        if self._rx_callback:
-            self._rx_callback(self, *new_chunk)
+    def _change_membership(self, igmp_function, group, interface_address):
+        if igmp_function is None:
+            raise exceptions.StackException(
+                'lwip library is built without IGMP',
+            )
+        membership_result = igmp_function(
+            interface_address or IpV4Addr(), group,
+        )
+        if membership_result:
+            raise exceptions.StackException(membership_result)
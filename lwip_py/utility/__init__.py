@@ -1,9 +1,11 @@
 from lwip_py.utility.ctypes_helper import wrap_function
 from lwip_py.utility.ctypes_lib_loader import MultiInstanceLibraryLoader
+from lwip_py.utility.lib_profiles import get_profile_library_path
 from lwip_py.utility.scheduler import SingleThreadExecutor
 
 __all__ = [
     'MultiInstanceLibraryLoader',
     'wrap_function',
     'SingleThreadExecutor',
+    'get_profile_library_path',
 ]
@@ -39,3 +39,72 @@ def int_ip_to_string(ip_int):
     return '.'.join(
         [str((ip_int >> shift) & byte_mask) for shift in (0, 8, 16, 24)],
     )
+
+
+def hwaddr_from_ip_string(ip_string):
+    """
+    Make locally administered MAC address from ip4 address.
+
+    The address 02:00:a:b:c:d is derived from the ip4 address a.b.c.d,
+    so it is unique on the bus and known before the interface exists.
+
+    Parameters
+    ----------
+    ip_string : string
+        ip4 address as string (dot-separated)
+
+    Returns
+    -------
+    tuple
+        6-byte hardware address
+    """
+    return (0x02, 0x00, *(int(segment) for segment in ip_string.split('.')))
+
+
+def hwaddr_from_index(index):
+    """
+    Make locally administered MAC address from the interface index.
+
+    The address 02:01:a:b:c:d is built from the 4-byte index, it is used
+    for the interfaces without ip4 address (e.g. DHCP clients) and does
+    not collide with the addresses derived from the ip4 addresses.
+
+    Parameters
+    ----------
+    index : int
+        4-byte index of the interface, unique in the process
+
+    Returns
+    -------
+    tuple
+        6-byte hardware address
+    """
+    return (0x02, 0x01, *index.to_bytes(4, 'big'))
+
+
+def multicast_hwaddr_from_int_ip(ip_int):
+    """
+    Map ip4 multicast group onto the ethernet multicast address.
+
+    The low 23 bits of the group are placed after the 01:00:5e prefix
+    (RFC 1112).
+
+    Parameters
+    ----------
+    ip_int : int
+        4-byte ip4 integer representation of the group
+
+    Returns
+    -------
+    bytes
+        6-byte hardware address
+    """
+    byte_mask = 0xFF
+    return bytes((
+        0x01,
+        0x00,
+        0x5E,
+        (ip_int >> 8) & 0x7F,
+        (ip_int >> 16) & byte_mask,
+        (ip_int >> 24) & byte_mask,
+    ))
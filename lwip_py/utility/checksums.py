@@ -0,0 +1,124 @@
+"""
+Internet checksums of the frames sent with the checksum offload.
+
+The interfaces with the checksum offload enabled (NetIf) send frames
+with zero IPv4/ICMP/UDP/TCP checksums. The frames are completed here
+when they leave the trusted emulated link (a recorder or an interface
+that checks the checksums). Only zero checksums are computed: a zero
+field is replaced by the value computed over the data with the zero
+field, which is the same value if the checksum was already valid.
+"""
+import struct
+
+_ETHERTYPE_IPV4 = 0x0800
+_IP_PROTO_ICMP = 1
+_IP_PROTO_TCP = 6
+_IP_PROTO_UDP = 17
+
+_ETHERNET_HEADER_SIZE = 14
+_IP_CHECKSUM_OFFSET = 10
+_IP_FRAGMENT_MASK = 0x3FFF
+_MIN_IP_HEADER_SIZE = 20
+
+_TRANSPORT_CHECKSUM_OFFSETS = {
+    _IP_PROTO_ICMP: 2,
+    _IP_PROTO_TCP: 16,
+    _IP_PROTO_UDP: 6,
+}
+
+_ethertype = struct.Struct('!H')
+_ipv4 = struct.Struct('!BBHHHBBH4s4s')
+_checksum = struct.Struct('!H')
+_pseudo_header = struct.Struct('!4s4sBBH')
+
+_ONES_COMPLEMENT_MODULUS = 0xFFFF
+
+
+def internet_checksum(*parts):
+    """
+    Compute the internet checksum (RFC 1071) of the data.
+
+    The ones' complement sum of the 16-bit words equals the value of
+    the data taken as a big number modulo 0xFFFF (2**16 == 1), so the
+    sum is computed by a single big integer operation.
+
+    Parameters
+    ----------
+    parts : bytes_like
+        data parts, every part except the last one should have even size
+
+    Returns
+    -------
+    int
+        16-bit checksum
+    """
+    data = b''.join(parts)
+    if len(data) % 2:
+        data += b'\x00'
+    number = int.from_bytes(data, 'big')
+    words_sum = number % _ONES_COMPLEMENT_MODULUS
+    if not words_sum and number:
+        words_sum = _ONES_COMPLEMENT_MODULUS
+    return ~words_sum & 0xFFFF
+
+
+def fill_checksums(frame):
+    """
+    Return the frame with the zero checksums computed.
+
+    Parameters
+    ----------
+    frame : bytes_like
+        ethernet frame
+
+    Returns
+    -------
+    bytearray
+        copy of the frame with IPv4 header and ICMP/UDP/TCP checksums
+    """
+    filled_frame = bytearray(frame)
+    if len(filled_frame) < _ETHERNET_HEADER_SIZE + _MIN_IP_HEADER_SIZE:
+        return filled_frame
+    if _ethertype.unpack_from(filled_frame, 12)[0] != _ETHERTYPE_IPV4:
+        return filled_frame
+
+    (
+        version_ihl, _, total_length, _, fragment, _, protocol,
+        header_checksum, src_ip, dst_ip,
+    ) = _ipv4.unpack_from(filled_frame, _ETHERNET_HEADER_SIZE)
+    header_size = (version_ihl & 0x0F) * 4
+    packet_end = _ETHERNET_HEADER_SIZE + total_length
+    if header_size < _MIN_IP_HEADER_SIZE or packet_end > len(filled_frame):
+        return filled_frame
+
+    payload_start = _ETHERNET_HEADER_SIZE + header_size
+    if not header_checksum:
+        _checksum.pack_into(
+            filled_frame,
+            _ETHERNET_HEADER_SIZE + _IP_CHECKSUM_OFFSET,
+            internet_checksum(
+                filled_frame[_ETHERNET_HEADER_SIZE:payload_start],
+            ),
+        )
+
+    checksum_offset = _TRANSPORT_CHECKSUM_OFFSETS.get(protocol)
+    if checksum_offset is None or fragment & _IP_FRAGMENT_MASK:
+        return filled_frame
+    checksum_position = payload_start + checksum_offset
+    if checksum_position + 2 > packet_end:
+        return filled_frame
+    if _checksum.unpack_from(filled_frame, checksum_position)[0]:
+        return filled_frame
+
+    segment = filled_frame[payload_start:packet_end]
+    if protocol == _IP_PROTO_ICMP:
+        transport_checksum = internet_checksum(segment)
+    else:
+        transport_checksum = internet_checksum(
+            _pseudo_header.pack(src_ip, dst_ip, 0, protocol, len(segment)),
+            segment,
+        )
+        if protocol == _IP_PROTO_UDP and not transport_checksum:
+            transport_checksum = 0xFFFF
+    _checksum.pack_into(filled_frame, checksum_position, transport_checksum)
+    return filled_frame
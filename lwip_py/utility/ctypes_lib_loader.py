@@ -1,6 +1,52 @@
+"""
+Loading of multiple instances of the same shared library.
+
+The dynamic loader shares the library between all dlopen calls made for
+the same file name (or inode), so every instance has to be loaded from
+a distinct file. The image of the library is read once and written into
+a uniquely named file in memory backed file system (/dev/shm) which is
+unlinked right after loading: the mapping keeps the instance alive and
+no files or handles are left behind. If /dev/shm is not available or
+mounted without exec permission the temp directory is used.
+"""
 import ctypes
-import shutil
+import itertools
+import os
 import tempfile
+import threading
+
+_SHARED_MEMORY_DIR = '/dev/shm'
+
+_images = {}
+_images_lock = threading.Lock()
+_shared_memory_usable = None
+_instance_counter = itertools.count()
+
+
+def _get_image(path_to_lib):
+    stat = os.stat(path_to_lib)
+    key = (os.path.realpath(path_to_lib), stat.st_mtime_ns, stat.st_size)
+    with _images_lock:
+        image = _images.get(key)
+        if image is None:
+            with open(path_to_lib, 'rb') as lib_file:
+                image = lib_file.read()
+            _images[key] = image
+    return image
+
+
+def _is_shared_memory_usable():
+    global _shared_memory_usable
+    if _shared_memory_usable is None:
+        _shared_memory_usable = os.path.isdir(_SHARED_MEMORY_DIR) and (
+            os.access(_SHARED_MEMORY_DIR, os.W_OK)
+        )
+    return _shared_memory_usable
+
+
+def _mark_shared_memory_unusable():
+    global _shared_memory_usable
+    _shared_memory_usable = False
 
 
 class MultiInstanceLibraryLoader(object):
@@ -11,14 +57,50 @@ class MultiInstanceLibraryLoader(object):
     library only if the file will have a different name
     """
 
-    def __init__(self, path_to_lib):
+    def __init__(self, path_to_lib, directory=None):
+        """
+        Initialize new loader.
+
+        Parameters
+        ----------
+        path_to_lib : string
+            path to the shared library
+        directory : string, optional
+            directory for the short-living copies of the library,
+            by default None (/dev/shm if available, temp directory
+            otherwise)
+        """
         self._path_to_lib = path_to_lib
+        self._directory = directory
 
     def __call__(self):
-        self._tmp_lib_copy = self._make_tmp_lib_copy()
-        return ctypes.CDLL(self._tmp_lib_copy.name)
+        """
+        Load new instance of the library.
+
+        Returns
+        -------
+        ctypes.CDLL
+            loaded library instance
+        """
+        image = _get_image(self._path_to_lib)
+        if self._directory is not None:
+            return self._load_copy(image, self._directory)
+
+        if _is_shared_memory_usable():
+            try:
+                return self._load_copy(image, _SHARED_MEMORY_DIR)
+            except OSError:
+                _mark_shared_memory_unusable()
+        return self._load_copy(image, tempfile.gettempdir())
 
-    def _make_tmp_lib_copy(self):
-        tmp_file = tempfile.NamedTemporaryFile(delete=True)
-        shutil.copy2(self._path_to_lib, tmp_file.name)
-        return tmp_file
+    def _load_copy(self, image, directory):
+        copy_path = os.path.join(
+            directory,
+            'lwip-{0}-{1}.so'.format(os.getpid(), next(_instance_counter)),
+        )
+        try:
+            with open(copy_path, 'xb') as lib_copy:
+                lib_copy.write(image)
+            return ctypes.CDLL(copy_path)
+        finally:
+            os.unlink(copy_path)
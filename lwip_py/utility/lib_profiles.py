@@ -0,0 +1,55 @@
+"""
+Build profiles of the lwip library.
+
+Every profile is built from lwip_lib/profiles/<profile> into its own
+library located next to the default one (liblwip.so):
+    debug       liblwip.so, embedded-size pools, debug output
+    release     liblwip_release.so, optimized, large pools and TCP windows
+    stats       liblwip_stats.so, statistics collection enabled
+    forwarding  liblwip_forwarding.so, IP forwarding between interfaces
+    multicast   liblwip_multicast.so, IGMP (multicast groups)
+    server      liblwip_server.so, optimized, thousands of TCP connections
+    dhcp        liblwip_dhcp.so, optimized, DHCP client enabled
+"""
+import os
+
+DEFAULT_PROFILE = 'debug'
+
+PROFILES = (
+    'debug', 'release', 'stats', 'forwarding', 'multicast', 'server', 'dhcp',
+)
+
+
+def get_profile_library_path(path_to_lwip_lib, profile=None):
+    """
+    Return path to the library built for the profile.
+
+    Parameters
+    ----------
+    path_to_lwip_lib : string
+        path to the default library (liblwip.so)
+    profile : string, optional
+        name of the profile, by default None (default profile)
+
+    Returns
+    -------
+    string
+        path to the profile library
+
+    Raises
+    ------
+    ValueError
+        if the profile is unknown
+    """
+    profile = profile or DEFAULT_PROFILE
+    if profile not in PROFILES:
+        raise ValueError('Unknown lwip build profile: {0}'.format(profile))
+
+    if profile == DEFAULT_PROFILE:
+        return path_to_lwip_lib
+
+    library_dir, library_name = os.path.split(path_to_lwip_lib)
+    base_name, extension = os.path.splitext(library_name)
+    return os.path.join(
+        library_dir, '{0}_{1}{2}'.format(base_name, profile, extension),
+    )
@@ -6,6 +6,7 @@ scheduled tasks
 
 """
 import heapq
+import itertools
 import threading
 import time
 from collections import namedtuple
@@ -30,6 +31,7 @@ class TaskQueue(object):
     def __init__(self):
         """Initialize a queue without parameters."""
         self._queue = []
+        self._sequence = itertools.count()
 
     def schedule_task(self, task):
         """
@@ -40,7 +42,10 @@ class TaskQueue(object):
         task : Task
             task to schedule
         """
-        heapq.heappush(self._queue, (task.abs_time, task.priority, task))
+        heapq.heappush(
+            self._queue,
+            (task.abs_time, task.priority, next(self._sequence), task),
+        )
 
     def empty(self):
         """
@@ -70,7 +75,7 @@ class TaskQueue(object):
         tasks = []
         next_task = next(iter(self._queue), None)
         while next_task:
-            task_time, _, task = next_task
+            task_time, _, _, task = next_task
             if task_time <= timestamp:
                 tasks.append(task)
                 heapq.heappop(self._queue)
@@ -108,7 +113,7 @@ class TaskQueue(object):
         array_like[(int, Task)]
             list of tuples (Task-id, Task) representing scheduled tasks
         """
-        return [task[2] for task in self._queue]
+        return [task[-1] for task in self._queue]
 
 
 class Stopped(Exception):
@@ -183,7 +188,9 @@ class SingleThreadExecutor(object):
     concurent.futures.Future
     """
 
-    _statuses = Enum('statuses', ['Running', 'Stopped', 'StoppedSync'])
+    _statuses = Enum(
+        'statuses', ['Idle', 'Running', 'Stopped', 'StoppedSync'],
+    )
 
     def __init__(self):
         """Initialize the class."""
@@ -191,7 +198,7 @@ class SingleThreadExecutor(object):
         self._condition = threading.Condition(self._mutex)
         self._tasks = TaskQueue()
         self._time = time.monotonic
-        self._status = self._statuses.Stopped
+        self._status = self._statuses.Idle
         self._tasks_to_finish = 0
 
     def run(self):
@@ -238,6 +245,9 @@ class SingleThreadExecutor(object):
         """
         Schedules task to be executed with delay (current time + delay).
 
+        Tasks scheduled before the processing loop is entered are kept
+        till the run is called.
+
         Parameters
         ----------
         delay : float
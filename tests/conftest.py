@@ -0,0 +1,48 @@
+"""Fixtures shared by the tests."""
+
+import asyncio
+from concurrent import futures
+from unittest.mock import Mock
+
+import pytest
+
+
+class FakeHost(object):
+    """
+    Host running the actions at once in the calling thread.
+
+    The stack makes the socket set in the socket attribute (Mock by
+    default). The delayed actions are not run, they are recorded in the
+    delayed list to be run by the test.
+    """
+
+    def __init__(self):
+        self.socket = Mock()
+        self.delayed = []
+        self._stack = Mock()
+        self._stack.make_socket.side_effect = lambda *args: self.socket
+
+    def get_stack(self):
+        return self._stack
+
+    def execute(self, action, delay=0):
+        future = futures.Future()
+        if delay:
+            self.delayed.append(action)
+        else:
+            future.set_result(action(self))
+        return future
+
+
+@pytest.fixture
+def fake_host():
+    """Return host running the actions in the test thread."""
+    return FakeHost()
+
+
+@pytest.fixture
+def run_coroutine():
+    """Return function running the coroutine in a new event loop."""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
@@ -0,0 +1,86 @@
+"""Tests of the asyncio datagram adapter."""
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from lwip_py.aio import create_datagram_endpoint
+from lwip_py.stack import exceptions
+from lwip_py.stack.udp_socket import UdpSocket
+
+
+def _make_socket():
+    udp_socket = UdpSocket(Mock(), Mock())
+    udp_socket.bind = Mock()
+    udp_socket.get_local_address = Mock(return_value='10.0.0.1')
+    udp_socket.get_local_port = Mock(return_value=5000)
+    udp_socket.connect = Mock()
+    udp_socket.send = Mock()
+    udp_socket.send_to = Mock()
+    udp_socket.close = Mock()
+    return udp_socket
+
+
+def test_datagrams_are_exchanged(fake_host, run_coroutine):
+    """Test sending, receiving and closing via the transport."""
+    udp_socket = _make_socket()
+    fake_host.socket = udp_socket
+    protocol = Mock(spec=asyncio.DatagramProtocol)
+
+    async def scenario():
+        transport, _ = await create_datagram_endpoint(
+            fake_host, lambda: protocol, remote_addr=('10.0.0.2', 6000),
+        )
+        await asyncio.sleep(0)
+        protocol.connection_made.assert_called_once_with(transport)
+        assert transport.get_extra_info('sockname') == ('10.0.0.1', 5000)
+
+        assert udp_socket.connect.call_args[0][1] == 6000
+
+        transport.sendto(b'ping')
+        transport.sendto(b'pong', ('10.0.0.2', 6000))
+        with pytest.raises(ValueError):
+            transport.sendto(b'pong', ('10.0.0.3', 6001))
+        assert udp_socket.send.call_count == 2
+        assert transport.get_write_buffer_size() == 0
+
+        udp_socket._enqueue(bytearray(b'reply'), 0x0200000A, 6000)
+        await asyncio.sleep(0)
+        protocol.datagram_received.assert_called_once_with(
+            b'reply', ('10.0.0.2', 6000),
+        )
+
+        transport.close()
+        await asyncio.sleep(0)
+        udp_socket.close.assert_called_once()
+        protocol.connection_lost.assert_called_once_with(None)
+
+    run_coroutine(scenario())
+
+
+def test_writing_is_paused_while_out_of_pbufs(fake_host, run_coroutine):
+    """Test that the datagrams are kept and retried on ERR_MEM."""
+    udp_socket = _make_socket()
+    fake_host.socket = udp_socket
+    protocol = Mock(spec=asyncio.DatagramProtocol)
+
+    async def scenario():
+        transport, _ = await create_datagram_endpoint(
+            fake_host, lambda: protocol,
+        )
+        transport.set_write_buffer_limits(high=10, low=0)
+
+        udp_socket.send_to.side_effect = exceptions.AllocationError()
+        transport.sendto(bytes(8), ('10.0.0.2', 6000))
+        transport.sendto(bytes(8), ('10.0.0.2', 6000))
+        protocol.pause_writing.assert_called_once()
+        assert transport.get_write_buffer_size() == 16
+
+        udp_socket.send_to.side_effect = None
+        fake_host.delayed.pop()(fake_host)
+        await asyncio.sleep(0)
+        protocol.resume_writing.assert_called_once()
+        assert udp_socket.send_to.call_count == 3
+
+    run_coroutine(scenario())
@@ -0,0 +1,161 @@
+"""Tests of the asyncio streams adapter."""
+
+import asyncio
+
+import pytest
+
+from lwip_py.aio import open_connection, start_server
+from lwip_py.stack import exceptions
+
+
+class _FakeTcpSocket(object):
+    def __init__(self):
+        self.received = []
+        self.sent = []
+        self.pending_bytes = 0
+        self.closed = False
+        self.aborted = False
+        self.send_error = None
+        self.callbacks = {}
+
+    def connect(self, ip_address, port, connected_callback):
+        connected_callback(self, 0)
+
+    def bind(self, end_point):
+        pass
+
+    def listen(self, accept_callback, backlog):
+        self.callbacks['accept'] = accept_callback
+
+    def set_recv_callback(self, callback):
+        self.callbacks['recv'] = callback
+
+    def set_sent_callback(self, callback):
+        self.callbacks['sent'] = callback
+
+    def set_error_callback(self, callback):
+        self.callbacks['error'] = callback
+
+    def recv(self, max_bytes):
+        if not self.received:
+            return None
+        return self.received.pop(0)
+
+    def send(self, data, copy=True):
+        if self.send_error is not None:
+            raise self.send_error
+        self.sent.append(data)
+
+    def get_pending_bytes(self):
+        return self.pending_bytes
+
+    def close(self):
+        self.closed = True
+
+    def abort(self):
+        self.aborted = True
+
+    def get_local_address(self):
+        return '10.0.0.1'
+
+    get_remote_address = get_local_address
+
+    def get_local_port(self):
+        return 5000
+
+    get_remote_port = get_local_port
+
+
+def test_streams_exchange_data(fake_host, run_coroutine):
+    """Test writing, draining, reading and closing via the streams."""
+    tcp_socket = _FakeTcpSocket()
+    tcp_socket.received = [b'hello ', b'world']
+    fake_host.socket = tcp_socket
+
+    async def scenario():
+        reader, writer = await open_connection(fake_host, ('10.0.0.2', 80))
+        assert await reader.readexactly(11) == b'hello world'
+
+        writer.write(b'request')
+        await writer.drain()
+        await asyncio.sleep(0)
+        assert tcp_socket.sent == [b'request']
+        assert writer.transport.get_write_buffer_size() == 0
+
+        tcp_socket.received = [b'']
+        tcp_socket.callbacks['recv'](tcp_socket)
+        await asyncio.sleep(0)
+        assert await reader.read() == b''
+
+        writer.close()
+        await asyncio.sleep(0)
+        assert tcp_socket.closed
+
+    run_coroutine(scenario())
+
+
+def test_drain_waits_for_send_buffer(fake_host, run_coroutine):
+    """Test that the writer is paused while data is kept in the socket."""
+    tcp_socket = _FakeTcpSocket()
+    fake_host.socket = tcp_socket
+
+    async def scenario():
+        _, writer = await open_connection(fake_host, ('10.0.0.2', 80))
+        writer.transport.set_write_buffer_limits(high=4, low=0)
+
+        tcp_socket.pending_bytes = 8
+        writer.write(bytes(8))
+        drain = asyncio.ensure_future(writer.drain())
+        await asyncio.sleep(0)
+        assert not drain.done()
+
+        tcp_socket.pending_bytes = 0
+        tcp_socket.callbacks['sent'](tcp_socket, 8)
+        await asyncio.wait_for(drain, 1)
+
+    run_coroutine(scenario())
+
+
+def test_failed_send_aborts_connection(fake_host, run_coroutine):
+    """Test that the socket is released when the data is refused."""
+    tcp_socket = _FakeTcpSocket()
+    tcp_socket.send_error = exceptions.StackException(-1)
+    fake_host.socket = tcp_socket
+
+    async def scenario():
+        reader, writer = await open_connection(fake_host, ('10.0.0.2', 80))
+        writer.write(b'request')
+        await asyncio.sleep(0)
+
+        assert tcp_socket.aborted
+        assert writer.transport.is_closing()
+        with pytest.raises(exceptions.StackException):
+            await reader.read()
+
+    run_coroutine(scenario())
+
+
+def test_server_accepts_connections(fake_host, run_coroutine):
+    """Test that the client callback receives the accepted streams."""
+    listening_socket = _FakeTcpSocket()
+    fake_host.socket = listening_socket
+
+    async def scenario():
+        accepted = asyncio.get_event_loop().create_future()
+        server = await start_server(
+            lambda reader, writer: accepted.set_result(reader),
+            fake_host,
+            ('', 80),
+        )
+        client_socket = _FakeTcpSocket()
+        client_socket.received = [b'ping']
+        listening_socket.callbacks['accept'](client_socket)
+
+        reader = await asyncio.wait_for(accepted, 1)
+        assert await reader.readexactly(4) == b'ping'
+
+        server.close()
+        await server.wait_closed()
+        assert listening_socket.closed
+
+    run_coroutine(scenario())
@@ -0,0 +1,92 @@
+"""Tests of the memory-mapped capture ring."""
+
+from unittest.mock import Mock
+
+import pytest
+
+from lwip_py.output.capture_ring import CaptureRingReader, CaptureRingRecorder
+
+
+def _make_netif(name):
+    netif = Mock()
+    netif.get_name.return_value = name
+    return netif
+
+
+def test_reader_follows_recorder(tmp_path):
+    """Test that the frames are read in order with interface names."""
+    ring_path = str(tmp_path / 'capture.ring')
+    recorder = CaptureRingRecorder(ring_path, data_size=4096, snaplen=256)
+    reader = CaptureRingReader(ring_path)
+
+    first, second = _make_netif('p1.eth1'), _make_netif('p2.eth1')
+    recorder(first, bytearray(b'\x01' * 60), True)
+    recorder(second, bytearray(b'\x02' * 61), False)
+
+    frames = reader.read()
+    assert [frame.sequence for frame in frames] == [0, 1]
+    assert [frame.interface for frame in frames] == [0, 1]
+    assert frames[1].frame == b'\x02' * 61
+    assert reader.get_interface_names() == ['p1.eth1', 'p2.eth1']
+
+    for index in range(100):
+        recorder(first, bytearray([index]) * 100, True)
+        assert reader.read()[0].frame == bytes([index]) * 100
+
+    assert reader.get_lost_frames() == 0
+
+    recorder.close()
+    reader.close()
+
+
+def test_slow_reader_reports_lost_frames(tmp_path):
+    """Test that overwritten frames are reported as lost."""
+    ring_path = str(tmp_path / 'capture.ring')
+    recorder = CaptureRingRecorder(ring_path, data_size=4096, snaplen=256)
+    reader = CaptureRingReader(ring_path)
+
+    netif = _make_netif('p1.eth1')
+    for index in range(200):
+        recorder(netif, bytearray([index % 256]) * 100, True)
+
+    assert reader.read() == []
+    assert reader.get_lost_frames() == 200
+
+    recorder(netif, bytearray(100), True)
+    assert [frame.sequence for frame in reader.read()] == [200]
+
+    recorder.close()
+    reader.close()
+
+
+def test_interfaces_are_described_once(tmp_path):
+    """Test that the frames written one by one share the interfaces."""
+    ring_path = str(tmp_path / 'capture.ring')
+    recorder = CaptureRingRecorder(ring_path, data_size=4096, snaplen=256)
+    reader = CaptureRingReader(ring_path)
+    writer = Mock()
+    writer.add_interface.side_effect = [0, 1]
+
+    first, second = _make_netif('p1.eth1'), _make_netif('p2.eth1')
+    for netif in (first, second, first, second):
+        recorder(netif, bytearray(60), True)
+    for frame in reader.read():
+        reader.write_pcapng(writer, (frame,))
+
+    assert [
+        call[0][0] for call in writer.add_interface.call_args_list
+    ] == ['p1.eth1', 'p2.eth1']
+    assert [
+        call[0][0] for call in writer.write_frame.call_args_list
+    ] == [0, 1, 0, 1]
+
+    recorder.close()
+    reader.close()
+
+
+def test_ring_must_hold_four_records(tmp_path):
+    """Test that the ring smaller than the overwrite margin is refused."""
+    with pytest.raises(ValueError):
+        CaptureRingRecorder(
+            str(tmp_path / 'capture.ring'), data_size=1024, snaplen=256,
+        )
@@ -0,0 +1,48 @@
+"""Tests of the columnar capture store."""
+
+import struct
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from lwip_py.output.capture_store import CaptureStore  # noqa: E402
+
+
+def _udp_frame(src_ip, dst_ip, src_port, dst_port, payload_size):
+    ip_header = struct.pack(
+        '!BBHHHBBH4s4s',
+        0x45, 0, 28 + payload_size, 0, 0, 255, 17, 0,
+        bytes(src_ip), bytes(dst_ip),
+    )
+    udp_header = struct.pack('!HHHH', src_port, dst_port, 8 + payload_size, 0)
+    return (
+        bytes((2, 0, 0, 0, 0, 1)) + bytes((2, 0, 0, 0, 0, 2)) + b'\x08\x00' +
+        ip_header + udp_header + bytes(payload_size)
+    )
+
+
+def test_queries_and_flow_index():
+    """Test vectorized selection and flow aggregation."""
+    peer_one, peer_two = (127, 3, 2, 1), (127, 3, 2, 2)
+    frames = []
+    for _ in range(10):
+        frames.append(_udp_frame(peer_two, peer_one, 2000, 1000, 4))
+        frames.append(_udp_frame(peer_one, peer_two, 1000, 2000, 8))
+    frames.append(b'\x00' * 6)
+
+    store = CaptureStore.from_frames(frames, timestamps=range(len(frames)))
+
+    assert len(store) == 21
+    assert store.count(src_ip='127.3.2.2', protocol='udp', dst_port=1000) == 10
+    assert store.total_bytes(src_port=1000) == 10 * (42 + 8)
+    assert store.count(start_time=4, end_time=8) == 4
+    assert store.get_frame(20) == b'\x00' * 6
+    assert store.column('dst_mac')[0] == 0x020000000001
+
+    flows = store.get_flow_index()
+    assert len(flows) == 2
+    flow_id = flows.find(src_ip='127.3.2.2', dst_port=1000)[0]
+    assert flows.frame_counts[flow_id] == 10
+    assert flows.last_timestamps[flow_id] == 18
+    assert list(flows.get_frames(flow_id)) == list(range(0, 20, 2))
@@ -0,0 +1,60 @@
+"""Tests of the checksum completion of the offloaded frames."""
+
+import struct
+from unittest.mock import Mock
+
+from lwip_py.emulation import EthernetBus
+from lwip_py.utility.checksums import fill_checksums, internet_checksum
+
+_ETHERNET_HEADER = bytes(12) + b'\x08\x00'
+
+
+def _make_udp_frame(payload):
+    udp_header = struct.pack('!HHHH', 5000, 6000, 8 + len(payload), 0)
+    ip_header = struct.pack(
+        '!BBHHHBBH4s4s',
+        0x45, 0, 20 + len(udp_header) + len(payload), 1, 0, 255, 17, 0,
+        bytes((10, 0, 0, 1)), bytes((10, 0, 0, 2)),
+    )
+    return bytearray(_ETHERNET_HEADER + ip_header + udp_header + payload)
+
+
+def test_internet_checksum():
+    """Test the checksum against the RFC 1071 example."""
+    data = bytes((0x00, 0x01, 0xF2, 0x03, 0xF4, 0xF5, 0xF6, 0xF7))
+    assert internet_checksum(data) == 0x220D
+    assert internet_checksum(bytes(4)) == 0xFFFF
+
+
+def test_fill_checksums():
+    """Test that the filled checksums verify and are kept on refill."""
+    frame = _make_udp_frame(b'hello')
+    filled_frame = fill_checksums(frame)
+
+    assert frame[24:26] == bytes(2)
+    assert internet_checksum(filled_frame[14:34]) == 0
+    pseudo_header = filled_frame[26:34] + struct.pack('!BBH', 0, 17, 13)
+    assert internet_checksum(pseudo_header, filled_frame[34:]) == 0
+    assert fill_checksums(filled_frame) == filled_frame
+
+
+def test_bus_fills_checksums_on_demand():
+    """Test that only the interfaces without offload get checksums."""
+    bus = EthernetBus()
+    sender, offloaded, checking = Mock(), Mock(), Mock()
+    sender.is_checksum_offloaded.return_value = True
+    offloaded.is_checksum_offloaded.return_value = True
+    checking.is_checksum_offloaded.return_value = False
+    on_offloaded_data, on_checking_data = Mock(), Mock()
+    bus.add_interface(offloaded, on_offloaded_data)
+    bus.add_interface(checking, on_checking_data)
+    observer = Mock()
+    bus.add_observer(observer, fill_checksums=True)
+
+    frame = _make_udp_frame(b'data')
+    bus._broadcast(sender, frame)
+
+    assert on_offloaded_data.call_args[0][1] is frame
+    filled_frame = on_checking_data.call_args[0][1]
+    assert filled_frame == fill_checksums(frame)
+    assert observer.call_args[0][1] is filled_frame
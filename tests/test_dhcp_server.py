@@ -0,0 +1,224 @@
+"""Tests of the DHCP server app."""
+
+import socket
+import struct
+import threading
+from unittest.mock import Mock
+
+from lwip_py.emulation import EthernetNetwork, Host
+from lwip_py.emulation.dhcp_server import DhcpServer
+from lwip_py.stack import IpV4Addr
+from lwip_py.stack.netif import NetIf
+
+_HEADER = struct.Struct('!BBBBIHH4s4s4s4s16s64s128s4s')
+_COOKIE = b'\x63\x82\x53\x63'
+
+
+def _make_request(message_type, hwaddr, xid=1, ciaddr=bytes(4), **options):
+    message = _HEADER.pack(
+        1, 1, 6, 0, xid, 0, 0, ciaddr, bytes(4), bytes(4), bytes(4),
+        hwaddr.ljust(16, b'\x00'), bytes(64), bytes(128), _COOKIE,
+    )
+    message += bytes((53, 1, message_type))
+    for code, value in options.items():
+        value = socket.inet_aton(value)
+        message += bytes((int(code[1:]), len(value))) + value
+    return bytearray(message + b'\xff')
+
+
+def _make_server(host, pool_size=2):
+    return DhcpServer(
+        host, '10.0.0.1', '255.255.255.0', '10.0.0.100', pool_size,
+        router='10.0.0.1',
+    )
+
+
+def _deliver(host, server, request):
+    host.socket.send_to.reset_mock()
+    server._on_datagram(host.socket, request, IpV4Addr(), 68)
+    if not host.socket.send_to.called:
+        return None
+    reply, destination, port = host.socket.send_to.call_args[0]
+    assert port == 68
+    fields = _HEADER.unpack_from(reply)
+    options = {}
+    index = _HEADER.size
+    while reply[index] != 255:
+        options[reply[index]] = reply[index + 2:index + 2 + reply[index + 1]]
+        index += 2 + reply[index + 1]
+    return fields, options, destination
+
+
+def test_lease_is_offered_and_acknowledged(fake_host):
+    """Test the discover - offer - request - ack exchange."""
+    server = _make_server(fake_host)
+    fake_host.socket.bind.assert_called_once_with(('', 67))
+
+    fields, options, destination = _deliver(
+        fake_host,
+        server,
+        _make_request(1, b'\x02\x00\x00\x00\x00\x01', xid=7),
+    )
+    assert fields[0] == 2
+    assert fields[4] == 7
+    assert socket.inet_ntoa(fields[8]) == '10.0.0.100'
+    assert options[53] == b'\x02'
+    assert options[54] == socket.inet_aton('10.0.0.1')
+    assert options[1] == socket.inet_aton('255.255.255.0')
+    assert options[3] == socket.inet_aton('10.0.0.1')
+    assert struct.unpack('!I', options[51])[0] == 3600
+    assert destination.addr == IpV4Addr('10.0.0.255').addr
+
+    fields, options, _ = _deliver(
+        fake_host, server, _make_request(
+            3, b'\x02\x00\x00\x00\x00\x01', o50='10.0.0.100', o54='10.0.0.1',
+        ),
+    )
+    assert options[53] == b'\x05'
+    assert socket.inet_ntoa(fields[8]) == '10.0.0.100'
+
+    statistics = server.get_statistics()
+    assert (statistics.discovers, statistics.offers) == (1, 1)
+    assert (statistics.requests, statistics.acks) == (1, 1)
+    assert statistics.leases == 1
+    assert statistics.time_to_leases is not None
+    assert server.get_leases() == {b'\x02\x00\x00\x00\x00\x01': '10.0.0.100'}
+
+
+def test_renewal_is_unicast(fake_host):
+    """Test that the client with the address gets the unicast reply."""
+    server = _make_server(fake_host)
+    hwaddr = b'\x02\x00\x00\x00\x00\x01'
+    _deliver(fake_host, server, _make_request(1, hwaddr))
+    _deliver(fake_host, server, _make_request(3, hwaddr, o50='10.0.0.100'))
+
+    _, options, destination = _deliver(
+        fake_host, server, _make_request(
+            3, hwaddr, ciaddr=socket.inet_aton('10.0.0.100'),
+        ),
+    )
+    assert options[53] == b'\x05'
+    assert destination.addr == IpV4Addr('10.0.0.100').addr
+    assert server.get_statistics().leases == 1
+
+
+def test_wrong_address_is_refused(fake_host):
+    """Test that the request of the address not leased is refused."""
+    server = _make_server(fake_host)
+    _, options, _ = _deliver(
+        fake_host, server, _make_request(
+            3, b'\x02\x00\x00\x00\x00\x01', o50='10.0.0.150',
+        ),
+    )
+    assert options[53] == b'\x06'
+    assert server.get_statistics().naks == 1
+
+
+def test_pool_exhaustion_and_release(fake_host):
+    """Test that the released address is offered to the next client."""
+    server = _make_server(fake_host, pool_size=1)
+    first = b'\x02\x00\x00\x00\x00\x01'
+    second = b'\x02\x00\x00\x00\x00\x02'
+    _deliver(fake_host, server, _make_request(1, first))
+    _deliver(fake_host, server, _make_request(3, first, o50='10.0.0.100'))
+
+    assert _deliver(fake_host, server, _make_request(1, second)) is None
+
+    _deliver(fake_host, server, _make_request(7, first))
+    fields, _, _ = _deliver(fake_host, server, _make_request(1, second))
+    assert socket.inet_ntoa(fields[8]) == '10.0.0.100'
+    assert server.get_statistics().releases == 1
+
+
+def test_offer_of_other_server_releases_address(fake_host):
+    """Test that the address is freed when the client chose another."""
+    server = _make_server(fake_host, pool_size=1)
+    first = b'\x02\x00\x00\x00\x00\x01'
+    _deliver(fake_host, server, _make_request(1, first))
+
+    assert _deliver(
+        fake_host, server, _make_request(
+            3, first, o50='10.0.0.100', o54='10.0.0.2',
+        ),
+    ) is None
+    fields, _, _ = _deliver(
+        fake_host, server, _make_request(1, b'\x02\x00\x00\x00\x00\x02'),
+    )
+    assert socket.inet_ntoa(fields[8]) == '10.0.0.100'
+
+
+def test_clients_get_unique_hwaddr():
+    """Test that the interfaces without address get distinct MACs."""
+    network = EthernetNetwork('lwip_lib/build/liblwip.so', lazy_hosts=True)
+    network.add_host('c0', ('c0.eth1', '0.0.0.0', '', ''))
+    network.add_host('c1', ('c1.eth1', '0.0.0.0'))
+    network.add_host(
+        'c2', ('c2.eth1', '0.0.0.0', '', '', (2, 0, 0, 0, 0, 9)),
+    )
+
+    first, second, third = [
+        hwaddr for _, _, _, hwaddr in network._address_plan
+    ]
+    assert first[:2] == second[:2] == b'\x02\x01'
+    assert first != second
+    assert third == b'\x02\x00\x00\x00\x00\x09'
+
+
+def test_host_derives_hwaddr_without_address():
+    """Test that the host gives the client without hwaddr unique MAC."""
+    host = Host(Mock(), lazy=True)
+    first = host.add_network_interface('c.eth1', '0.0.0.0')
+    second = host.add_network_interface('c.eth2', '0.0.0.0')
+
+    assert first.get_hwaddr()[:2] == b'\x02\x01'
+    assert first.get_hwaddr() != second.get_hwaddr()
+
+
+def test_interface_accepts_dhcp():
+    """Test that the interface has the MTU and the broadcast flag."""
+    netif = NetIf('eth0', Mock(), Mock())
+    netif.add(IpV4Addr(), IpV4Addr(), IpV4Addr())
+
+    assert netif._settings.mtu >= 576
+    assert netif._settings.flags & NetIf.flag_broadcast
+    assert netif._settings.flags & NetIf.flag_etharp
+
+
+def test_client_is_bound_by_server():
+    """Test the lease exchange of the lwip DHCP client and the server."""
+    network = EthernetNetwork(
+        'lwip_lib/build/liblwip.so', default_profile='dhcp',
+    )
+    network.add_host('server', ('s.eth1', '10.0.0.1', '255.255.255.0', ''))
+    network.add_host('client', ('c.eth1', '0.0.0.0', '', ''))
+    bound = threading.Event()
+    network.set_status_callbacks(
+        lambda net_if: net_if.get_address() == '10.0.0.100' and bound.set(),
+        lambda net_if: None,
+    )
+    network.start()
+    network.set_up_interfaces()
+
+    try:
+        server = DhcpServer(
+            network.get_host('server'),
+            '10.0.0.1',
+            '255.255.255.0',
+            '10.0.0.100',
+            4,
+        )
+        client = network.get_host('client')
+        client.execute(
+            lambda host: host.get_interface('c.eth1').start_dhcp(),
+        ).result()
+
+        assert bound.wait(10)
+        assert client.execute(
+            lambda host: host.get_interface('c.eth1').is_dhcp_bound(),
+        ).result()
+        assert list(server.get_leases().values()) == ['10.0.0.100']
+        statistics = server.get_statistics()
+        assert statistics.discovers >= 1
+        assert statistics.acks >= 1
+    finally:
+        network.stop()
@@ -0,0 +1,59 @@
+"""Tests of the frame decoder used for the traffic tracing."""
+
+import struct
+
+from lwip_py.output import decode_frames, format_frames
+
+_SRC_MAC = bytes((0x02, 0, 0, 0, 0, 1))
+_DST_MAC = bytes((0x02, 0, 0, 0, 0, 2))
+_SRC_IP = bytes((127, 3, 2, 1))
+_DST_IP = bytes((127, 3, 2, 2))
+
+
+def _ip_frame(protocol, transport):
+    ip_header = struct.pack(
+        '!BBHHHBBH4s4s',
+        0x45, 0, 20 + len(transport), 0, 0, 255, protocol, 0,
+        _SRC_IP, _DST_IP,
+    )
+    return _DST_MAC + _SRC_MAC + b'\x08\x00' + ip_header + transport
+
+
+def test_decode_transport_headers():
+    """Test decoding of UDP, TCP and ICMP frames in one batch."""
+    udp = _ip_frame(17, struct.pack('!HHHH', 2000, 1000, 12, 0) + b'ping')
+    tcp = _ip_frame(
+        6, struct.pack('!HHIIBBHHH', 80, 5000, 7, 9, 0x50, 0x18, 0, 0, 0),
+    )
+    icmp = _ip_frame(1, struct.pack('!BBH', 8, 0, 0))
+
+    udp_summary, tcp_summary, icmp_summary = decode_frames([udp, tcp, icmp])
+
+    assert (udp_summary.src_port, udp_summary.dst_port) == (2000, 1000)
+    assert udp_summary.src_ip == _SRC_IP
+    assert tcp_summary.details == (0x18, 7, 9, 0)
+    assert icmp_summary.details == (8, 0)
+
+    assert format_frames([udp, tcp]) == [
+        '02:00:00:00:00:01 > 02:00:00:00:00:02 '
+        'IP 127.3.2.1 > 127.3.2.2 UDP 2000 > 1000 len 12',
+        '02:00:00:00:00:01 > 02:00:00:00:00:02 '
+        'IP 127.3.2.1 > 127.3.2.2 TCP 80 > 5000 [P.] seq 7 ack 9 len 0',
+    ]
+
+
+def test_decode_arp_and_truncated_frames():
+    """Test ARP decoding and handling of short frames."""
+    arp = (
+        b'\xff' * 6 + _SRC_MAC + b'\x08\x06' +
+        struct.pack(
+            '!HHBBH6s4s6s4s',
+            1, 0x0800, 6, 4, 1, _SRC_MAC, _SRC_IP, bytes(6), _DST_IP,
+        )
+    )
+
+    assert format_frames([arp, b'\x00' * 10]) == [
+        '02:00:00:00:00:01 > ff:ff:ff:ff:ff:ff '
+        'ARP who-has 127.3.2.2 tell 127.3.2.1',
+        'truncated frame',
+    ]
@@ -0,0 +1,49 @@
+"""Tests of the lazy host materialization."""
+
+from unittest.mock import Mock
+
+from lwip_py.emulation import EthernetBus, Host
+
+
+def _make_arp_request(target_ip):
+    return bytearray(
+        b'\xff' * 6 + b'\x02\x00\x0a\x00\x00\x01' + b'\x08\x06'
+        + bytes(24) + bytes(target_ip),
+    )
+
+
+def test_host_is_materialized_by_addressed_frame():
+    """Test that only frames addressed to the host materialize it."""
+    stack = Mock()
+    netif = stack.make_interface.return_value
+    stack.get_interfaces.return_value = {'h.eth1': netif}
+    host = Host(stack, lazy=True)
+    bus = EthernetBus()
+    host.set_materialization_callback(
+        lambda _, interfaces: [
+            bus.replace_interface(*interface) for interface in interfaces
+        ],
+    )
+
+    declared = host.add_network_interface('h.eth1', '10.0.0.2', '255.0.0.0')
+    bus.add_interface(declared, host.on_incoming_data)
+    host.set_up_interfaces()
+    host.start()
+    assert declared.get_hwaddr() == b'\x02\x00\x0a\x00\x00\x02'
+
+    host.on_incoming_data(declared, _make_arp_request((10, 0, 0, 3)))
+    host.on_incoming_data(declared, bytearray(b'\x02\x00\x0a\x00\x00\x03'))
+    assert not host.is_materialized()
+    stack.init.assert_not_called()
+
+    host.on_incoming_data(declared, _make_arp_request((10, 0, 0, 2)))
+    assert host.is_materialized()
+    stack.init.assert_called_once()
+
+    netif.add.assert_called_once()
+    assert netif.add.call_args[0][3] == (2, 0, 10, 0, 0, 2)
+    netif.set_output_callbacks.assert_called_once()
+    netif.set_up.assert_called_once()
+    assert bus._interfaces[0][0] is netif
+
+    host.stop()
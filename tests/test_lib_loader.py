@@ -0,0 +1,23 @@
+"""Tests of the multi-instance library loading."""
+
+import _ctypes
+import os
+
+from lwip_py.utility import MultiInstanceLibraryLoader
+
+
+def test_instances_are_distinct(tmp_path):
+    """Test that every call loads new instance without leftover files."""
+    loader = MultiInstanceLibraryLoader(_ctypes.__file__, str(tmp_path))
+
+    instances = [loader() for _ in range(3)]
+
+    assert len({instance._handle for instance in instances}) == 3
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_default_directory():
+    """Test loading from the default (memory backed) directory."""
+    loader = MultiInstanceLibraryLoader(_ctypes.__file__)
+
+    assert loader()._handle != loader()._handle
@@ -0,0 +1,27 @@
+"""Tests of the lwip build profile selection."""
+
+import pytest
+
+from lwip_py.utility import get_profile_library_path
+
+
+def test_profile_library_path():
+    """Test that the profile libraries are located next to liblwip.so."""
+    path = 'lwip_lib/build/liblwip.so'
+    assert get_profile_library_path(path) == path
+    assert get_profile_library_path(path, 'debug') == path
+    assert get_profile_library_path(path, 'release') == (
+        'lwip_lib/build/liblwip_release.so'
+    )
+    assert get_profile_library_path(path, 'forwarding') == (
+        'lwip_lib/build/liblwip_forwarding.so'
+    )
+    assert get_profile_library_path(path, 'dhcp') == (
+        'lwip_lib/build/liblwip_dhcp.so'
+    )
+
+
+def test_unknown_profile():
+    """Test that the unknown profile is rejected."""
+    with pytest.raises(ValueError):
+        get_profile_library_path('liblwip.so', 'tiny')
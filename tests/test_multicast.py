@@ -0,0 +1,91 @@
+"""Tests of the multicast group membership and bus filtering."""
+
+import ctypes
+from unittest.mock import Mock
+
+from lwip_py.emulation import EthernetBus
+from lwip_py.stack import IpV4Addr
+from lwip_py.stack.netif import NetIf
+from lwip_py.stack.udp_socket import UdpSocket
+from lwip_py.utility import address_helpers
+
+_GROUP_HWADDR = b'\x01\x00\x5e\x01\x02\x03'
+
+
+def test_multicast_hwaddr_mapping():
+    """Test that the low 23 bits of the group form the address."""
+    group = IpV4Addr('239.129.2.3')
+    assert address_helpers.multicast_hwaddr_from_int_ip(group.addr) == (
+        _GROUP_HWADDR
+    )
+
+
+def test_netif_tracks_mac_filter():
+    """Test that the stack MAC filter updates are reflected."""
+    lwip = Mock()
+    netif = NetIf('eth0', lwip, Mock())
+    group = ctypes.pointer(IpV4Addr('224.1.2.3'))
+
+    assert not netif.is_multicast_member(_GROUP_HWADDR)
+    netif._igmp_mac_filter_internal(None, group, NetIf.mac_filter_add)
+    assert netif.is_multicast_member(_GROUP_HWADDR)
+    netif._igmp_mac_filter_internal(None, group, NetIf.mac_filter_del)
+    assert not netif.is_multicast_member(_GROUP_HWADDR)
+
+
+def test_netif_settings_follow_library_layout():
+    """Test that the fields from mtu are written at the reported offset."""
+    lwip = Mock()
+    mtu_offset = ctypes.sizeof(NetIf._LwipNetIf) + 8
+
+    def get_layout(layout):
+        # IGMP places client data between state and mtu
+        layout._obj.size = mtu_offset + ctypes.sizeof(
+            NetIf._LwipNetIfSettings,
+        )
+        layout._obj.mtu_offset = mtu_offset
+
+    lwip.lwip_py_get_netif_layout.side_effect = get_layout
+    netif = NetIf('eth0', lwip, Mock())
+    netif.add(IpV4Addr(), IpV4Addr(), IpV4Addr(), (2, 0, 0, 0, 0, 1))
+
+    address, _ = netif.get_memory_region()
+    hwaddr_offset = mtu_offset + NetIf._LwipNetIfSettings.hwaddr.offset
+    assert ctypes.string_at(address + hwaddr_offset, 6) == (
+        b'\x02\x00\x00\x00\x00\x01'
+    )
+    assert ctypes.string_at(address + ctypes.sizeof(NetIf._LwipNetIf), 8) == (
+        bytes(8)
+    )
+    assert netif.get_hwaddr() == b'\x02\x00\x00\x00\x00\x01'
+
+
+def test_bus_delivers_multicast_to_members():
+    """Test that only the members receive the multicast frames."""
+    bus = EthernetBus()
+    member, other = Mock(), Mock()
+    member.is_multicast_member.return_value = True
+    other.is_multicast_member.return_value = False
+    on_member_data, on_other_data = Mock(), Mock()
+    bus.add_interface(member, on_member_data)
+    bus.add_interface(other, on_other_data)
+
+    bus._broadcast(Mock(), bytearray(_GROUP_HWADDR + bytes(20)))
+    on_member_data.assert_called_once()
+    on_other_data.assert_not_called()
+
+    bus._broadcast(Mock(), bytearray(b'\xff' * 6 + bytes(20)))
+    assert on_other_data.call_count == 1
+
+
+def test_join_group_on_all_interfaces():
+    """Test that the group is joined on any interface by default."""
+    lwip = Mock()
+    lwip.igmp_joingroup.return_value = 0
+    udp_socket = UdpSocket(lwip, Mock())
+
+    udp_socket.join_group(IpV4Addr('224.1.2.3'))
+
+    interface_address, group = lwip.igmp_joingroup.call_args[0]
+    assert interface_address.addr == 0
+    assert group.addr == IpV4Addr('224.1.2.3').addr
@@ -0,0 +1,54 @@
+"""Tests of the pbuf ownership tracking."""
+
+import ctypes
+from unittest.mock import Mock
+
+from lwip_py.stack import PBuf
+from lwip_py.stack.pbuf_tracker import PbufTracker, TrackingAllocator
+
+
+def _make_lwip(pbufs):
+    lwip = Mock()
+    lwip.pbuf_alloc.side_effect = [ctypes.pointer(pbuf) for pbuf in pbufs]
+    lwip.pbuf_free.return_value = 1
+    return lwip
+
+
+def test_tracker_reports_outstanding_pbufs():
+    """Test that only the pbufs not released are reported."""
+    pbufs = [PBuf(tot_len=100), PBuf(tot_len=200)]
+    tracker = PbufTracker()
+    allocator = TrackingAllocator(_make_lwip(pbufs), tracker)
+
+    first = allocator.allocate_transport_pbuf_from_data(bytes(100))
+    second = allocator.allocate_raw_pbuf(200)
+    allocator.free_pbuf(first)
+
+    outstanding = tracker.get_outstanding()
+    assert len(outstanding) == 1
+    assert outstanding[0].address == ctypes.addressof(second)
+    assert outstanding[0].kind == 'raw'
+    assert outstanding[0].size == 200
+    assert outstanding[0].site[0][2] == (
+        'test_tracker_reports_outstanding_pbufs'
+    )
+    assert 'raw pbuf(s), 200 bytes' in tracker.format_report()
+
+    allocator.hand_over(second)
+    assert tracker.get_outstanding() == []
+    assert tracker.get_counters() == (2, 2, 0)
+
+
+def test_received_pbufs_are_tracked():
+    """Test that pbufs taken over from the stack are tracked."""
+    tracker = PbufTracker()
+    allocator = TrackingAllocator(_make_lwip([]), tracker)
+
+    received = ctypes.pointer(PBuf(tot_len=10))
+    allocator.take_over(received)
+    assert tracker.get_outstanding()[0].kind == 'received'
+
+    allocator.free_pbuf(received)
+    allocator.free_pbuf(ctypes.pointer(PBuf()))
+    assert tracker.get_outstanding() == []
+    assert tracker.get_counters() == (1, 1, 1)
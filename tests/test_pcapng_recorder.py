@@ -0,0 +1,54 @@
+"""Tests of the pcapng capture output."""
+
+import struct
+from unittest.mock import Mock
+
+from lwip_py.output import PcapngRecorder, PcapngWriter
+
+
+def _read_blocks(path):
+    with open(path, 'rb') as capture:
+        content = capture.read()
+
+    blocks = []
+    offset = 0
+    while offset < len(content):
+        block_type, block_length = struct.unpack_from('<II', content, offset)
+        blocks.append((block_type, content[offset + 8:offset + block_length]))
+        offset += block_length
+    return blocks
+
+
+def test_recorder_streams_frames(tmp_path):
+    """Test that frames are written with interface descriptions."""
+    capture_path = str(tmp_path / 'capture.pcapng')
+    recorder = PcapngRecorder(capture_path, ring_size=1)
+
+    netif = Mock()
+    netif.get_name.return_value = 'p1.eth1'
+    recorder(netif, bytearray(b'\x01' * 60), True)
+    recorder(netif, bytearray(b'\x02' * 61), True)
+    recorder.close()
+
+    block_types = [block[0] for block in _read_blocks(capture_path)]
+    assert block_types == [0x0A0D0D0A, 1, 6, 6]
+    assert list(recorder.recorded_frames) == [bytearray(b'\x02' * 61)]
+    assert recorder.get_dropped_frames() == 0
+
+
+def test_writer_rotates_files(tmp_path):
+    """Test that only the configured number of files is kept."""
+    capture_path = str(tmp_path / 'capture.pcapng')
+    with PcapngWriter(capture_path, max_file_size=256, max_files=2) as writer:
+        interface_id = writer.add_interface('eth')
+        for index in range(20):
+            writer.write_frame(interface_id, index, bytes(100))
+
+    written_files = writer.get_written_files()
+    assert len(written_files) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        'capture_00008.pcapng', 'capture_00009.pcapng',
+    ]
+    for written_file in written_files:
+        block_types = [block[0] for block in _read_blocks(written_file)]
+        assert block_types[:2] == [0x0A0D0D0A, 1]
@@ -0,0 +1,71 @@
+"""Tests of the ICMP echo engine bookkeeping."""
+
+from unittest.mock import Mock
+
+import pytest
+
+from lwip_py.stack import IpV4Addr, exceptions
+from lwip_py.stack.ping_engine import PingEngine
+from lwip_py.utility import address_helpers
+
+
+def _make_engine():
+    lwip = Mock()
+    lwip.lwip_py_ping_engine_new.return_value = 0x1000
+    lwip.lwip_py_ping_engine_send.return_value = 0
+    lwip.lwip_py_ping_engine_collect.return_value = 0
+    return PingEngine(lwip, capacity=16)
+
+
+def _deliver(engine, replies):
+    pending = [list(replies)]
+
+    def collect(engine_pointer, reply_array, max_count):
+        batch, pending[0] = pending[0], []
+        for index, (target, seq, rtt_us) in enumerate(batch):
+            reply_array[index].addr = address_helpers.int_ip_from_string(
+                target,
+            )
+            reply_array[index].seq = seq
+            reply_array[index].rtt_us = rtt_us
+        return len(batch)
+
+    engine._lwip.lwip_py_ping_engine_collect.side_effect = collect
+
+
+def test_statistics_per_target():
+    """Test that RTTs and losses are accounted per target."""
+    engine = _make_engine()
+    sequences = [
+        engine.send(IpV4Addr(target), timeout=0)
+        for target in ('10.0.0.1', '10.0.0.2', '10.0.0.1', '10.0.0.1')
+    ]
+    assert sequences == [0, 1, 2, 3]
+
+    _deliver(
+        engine, [('10.0.0.1', 0, 1000), ('10.0.0.1', 3, 3000)],
+    )
+    assert engine.collect() == 0
+    engine._lwip.lwip_py_ping_engine_cancel.assert_any_call(0x1000, 1)
+
+    statistics = engine.get_statistics(percentiles=(50,))
+    first = statistics['10.0.0.1']
+    assert (first.sent, first.received) == (3, 2)
+    assert first.loss == pytest.approx(1 / 3)
+    assert first.rtt_min == pytest.approx(0.001)
+    assert first.rtt_avg == pytest.approx(0.002)
+    assert first.rtt_max == pytest.approx(0.003)
+    assert first.rtt_percentiles[50] == pytest.approx(0.001)
+    second = statistics['10.0.0.2']
+    assert (second.sent, second.received, second.loss) == (1, 0, 1.0)
+    assert second.rtt_min is None
+
+
+def test_send_error_is_raised():
+    """Test that the exhausted capacity is reported."""
+    engine = _make_engine()
+    engine._lwip.lwip_py_ping_engine_send.return_value = -5
+
+    with pytest.raises(exceptions.StackException):
+        engine.send(IpV4Addr('10.0.0.1'))
+    assert engine.get_outstanding() == 0
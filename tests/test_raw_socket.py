@@ -0,0 +1,190 @@
+"""Tests of the raw socket and the packet generator."""
+
+import ctypes
+from unittest.mock import Mock
+
+import pytest
+
+from lwip_py.emulation.packet_generator import PacketCounter, PacketGenerator
+from lwip_py.stack import IpV4Addr, PBuf, exceptions
+from lwip_py.stack.raw_socket import PacketBatch, RawCounters, RawSocket
+
+
+def _make_socket(with_helpers=True):
+    lwip = Mock()
+    lwip.raw_new.return_value = 0x1000
+    lwip.raw_sendto.return_value = 0
+    if not with_helpers:
+        del lwip.lwip_py_raw_sendto_many
+    return RawSocket(lwip, Mock(), 253)
+
+
+def test_allocation_failure():
+    """Test that the failed pcb allocation is reported."""
+    lwip = Mock()
+    lwip.raw_new.return_value = None
+    with pytest.raises(exceptions.AllocationError):
+        RawSocket(lwip, Mock(), 253)
+
+
+def test_batch_is_sent_in_one_call():
+    """Test that the prepared packets are passed to the library at once."""
+    raw_socket = _make_socket()
+    batch = PacketBatch(
+        [(b'\x01\x02', IpV4Addr('10.0.0.2')), (b'\x03', IpV4Addr('10.0.0.3'))],
+    )
+    raw_socket._lwip.lwip_py_raw_sendto_many.return_value = 1
+
+    assert raw_socket.send_batch(batch, count=5) == 1
+    pcb, descriptors, count, results = (
+        raw_socket._lwip.lwip_py_raw_sendto_many.call_args[0]
+    )
+    assert (pcb, count, results) == (0x1000, 2, None)
+    assert ctypes.string_at(descriptors[1].data, descriptors[1].len) == b'\x03'
+    assert descriptors[0].addr.addr == IpV4Addr('10.0.0.2').addr
+
+
+def test_batch_is_sent_from_offset():
+    """Test that the packets before the offset are skipped."""
+    raw_socket = _make_socket()
+    batch = PacketBatch(
+        (bytes([index]), IpV4Addr('10.0.0.2')) for index in range(4)
+    )
+    raw_socket._lwip.lwip_py_raw_sendto_many.return_value = 2
+
+    assert raw_socket.send_batch(batch, count=5, offset=2) == 2
+    _, descriptors, count, _ = (
+        raw_socket._lwip.lwip_py_raw_sendto_many.call_args[0]
+    )
+    assert count == 2
+    assert [
+        ctypes.string_at(descriptor.data, descriptor.len)
+        for descriptor in descriptors
+    ] == [b'\x02', b'\x03']
+
+
+def test_batch_falls_back_to_single_sends():
+    """Test the batch send without the library helper."""
+    raw_socket = _make_socket(with_helpers=False)
+    raw_socket._lwip.raw_sendto.side_effect = [0, -4]
+    batch = PacketBatch(
+        [(b'\x01', IpV4Addr('10.0.0.2')), (b'\x02', IpV4Addr('10.0.0.2'))],
+    )
+    results = (ctypes.c_int8 * 2)()
+
+    assert raw_socket.send_batch(batch, results=results) == 1
+    assert list(results) == [0, -4]
+    allocate = raw_socket._allocator.allocate_transport_pbuf_from_data
+    assert [call[0][0] for call in allocate.call_args_list] == [
+        b'\x01', b'\x02',
+    ]
+    assert raw_socket._allocator.free_pbuf.call_count == 2
+
+
+def test_received_packets_are_consumed():
+    """Test that the packets are passed to the callback and consumed."""
+    raw_socket = _make_socket()
+    raw_socket._allocator.copy_payload.return_value = bytearray(b'packet')
+    received = []
+    raw_socket.set_recv_callback(
+        lambda sock, payload, address: received.append((payload, address)),
+    )
+    source = IpV4Addr('10.0.0.5')
+
+    assert raw_socket._recv_callback(
+        None, None, Mock(), ctypes.pointer(source),
+    ) == 1
+    assert received[0][0] == b'packet'
+    assert received[0][1].addr == source.addr
+    raw_socket._allocator.free_pbuf.assert_called_once()
+
+
+def test_counting_without_helper():
+    """Test the python counting of the consumed packets."""
+    raw_socket = _make_socket(with_helpers=False)
+    raw_socket.enable_counting()
+    pbuf = PBuf()
+    pbuf.tot_len = 40
+
+    for _ in range(3):
+        raw_socket._recv_callback(
+            None, None, ctypes.pointer(pbuf), ctypes.pointer(IpV4Addr()),
+        )
+    assert raw_socket.get_counters() == RawCounters(3, 120)
+    raw_socket._allocator.copy_payload.assert_not_called()
+
+
+def test_generator_sends_count_in_batches(fake_host):
+    """Test that the generator stops after the packet count."""
+    raw_socket = Mock()
+    raw_socket.send_batch.side_effect = (
+        lambda batch, count, offset: count - 1
+    )
+    fake_host.socket = raw_socket
+    generator = PacketGenerator(
+        fake_host, '10.0.0.2', [b'a', b'b'], rate=1e9, batch_size=4, count=10,
+    )
+
+    future = generator.start()
+    assert future.done()
+    assert [
+        call[0][1] for call in raw_socket.send_batch.call_args_list
+    ] == [4, 4, 2]
+    statistics = future.result()
+    assert (statistics.sent, statistics.failed) == (7, 3)
+    raw_socket.close.assert_called_once()
+
+
+def test_generator_rotates_templates(fake_host):
+    """Test that every batch continues with the next template."""
+    raw_socket = Mock()
+    sent_templates = []
+
+    def send_batch(batch, count, offset):
+        descriptors = batch.descriptors[offset:offset + count]
+        sent_templates.extend(
+            ctypes.string_at(descriptor.data, descriptor.len)
+            for descriptor in descriptors
+        )
+        return count
+
+    raw_socket.send_batch.side_effect = send_batch
+    fake_host.socket = raw_socket
+    generator = PacketGenerator(
+        fake_host, '10.0.0.2', [b'a', b'b', b'c'], rate=1e9, batch_size=4,
+        count=10,
+    )
+
+    assert generator.start().result().sent == 10
+    assert [
+        call[0][1] for call in raw_socket.send_batch.call_args_list
+    ] == [4, 2, 4]
+    assert sent_templates == [b'a', b'b', b'c'] * 3 + [b'a']
+
+
+def test_generator_stop(fake_host):
+    """Test that the stopped generator completes on the next tick."""
+    raw_socket = Mock()
+    raw_socket.send_batch.side_effect = lambda batch, count, offset: count
+    fake_host.socket = raw_socket
+    generator = PacketGenerator(fake_host, '10.0.0.2', [b'a'], rate=1)
+
+    future = generator.start()
+    assert not future.done()
+    generator.stop()
+    fake_host.delayed.pop()(fake_host)
+    assert future.result().sent == 1
+
+
+def test_counter_reads_socket_counters(fake_host):
+    """Test that the counter counts on its raw socket of the protocol."""
+    fake_host.socket.get_counters.return_value = RawCounters(3, 120)
+    counter = PacketCounter(fake_host, protocol=254)
+
+    fake_host.get_stack().make_socket.assert_called_once()
+    assert fake_host.get_stack().make_socket.call_args[0][1] == 254
+    fake_host.socket.enable_counting.assert_called_once()
+    assert counter.get_counters() == RawCounters(3, 120)
+
+    counter.close()
+    fake_host.socket.close.assert_called_once()
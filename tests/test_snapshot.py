@@ -0,0 +1,25 @@
+"""Tests of the library memory snapshot."""
+
+import _decimal
+import ctypes
+
+from lwip_py.stack.snapshot import MemorySnapshot, get_writable_regions
+from lwip_py.utility import MultiInstanceLibraryLoader
+
+
+def test_snapshot_restores_library_data():
+    """Test that the writable segments are restored in place."""
+    lib = MultiInstanceLibraryLoader(_decimal.__file__)()
+    regions = get_writable_regions(lib)
+    assert regions
+
+    snapshot = MemorySnapshot(regions)
+    original = [ctypes.string_at(address, size) for address, size in regions]
+    for address, size in regions:
+        ctypes.memset(address, 0xAA, size)
+
+    snapshot.restore()
+
+    restored = [ctypes.string_at(address, size) for address, size in regions]
+    assert restored == original
+    assert snapshot.get_size() == sum(size for _, size in regions)
@@ -0,0 +1,95 @@
+"""Tests of the static ARP entries installed from the address plan."""
+
+from unittest.mock import Mock
+
+import pytest
+
+from lwip_py.emulation import EthernetNetwork, Host
+from lwip_py.stack import exceptions
+
+
+def test_entries_follow_address_plan():
+    """Test that every host gets the neighbours of its subnets only."""
+    network = EthernetNetwork(
+        'lwip_lib/build/liblwip.so', lazy_hosts=True, static_arp=True,
+    )
+    network.add_host('a', ('a.eth1', '10.0.0.1', '255.255.255.0', ''))
+    network.add_host(
+        'router',
+        ('r.eth1', '10.0.0.254', '255.255.255.0', ''),
+        ('r.eth2', '10.1.0.254', '255.255.255.0', ''),
+    )
+    network.add_host('b', ('b.eth1', '10.1.0.1', '255.255.255.0', ''))
+    network.set_up_interfaces()
+
+    def neighbours(host_name):
+        return {
+            address
+            for address, _ in network.get_host(host_name)._static_arp_entries
+        }
+
+    assert neighbours('a') == {'10.0.0.254'}
+    assert neighbours('router') == {'10.0.0.1', '10.1.0.1'}
+    assert neighbours('b') == {'10.1.0.254'}
+    assert network.get_host('a')._static_arp_entries[0][1] == (
+        b'\x02\x00\x0a\x00\x00\xfe'
+    )
+    assert not network.get_host('a').is_materialized()
+
+
+def test_entries_are_added_after_interfaces_up():
+    """Test that the lazy host adds the entries once materialized."""
+    stack = Mock()
+    stack.get_arp_table_size.return_value = 10
+    netif = stack.make_interface.return_value
+    stack.get_interfaces.return_value = {'h.eth1': netif}
+    stack.add_static_arp_entry.side_effect = (
+        lambda address, hwaddr: netif.set_up.assert_called_once()
+    )
+    host = Host(stack, lazy=True)
+    host.add_network_interface('h.eth1', '10.0.0.2', '255.0.0.0')
+    host.set_static_arp_entries([('10.0.0.3', b'\x02\x00\x0a\x00\x00\x03')])
+    host.set_up_interfaces()
+    stack.add_static_arp_entry.assert_not_called()
+
+    host.materialize()
+    stack.add_static_arp_entry.assert_called_once_with(
+        '10.0.0.3', b'\x02\x00\x0a\x00\x00\x03',
+    )
+
+
+def test_failed_entries_are_reported():
+    """Test that the entries not fitting the ARP table are reported."""
+    stack = Mock()
+    stack.get_arp_table_size.return_value = 10
+    stack.get_interfaces.return_value = {'h.eth1': Mock()}
+    stack.add_static_arp_entry.side_effect = [
+        None, exceptions.StackException(-1),
+    ]
+    host = Host(stack, lazy=True)
+    host.set_static_arp_entries([
+        ('10.0.0.3', b'\x02\x00\x0a\x00\x00\x03'),
+        ('10.0.0.4', b'\x02\x00\x0a\x00\x00\x04'),
+    ])
+    host.set_up_interfaces()
+
+    with pytest.warns(RuntimeWarning, match='1 static ARP .* 10.0.0.4'):
+        host.materialize()
+
+
+def test_entries_leave_room_for_dynamic_ones():
+    """Test that the plan larger than the ARP table is cut."""
+    stack = Mock()
+    stack.get_arp_table_size.return_value = 10
+    stack.get_interfaces.return_value = {'h.eth1': Mock()}
+    host = Host(stack, lazy=True)
+    host.set_static_arp_entries(
+        ('10.0.0.{0}'.format(index), bytes(6)) for index in range(1, 13)
+    )
+    host.set_up_interfaces()
+
+    with pytest.warns(RuntimeWarning, match='4 static ARP .* 10.0.0.9'):
+        host.materialize()
+    assert [
+        call[0][0] for call in stack.add_static_arp_entry.call_args_list
+    ] == ['10.0.0.{0}'.format(index) for index in range(1, 9)]
@@ -0,0 +1,40 @@
+"""Tests of the TCP benchmark bus observer."""
+
+import struct
+from unittest.mock import Mock
+
+from lwip_py.benchmarks.tcp import _SegmentCounter
+from lwip_py.emulation import EthernetBus
+
+_ETHERNET_HEADER = b'\xff' * 6 + bytes(6) + b'\x08\x00'
+
+
+def _make_tcp_frame(sequence, payload):
+    tcp_header = struct.pack(
+        '!HHIIBBHHH', 5000, 5001, sequence, 0, 5 << 4, 0x18, 1024, 0, 0,
+    )
+    ip_header = struct.pack(
+        '!BBHHHBBH4s4s',
+        0x45, 0, 20 + len(tcp_header) + len(payload), 1, 0, 255, 6, 0,
+        bytes((10, 0, 0, 1)), bytes((10, 0, 0, 2)),
+    )
+    return bytearray(_ETHERNET_HEADER + ip_header + tcp_header + payload)
+
+
+def test_segment_counter_observes_bus_frames():
+    """Test that the counter is callable as the bus observer."""
+    bus = EthernetBus()
+    sender, receiver = Mock(), Mock()
+    sender.is_checksum_offloaded.return_value = False
+    receiver.is_checksum_offloaded.return_value = False
+    on_receiver_data = Mock()
+    bus.add_interface(receiver, on_receiver_data)
+    segment_counter = _SegmentCounter()
+    bus.add_observer(segment_counter)
+
+    for sequence in (1000, 1004, 1004, 1008):
+        bus._broadcast(sender, _make_tcp_frame(sequence, b'data'))
+
+    assert on_receiver_data.call_count == 4
+    assert segment_counter.segments == 4
+    assert segment_counter.retransmissions == 1
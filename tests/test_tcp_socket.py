@@ -0,0 +1,198 @@
+"""Tests of the TCP socket buffering and flow control."""
+
+import ctypes
+from unittest.mock import Mock
+
+import pytest
+
+from lwip_py.stack import exceptions
+from lwip_py.stack import tcp_socket as tcp_socket_module
+from lwip_py.stack.tcp_socket import TcpSocket, read_tcp_config
+
+_PCB = 0x1000
+
+
+def _make_socket(lwip=None):
+    lwip = lwip or Mock()
+    lwip.tcp_new_ip_type.return_value = _PCB
+    lwip.tcp_bind.return_value = 0
+    lwip.tcp_connect.return_value = 0
+    return TcpSocket(lwip, Mock(), _PCB)
+
+
+def test_send_keeps_data_beyond_send_buffer():
+    """Test that data is written as the acknowledgements arrive."""
+    tcp_socket = _make_socket()
+    write_some = tcp_socket._lwip.lwip_py_tcp_write_some
+    write_some.return_value = 6
+
+    tcp_socket.send(b'0123456789')
+    assert tcp_socket.get_pending_bytes() == 4
+    assert tcp_socket.get_unacked_bytes() == 6
+    assert write_some.call_args[0][2] == 10
+
+    sent = Mock()
+    tcp_socket.set_sent_callback(sent)
+    write_some.return_value = 4
+    tcp_socket._sent_callback(None, _PCB, 6)
+
+    assert write_some.call_args[0][2] == 4
+    assert tcp_socket.get_pending_bytes() == 0
+    assert tcp_socket.get_unacked_bytes() == 4
+    sent.assert_called_once_with(tcp_socket, 6)
+
+
+def test_window_is_opened_when_data_is_consumed():
+    """Test that tcp_recved follows the consumption of the data."""
+    tcp_socket = _make_socket()
+    readable = Mock()
+    tcp_socket.set_recv_callback(readable)
+    tcp_socket._allocator.copy_payload.return_value = bytearray(b'abcdef')
+
+    tcp_socket._recv_callback(None, _PCB, Mock(), 0)
+    readable.assert_called_once_with(tcp_socket)
+    tcp_socket._lwip.tcp_recved.assert_not_called()
+
+    assert tcp_socket.recv(4) == b'abcd'
+    assert tcp_socket._lwip.tcp_recved.call_args[0][1] == 4
+    assert tcp_socket.recv() == b'ef'
+    assert tcp_socket.recv() is None
+
+    tcp_socket._recv_callback(None, _PCB, None, 0)
+    assert tcp_socket.recv() == b''
+
+
+def test_error_releases_connection():
+    """Test that the failed connection can not be used anymore."""
+    tcp_socket = _make_socket()
+    on_error = Mock()
+    tcp_socket.set_error_callback(on_error)
+
+    tcp_socket._err_callback(None, -14)
+
+    on_error.assert_called_once_with(tcp_socket, -14)
+    assert not tcp_socket.is_connected()
+    with pytest.raises(exceptions.StackException):
+        tcp_socket.send(b'data')
+
+
+def test_close_waits_for_pending_data():
+    """Test that the connection is closed once the data is written."""
+    tcp_socket = _make_socket()
+    tcp_socket._lwip.lwip_py_tcp_write_some.return_value = 0
+    tcp_socket._lwip.tcp_close.return_value = 0
+
+    tcp_socket.send(b'data')
+    tcp_socket.close()
+    tcp_socket._lwip.tcp_close.assert_not_called()
+
+    tcp_socket._lwip.lwip_py_tcp_write_some.return_value = 4
+    assert tcp_socket._poll_callback(None, _PCB) == 0
+    tcp_socket._lwip.tcp_close.assert_called_once()
+
+
+def test_data_sent_without_copy_is_pinned_till_acknowledged():
+    """Test that the buffer is referenced by the stack till the ack."""
+    tcp_socket = _make_socket()
+    write_some = tcp_socket._lwip.lwip_py_tcp_write_some
+    write_some.return_value = 6
+    payload = bytearray(b'0123456789')
+
+    tcp_socket.send(payload, copy=False)
+    address, size, apiflags = write_some.call_args[0][1:]
+    assert size == 10
+    assert apiflags == 0
+    assert address == ctypes.addressof(
+        (ctypes.c_char * len(payload)).from_buffer(payload),
+    )
+
+    write_some.return_value = 4
+    tcp_socket._sent_callback(None, _PCB, 6)
+    assert tcp_socket.get_pinned_bytes() == 10
+    with pytest.raises(BufferError):
+        payload.extend(b'x')
+
+    tcp_socket._sent_callback(None, _PCB, 4)
+    assert tcp_socket.get_pinned_bytes() == 0
+    payload.extend(b'x')
+
+
+def test_failed_pin_is_not_released():
+    """Test that the object without the buffer interface is refused."""
+    pinned = tcp_socket_module._PinnedBuffer.__new__(
+        tcp_socket_module._PinnedBuffer,
+    )
+    with pytest.raises(TypeError):
+        pinned.__init__('text')
+    pinned.release()
+
+
+def test_close_waits_for_acknowledged_pinned_data():
+    """Test that pinned data is acknowledged before tcp_close."""
+    tcp_socket = _make_socket()
+    tcp_socket._lwip.lwip_py_tcp_write_some.return_value = 4
+    tcp_socket._lwip.tcp_close.return_value = 0
+
+    tcp_socket.send(memoryview(b'data'), copy=False)
+    tcp_socket.close()
+    tcp_socket._lwip.tcp_close.assert_not_called()
+
+    tcp_socket._sent_callback(None, _PCB, 4)
+    tcp_socket._lwip.tcp_close.assert_called_once()
+
+
+def test_tcp_config_is_read_from_library():
+    """Test that the build options reported by the library are mirrored."""
+    lwip = Mock()
+
+    def fill_config(config_reference):
+        config_reference._obj.mss = 1460
+        config_reference._obj.pbuf_pool_size = 16
+
+    lwip.lwip_py_get_tcp_config.side_effect = fill_config
+
+    tcp_config = read_tcp_config(lwip)
+
+    assert tcp_config.mss == 1460
+    assert tcp_config.pbuf_pool_size == 16
+    assert tcp_config.wnd == 0
+
+
+def test_callbacks_are_dispatched_by_argument():
+    """Test that the sockets share the callbacks registered in lwip."""
+    first_socket = _make_socket()
+    second_socket = _make_socket()
+    first_recv = first_socket._lwip.tcp_recv.call_args[0][1]
+    assert first_recv is second_socket._lwip.tcp_recv.call_args[0][1]
+
+    second_arg = second_socket._lwip.tcp_arg.call_args[0][1]
+    sent = Mock()
+    second_socket.set_sent_callback(sent)
+    tcp_socket_module._on_sent(second_arg, _PCB, 3)
+    sent.assert_called_once_with(second_socket, 3)
+
+    second_socket.abort()
+    assert tcp_socket_module._on_sent(second_arg, _PCB, 3) == 0
+    sent.assert_called_once()
+
+
+def test_accept_queue_is_limited_by_backlog():
+    """Test that queued connections hold the backlog till accepted."""
+    lwip = Mock()
+    lwip.tcp_listen_with_backlog.return_value = _PCB
+    listener = TcpSocket(lwip, Mock(), _PCB)
+    readable = Mock()
+    listener.set_recv_callback(readable)
+    listener.listen(backlog=1)
+    listener_arg = lwip.tcp_arg.call_args[0][1]
+
+    assert tcp_socket_module._on_accept(listener_arg, 0x2000, 0) == 0
+    readable.assert_called_once_with(listener)
+    lwip.tcp_backlog_delayed.assert_called_once_with(0x2000)
+    assert tcp_socket_module._on_accept(listener_arg, 0x3000, 0) == -13
+    lwip.tcp_abort.assert_called_once_with(0x3000)
+
+    accepted_socket = listener.accept()
+    lwip.tcp_backlog_accepted.assert_called_once_with(0x2000)
+    assert accepted_socket.is_connected()
+    assert listener.accept() is None
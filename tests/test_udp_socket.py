@@ -0,0 +1,96 @@
+"""Tests of the UDP socket receive queue."""
+
+import array
+import ctypes
+from unittest.mock import Mock
+
+from lwip_py.stack import IpV4Addr
+from lwip_py.stack.udp_socket import UdpSocket
+
+
+def _receive(udp_socket, payload, address='10.0.0.1', port=5000):
+    udp_socket._allocator.copy_payload.return_value = bytearray(payload)
+    udp_socket._recv_callback(
+        None, None, Mock(), ctypes.pointer(IpV4Addr(address)), port,
+    )
+
+
+def test_recv_queue():
+    """Test that datagrams are queued, pulled and dropped on overflow."""
+    readable = Mock()
+    udp_socket = UdpSocket(Mock(), Mock())
+    udp_socket.enable_recv_queue(3, readable)
+
+    assert udp_socket.recv_from() is None
+    for index in range(5):
+        _receive(udp_socket, bytes([index]) * 4, port=5000 + index)
+
+    readable.assert_called_once_with(udp_socket)
+    assert udp_socket.get_queued_datagrams() == 3
+    assert udp_socket.get_dropped_datagrams() == 2
+
+    payload, address, port = udp_socket.recv_from()
+    assert (payload, address.addr, port) == (
+        b'\x00' * 4, IpV4Addr('10.0.0.1').addr, 5000,
+    )
+
+    buffer = bytearray(2)
+    size, _, port = udp_socket.recv_into(buffer)
+    assert (size, bytes(buffer), port) == (2, b'\x01\x01', 5001)
+
+    assert [port for _, _, port in udp_socket.recv_many(10)] == [5002]
+    assert udp_socket.recv_many(10) == []
+
+
+def test_recv_callback_without_queue():
+    """Test that the callback receives data if the queue is disabled."""
+    callback = Mock()
+    udp_socket = UdpSocket(Mock(), Mock())
+    udp_socket.set_recv_callback(callback)
+
+    _receive(udp_socket, b'data')
+
+    callback.assert_called_once()
+    assert callback.call_args[0][1] == b'data'
+    udp_socket._allocator.free_pbuf.assert_called_once()
+
+
+def test_send_many_builds_batch():
+    """Test that the batch is passed to the library in one call."""
+    lwip = Mock()
+    udp_socket = UdpSocket(lwip, Mock())
+    payloads = [
+        b'first',
+        bytearray(b'second'),
+        memoryview(bytearray(b'third')),
+        array.array('H', [1, 2, 3]),
+    ]
+
+    results = udp_socket.send_many(
+        (payload, IpV4Addr('10.0.0.2'), 7000 + index)
+        for index, payload in enumerate(payloads)
+    )
+
+    assert results == [0, 0, 0, 0]
+    _, batch, count, _ = lwip.lwip_py_udp_send_many.call_args[0]
+    assert count == 4
+    for index, payload in enumerate(payloads):
+        entry = batch[index]
+        assert ctypes.string_at(entry.data, entry.len) == bytes(payload)
+        assert entry.port == 7000 + index
+        assert entry.addr.addr == IpV4Addr('10.0.0.2').addr
+
+
+def test_connected_send():
+    """Test connecting and sending via the single-call helper."""
+    lwip = Mock()
+    lwip.udp_connect.return_value = 0
+    lwip.lwip_py_udp_send.return_value = 0
+    udp_socket = UdpSocket(lwip, Mock())
+
+    udp_socket.connect(IpV4Addr('10.0.0.2'), 6000)
+    udp_socket.send(memoryview(b'data'))
+
+    lwip.udp_connect.assert_called_once()
+    assert lwip.lwip_py_udp_send.call_args[0][1:] == (b'data', 4)
+    udp_socket._allocator.allocate_transport_pbuf_from_data.assert_not_called()